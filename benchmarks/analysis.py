@@ -0,0 +1,253 @@
+"""Times each stage of the market analysis pipeline against seeded synthetic price data. Results are
+printed as JSON so timings can be compared across commits, e.g.
+
+`python -m benchmarks.analysis --scales 40x2880,400x20160 --output results.json`
+
+N.B. value matrices are held in memory in full - 4000 coins x 20160 samples requires several GB.
+"""
+
+from contextlib import contextmanager
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import time
+from typing import Dict, Iterator, List, Tuple
+
+import argh
+from argh import arg
+import numpy as np
+from pandas import DataFrame
+
+from investorbot import analysis
+from investorbot.constants import DEFAULT_LOGS_NAME
+from investorbot.db import get_market_analysis_ratings
+from investorbot import mappings
+from investorbot.integrations.cryptodotcom.http.decoding import JsonDecoder
+from investorbot.models import MarketAnalysis
+from investorbot.services import BotDbService
+
+logger = logging.getLogger(DEFAULT_LOGS_NAME)
+
+STAGES = [
+    "ingestion",
+    "get_line_of_best_fit",
+    "summary_building",
+    "assign_outlier_properties",
+    "get_market_analysis_rating",
+    "assign_weighted_rankings",
+    "persistence",
+]
+
+SAMPLE_INTERVAL_MS = 30 * 1000
+"""Crypto.com valuations are sampled roughly every 30 seconds - i.e. 2880 samples per day."""
+
+START_TIME_MS = 1723590318000
+
+
+class StageTimer:
+    """Accumulates wall time per pipeline stage."""
+
+    def __init__(self):
+        self.timings = {stage: 0.0 for stage in STAGES}
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.timings[stage] += time.perf_counter() - start
+
+
+def parse_scales(scales: str) -> List[Tuple[int, int]]:
+    """Parses comma separated scales in the format '{coin_count}x{sample_count}'."""
+    parsed_scales = []
+
+    for scale in scales.split(","):
+        coin_count, sample_count = scale.lower().strip().split("x")
+        parsed_scales.append((int(coin_count), int(sample_count)))
+
+    return parsed_scales
+
+
+def get_synthetic_valuation_payloads(
+    coin_count: int, sample_count: int, seed: int
+) -> Iterator[Tuple[str, str]]:
+    """Generates a public/get-valuations response body for each coin, one coin at a time. Prices
+    follow a geometric random walk with a random starting price, drift and volatility per coin.
+    Values are ordered from most recent to oldest, as returned by the API."""
+    rng = np.random.default_rng(seed)
+
+    for i in range(coin_count):
+        starting_price = 10 ** rng.uniform(-4, 4)
+        drift = rng.normal(0, 1e-5)
+        volatility = rng.uniform(1e-4, 5e-3)
+
+        log_returns = rng.normal(drift, volatility, sample_count)
+        values = starting_price * np.exp(np.cumsum(log_returns))
+        times = START_TIME_MS + np.arange(sample_count) * SAMPLE_INTERVAL_MS
+
+        data = [
+            {"v": f"{value:.8g}", "t": int(t)}
+            for value, t in zip(values[::-1], times[::-1])
+        ]
+
+        payload = {
+            "id": -1,
+            "method": "public/get-valuations",
+            "code": 0,
+            "result": {"data": data},
+        }
+
+        yield f"COIN{i}_USD", json.dumps(payload)
+
+
+def get_bot_db() -> BotDbService:
+    bot_db = BotDbService("sqlite:///:memory:")
+    bot_db.run_migration()
+    bot_db.add_items(get_market_analysis_ratings())
+
+    return bot_db
+
+
+def run_pipeline(coin_count: int, sample_count: int, seed: int) -> Dict[str, float]:
+    """Runs the market analysis pipeline once and returns the wall time of each stage in
+    seconds. Generating the synthetic data is excluded from the timings."""
+    timer = StageTimer()
+    bot_db = get_bot_db()
+    decoder = JsonDecoder()
+
+    coin_names = []
+    time_series = []
+
+    for coin_name, payload in get_synthetic_valuation_payloads(
+        coin_count, sample_count, seed
+    ):
+        # Response bodies are received as bytes.
+        content = payload.encode("utf-8")
+
+        with timer.time("ingestion"):
+            series = mappings.valuation_arrays_to_time_series(
+                *decoder.decode_valuation_arrays(content)
+            )
+
+        # The original per-coin DataFrame approach, kept as a baseline.
+        df = DataFrame({"t": series.t, "v": series.v})
+
+        with timer.time("get_line_of_best_fit"):
+            analysis.get_line_of_best_fit(df)
+
+        coin_names.append(coin_name)
+        time_series.append(series)
+
+    with timer.time("ingestion"):
+        time_matrix, value_matrix, time_offsets = analysis.get_time_series_matrices(
+            time_series
+        )
+
+    with timer.time("summary_building"):
+        summaries = analysis.get_summary_batch(
+            coin_names, time_matrix, value_matrix, time_offsets
+        )
+
+    with timer.time("assign_outlier_properties"):
+        summaries = analysis.assign_outlier_properties(summaries)
+
+    rating_thresholds = bot_db.get_rating_thresholds()
+
+    with timer.time("get_market_analysis_rating"):
+        confidence_rating = analysis.get_market_analysis_rating(
+            summaries, rating_thresholds
+        )
+
+    options = bot_db.get_selection_criteria(confidence_rating.value)
+
+    with timer.time("assign_weighted_rankings"):
+        summaries = analysis.assign_weighted_rankings(summaries, options)
+
+    with timer.time("persistence"):
+        market_analysis = MarketAnalysis(
+            confidence_rating.value,
+            START_TIME_MS + sample_count * SAMPLE_INTERVAL_MS,
+            summaries.to_time_series_summaries(),
+        )
+
+        bot_db.add_item(market_analysis)
+
+    return timer.timings
+
+
+def get_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, check=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@arg(
+    "--scales",
+    help="Comma separated scales in the format '{coin_count}x{sample_count}'.",
+)
+@arg("--repeat", help="The number of times each scale is benchmarked.")
+@arg("--output", help="Optional file path to write the JSON results to.")
+def run_benchmarks(
+    scales: str = "40x2880,400x2880,4000x2880,40x20160,400x20160",
+    seed: int = 0,
+    repeat: int = 3,
+    output: str | None = None,
+):
+    """Benchmarks each stage of the market analysis pipeline for every given scale."""
+    results = []
+
+    for coin_count, sample_count in parse_scales(scales):
+        runs = []
+
+        for i in range(int(repeat)):
+            logger.info(
+                f"Benchmarking {coin_count} coins x {sample_count} samples "
+                + f"({i + 1}/{repeat})."
+            )
+            runs.append(run_pipeline(coin_count, sample_count, int(seed)))
+
+        results.append(
+            {
+                "coin_count": coin_count,
+                "sample_count": sample_count,
+                "timings": {
+                    stage: {
+                        "min": min(run[stage] for run in runs),
+                        "median": statistics.median(run[stage] for run in runs),
+                        "runs": [run[stage] for run in runs],
+                    }
+                    for stage in STAGES
+                },
+            }
+        )
+
+    report = json.dumps(
+        {
+            "commit": get_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "seed": int(seed),
+            "repeat": int(repeat),
+            "results": results,
+        },
+        indent=4,
+    )
+
+    if output is not None:
+        with open(output, "w") as f:
+            f.write(report)
+
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    argh.dispatch_command(run_benchmarks)
@@ -6,11 +6,12 @@ from investorbot.routines import (
     buy_coin_routine,
     sell_coin_routine,
     refresh_market_analysis_routine,
+    refresh_multi_horizon_market_analysis_routine,
 )
 from investorbot.app import run_api
 from investorbot.env import is_simulation
 from investorbot.context import bot_context
-from investorbot.db import init_db
+from investorbot.db import init_db, upgrade_db
 from investorbot.websocket import track_ticker
 
 logger = logging.getLogger(DEFAULT_LOGS_NAME)
@@ -23,6 +24,7 @@ def main():
             buy_coin_routine,
             sell_coin_routine,
             refresh_market_analysis_routine,
+            refresh_multi_horizon_market_analysis_routine,
             bot_context.smtp_service.send_heartbeat,
             run_api,
             bot_context.crypto_service.get_coin_time_series_data,
@@ -32,6 +34,8 @@ def main():
         if not is_simulation():
             commands.append(init_db)
 
+        upgrade_db()
+
         argh.dispatch_commands(commands)
     except EnvironmentError as e:
         logger.fatal(e)
@@ -1,14 +1,21 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, deque
 import logging
 import math
-from typing import List, Tuple
+from threading import Lock
+from typing import Dict, List, Set, Tuple
 import pandas as pd
 from pandas import DataFrame
 import numpy as np
+from numpy import ndarray
 
-from investorbot import env
+from investorbot import env, mappings
 from investorbot.constants import (
     DEFAULT_LOGS_NAME,
     INVESTOR_APP_FLATNESS_THRESHOLD,
+    INVESTOR_APP_MODE_BIN_COUNT,
+    INVESTOR_APP_MODE_COUNT,
+    INVESTOR_APP_SUMMARY_CACHE_SIZE,
     INVESTOR_APP_VOLATILITY_THRESHOLD,
 )
 from investorbot.enums import (
@@ -27,10 +34,31 @@ from investorbot.structs.internal import (
     PositionBalance,
     RatingThreshold,
     SaleValidationResult,
+    SellTrigger,
+    SummaryBatch,
+    TimeSeries,
 )
 
 logger = logging.getLogger(DEFAULT_LOGS_NAME)
 
+VALUE_RATIO_FLOOR = 0.99
+VALUE_RATIO_DECAY_BASE = 0.03
+VALUE_RATIO_DECAY_RATE = 0.01
+
+MAX_VALUE_RATIO_DECAY_PER_HOUR = (
+    VALUE_RATIO_DECAY_BASE
+    * math.log(1.0 / VALUE_RATIO_DECAY_BASE)
+    * VALUE_RATIO_DECAY_RATE
+    / VALUE_RATIO_FLOOR
+)
+"""Upper bound on how far a sellable price can fall per hour relative to itself. The minimum
+acceptable value ratio decays fastest as soon as an order is placed."""
+
+SELL_TRIGGER_REPRICE_INTERVAL_MS = 60 * 1000
+
+RATING_THRESHOLD_HOURS = 24.0
+"""Rating thresholds are tuned for the relative change in value across this many hours."""
+
 
 def __hours_since_order(order: OrderDetail) -> float:
     t_now = env.time.now_in_ms()
@@ -40,10 +68,32 @@ def __hours_since_order(order: OrderDetail) -> float:
     return milliseconds_since_order / (1000 * 60 * 60)
 
 
-def __get_minimum_acceptable_value_ratio(order: OrderDetail) -> float:
+def get_minimum_acceptable_value_ratio(hours_since_order: float) -> float:
     # TODO make this configurable as DecayEquationParameters or similar. High confidence in the
     # market should result in slower decay rate.
-    return 0.99 + 0.03 ** ((0.01 * __hours_since_order(order)) + 1.0)
+    return VALUE_RATIO_FLOOR + VALUE_RATIO_DECAY_BASE ** (
+        (VALUE_RATIO_DECAY_RATE * hours_since_order) + 1.0
+    )
+
+
+def __get_minimum_acceptable_value_ratio(order: OrderDetail) -> float:
+    return get_minimum_acceptable_value_ratio(__hours_since_order(order))
+
+
+def is_trigger_price_sufficient(
+    trigger: SellTrigger, price: float, time_ms: int
+) -> bool:
+    """Same as is_value_ratio_sufficient, as of the given time."""
+    return price / trigger.price_per_coin >= get_minimum_acceptable_value_ratio(
+        convert_ms_time_to_hours(time_ms, trigger.time_created_ms)
+    )
+
+
+def get_sellable_price(trigger: SellTrigger, time_ms: int) -> float:
+    """The lowest price the trigger's coin can be sold at as of the given time."""
+    return trigger.price_per_coin * get_minimum_acceptable_value_ratio(
+        convert_ms_time_to_hours(time_ms, trigger.time_created_ms)
+    )
 
 
 def is_value_ratio_sufficient(value_ratio: float, order: OrderDetail) -> bool:
@@ -60,11 +110,15 @@ def ts_data_count_to_hours(data_count: int) -> float:
     return float((24 / 2880) * data_count)
 
 
+def hours_to_ts_data_count(hours: int | float) -> int:
+    return int((2880 / 24) * hours)
+
+
 def get_trend_value(
-    trend_line_coefficient: float | DataFrame,
-    hour_in_time: float,
-    trend_line_offset: float | DataFrame,
-) -> float | DataFrame:
+    trend_line_coefficient: float | DataFrame | ndarray,
+    hour_in_time: float | ndarray,
+    trend_line_offset: float | DataFrame | ndarray,
+) -> float | DataFrame | ndarray:
     """Get coin value along a given trend line."""
     trend_value = trend_line_coefficient * hour_in_time + trend_line_offset
 
@@ -97,27 +151,37 @@ def get_trend_line_state(trend_line_price_percentage_change: float) -> str:
     return state.value
 
 
+def get_trend_line_states(trend_line_price_percentage_changes: ndarray) -> ndarray:
+    """Vectorized equivalent of get_trend_line_state for an array of percentage changes."""
+    changes = trend_line_price_percentage_changes
+
+    return np.select(
+        [
+            (changes < INVESTOR_APP_FLATNESS_THRESHOLD)
+            & (changes > -INVESTOR_APP_FLATNESS_THRESHOLD),
+            changes >= INVESTOR_APP_FLATNESS_THRESHOLD,
+            changes <= -INVESTOR_APP_FLATNESS_THRESHOLD,
+        ],
+        [
+            TrendLineState.FLAT.value,
+            TrendLineState.RISING.value,
+            TrendLineState.FALLING.value,
+        ],
+        default=TrendLineState.UNKNOWN.value,
+    )
+
+
 # FIXME currently coupled to crypto.com API
 def get_time_series_data_frame(time_series_data: dict) -> Tuple[DataFrame, int]:
     """Ingests JSON time series data in the format [{ 'v': 1.0 't': 1.0 }, ... ], converts this to a
     pandas DataFrame and formats the data so that the time axis is measured in hours as oppose to
     milliseconds.
     """
-    df = pd.DataFrame.from_dict(time_series_data)
-
-    time_value_offset = int(
-        df["t"].iat[-1]
-    )  # Relies on data ordered from most recent to x hours ago.
+    time_series = mappings.valuation_data_to_time_series(time_series_data)
 
-    df["t"] = df["t"].apply(
-        lambda x: convert_ms_time_to_hours(x, time_value_offset)
-    )  # Convert to hours.
-    df["v"] = df["v"].astype(float)
+    df = pd.DataFrame({"t": time_series.t, "v": time_series.v})
 
-    df = df[::-1]
-    df.reset_index(inplace=True, drop=True)
-
-    return df, time_value_offset
+    return df, time_series.time_offset
 
 
 # FIXME currently coupled to crypto.com API
@@ -132,6 +196,110 @@ def get_line_of_best_fit(df: DataFrame):
     return a, b
 
 
+class IncrementalLineOfBestFit:
+    """Maintains the running sums (n, Σt, Σv, Σtv, Σt²) required to calculate a least squares
+    trend line, so the trend line can be refreshed in O(1) as values arrive rather than refitting
+    the entire dataset. Values older than window_size are evicted as new values are appended.
+
+    Gradient and offset are consistent with get_line_of_best_fit, i.e. time is measured in hours
+    and the offset is the trend value at the oldest value currently in the window.
+    """
+
+    window_size: int | None
+    """Maximum number of values to retain. None means values are never evicted automatically."""
+
+    def __init__(self, window_size: int | None = None):
+        self.window_size = window_size
+        self.__window = deque()
+        self.__origin_ms = None
+        self.__evictions = 0
+        self.__reset_sums()
+
+    def __reset_sums(self):
+        self.__sum_t = 0.0
+        self.__sum_v = 0.0
+        self.__sum_tv = 0.0
+        self.__sum_tt = 0.0
+
+    def __add_to_sums(self, t: float, v: float):
+        self.__sum_t += t
+        self.__sum_v += v
+        self.__sum_tv += t * v
+        self.__sum_tt += t * t
+
+    def __rebase(self):
+        """Sums are stored relative to an origin in time. Once the window has completely turned
+        over, move the origin to the oldest value in the window and recalculate the sums - this
+        stops the sums growing indefinitely and losing precision. Amortized cost is O(1).
+        """
+        origin_hours = self.__window[0][0]
+
+        self.__origin_ms += origin_hours * (1000 * 60 * 60)
+        self.__window = deque((t - origin_hours, v) for t, v in self.__window)
+        self.__evictions = 0
+        self.__reset_sums()
+
+        for t, v in self.__window:
+            self.__add_to_sums(t, v)
+
+    @property
+    def count(self) -> int:
+        return len(self.__window)
+
+    @property
+    def time_offset(self) -> int:
+        """Time in milliseconds of the oldest value in the window."""
+        return int(self.__origin_ms + self.__window[0][0] * (1000 * 60 * 60))
+
+    def append(self, time_ms: int, value: float):
+        """Appends a value to the window. Values are expected in chronological order."""
+        if self.__origin_ms is None:
+            self.__origin_ms = float(time_ms)
+
+        t = convert_ms_time_to_hours(time_ms, self.__origin_ms)
+        v = float(value)
+
+        self.__window.append((t, v))
+        self.__add_to_sums(t, v)
+
+        if self.window_size is not None and len(self.__window) > self.window_size:
+            self.evict()
+
+    def evict(self, count: int = 1):
+        """Removes the oldest count values from the window."""
+        for _ in range(min(count, len(self.__window))):
+            t, v = self.__window.popleft()
+
+            self.__sum_t -= t
+            self.__sum_v -= v
+            self.__sum_tv -= t * v
+            self.__sum_tt -= t * t
+            self.__evictions += 1
+
+        if len(self.__window) == 0:
+            self.__origin_ms = None
+            self.__evictions = 0
+            self.__reset_sums()
+        elif self.__evictions >= len(self.__window):
+            self.__rebase()
+
+    def get_line_of_best_fit(self) -> Tuple[float, float]:
+        n = len(self.__window)
+
+        if n < 2:
+            raise ValueError(
+                "At least two values are required to calculate a trend line."
+            )
+
+        denominator = n * self.__sum_tt - self.__sum_t**2
+
+        a = (n * self.__sum_tv - self.__sum_t * self.__sum_v) / denominator
+        b = (self.__sum_v - a * self.__sum_t) / n
+
+        # Shift the offset so it's relative to the oldest value in the window.
+        return a, b + a * self.__window[0][0]
+
+
 # FIXME currently coupled to crypto.com API (main entry-point)
 def get_coin_time_series_summary(
     coin_name: str,
@@ -148,7 +316,7 @@ def get_coin_time_series_summary(
 
     mean = stats["v"].mean()
     std = stats["v"].std()
-    modes = stats["v"].mode()
+    modes = get_modes(stats["v"].to_numpy())
     starting_value = stats["v"].iloc[0]
     dataset_count = len(stats)
 
@@ -182,29 +350,490 @@ def get_coin_time_series_summary(
     )
 
 
+def get_mode_matrix(
+    value_matrix: ndarray,
+    bin_count: int = INVESTOR_APP_MODE_BIN_COUNT,
+    mode_count: int = INVESTOR_APP_MODE_COUNT,
+) -> ndarray:
+    """Coin values are continuous, so almost every value is unique and a traditional mode returns
+    the entire dataset. Instead, each row of the (coins x samples) matrix is binned into a fixed
+    size histogram and the centers of the mode_count most populated bins are returned, most
+    populated first. Rows with fewer populated bins than mode_count are padded with NaN.
+    """
+    coin_count = value_matrix.shape[0]
+    is_valid = ~np.isnan(value_matrix)
+
+    if not is_valid.any():
+        return np.full((coin_count, mode_count), np.nan)
+
+    minimum = np.nanmin(value_matrix, axis=1, initial=np.inf, where=is_valid)[:, None]
+    maximum = np.nanmax(value_matrix, axis=1, initial=-np.inf, where=is_valid)[:, None]
+    value_range = maximum - minimum
+    bin_width = np.where(value_range > 0, value_range / bin_count, 1.0)
+
+    bin_indices = np.clip(
+        np.floor((value_matrix - minimum) / bin_width), 0, bin_count - 1
+    )
+
+    # Offset each row's bins so every histogram can be counted with a single bincount.
+    row_offsets = np.arange(coin_count)[:, None] * bin_count
+    flat_indices = (bin_indices + row_offsets)[is_valid].astype(np.int64)
+    counts = np.bincount(flat_indices, minlength=coin_count * bin_count).reshape(
+        coin_count, bin_count
+    )
+
+    top_bins = np.argsort(-counts, axis=1, kind="stable")[:, :mode_count]
+    top_counts = np.take_along_axis(counts, top_bins, axis=1)
+
+    bin_centers = np.where(
+        value_range > 0, minimum + (top_bins + 0.5) * bin_width, minimum
+    )
+
+    return np.where(top_counts > 0, bin_centers, np.nan)
+
+
+def get_modes(values: ndarray) -> ndarray:
+    """Returns the bounded modes of a single coin's values. See get_mode_matrix."""
+    modes = get_mode_matrix(np.asarray(values, dtype=np.float64)[None, :])[0]
+
+    return modes[~np.isnan(modes)]
+
+
+def get_time_series_matrices(
+    time_series: List[TimeSeries],
+) -> Tuple[ndarray, ndarray, ndarray]:
+    """Stacks time series data for multiple coins into (coins x samples) matrices. Both matrices
+    are ordered from oldest to most recent value. Coins with fewer values are padded with NaN at
+    the start of their row so the most recent values always line up in the final column.
+    """
+    coin_count = len(time_series)
+    sample_count = max((len(series.v) for series in time_series), default=0)
+
+    time_matrix = np.full((coin_count, sample_count), np.nan)
+    value_matrix = np.full((coin_count, sample_count), np.nan)
+    time_offsets = np.array(
+        [series.time_offset for series in time_series], dtype=np.int64
+    )
+
+    for i, series in enumerate(time_series):
+        time_matrix[i, sample_count - len(series.t) :] = series.t
+        value_matrix[i, sample_count - len(series.v) :] = series.v
+
+    return time_matrix, value_matrix, time_offsets
+
+
+def __create_summary_batch(
+    coin_names: List[str],
+    mean: ndarray,
+    std: ndarray,
+    a: ndarray,
+    b: ndarray,
+    starting_values: ndarray,
+    time_offsets: ndarray,
+    dataset_counts: ndarray,
+    modes: ndarray,
+) -> SummaryBatch:
+    """Derives normalized values, trend states and volatility from the basic statistical
+    parameters of each coin."""
+    normalized_line_of_best_fit_coefficients = a / b
+    normalized_std = std / mean
+
+    trend_line_percentage_changes = (
+        get_trend_value(
+            normalized_line_of_best_fit_coefficients,
+            ts_data_count_to_hours(1) * dataset_counts,
+            1,
+        )
+        - 1.0
+    )
+
+    return SummaryBatch(
+        coin_names=coin_names,
+        mean=mean,
+        std=std,
+        line_of_best_fit_coefficient=a,
+        line_of_best_fit_offset=b,
+        starting_value=starting_values,
+        normalized_line_of_best_fit_coefficient=normalized_line_of_best_fit_coefficients,
+        normalized_starting_value=starting_values / b,
+        normalized_std=normalized_std,
+        time_offset=time_offsets,
+        dataset_count=dataset_counts,
+        modes=modes,
+        trend_state=get_trend_line_states(trend_line_percentage_changes),
+        is_volatile=np.abs(normalized_std) >= INVESTOR_APP_VOLATILITY_THRESHOLD,
+    )
+
+
+def get_summary_batch(
+    coin_names: List[str],
+    time_matrix: ndarray,
+    value_matrix: ndarray,
+    time_offsets: ndarray,
+) -> SummaryBatch:
+    """Batch equivalent of get_coin_time_series_summary. Takes (coins x samples) matrices as
+    produced by get_time_series_matrices and calculates the statistical parameters for every coin
+    at once, rather than building a DataFrame and fitting a trend line per coin."""
+
+    coin_count = len(coin_names)
+
+    dataset_counts = np.count_nonzero(~np.isnan(value_matrix), axis=1)
+
+    mean = np.nanmean(value_matrix, axis=1)
+    std = np.nanstd(value_matrix, axis=1, ddof=1)
+
+    # Least squares line of best fit for every row, equivalent to np.polyfit(t, v, 1).
+    time_mean = np.nanmean(time_matrix, axis=1)
+    time_deviation = time_matrix - time_mean[:, None]
+    value_deviation = value_matrix - mean[:, None]
+
+    a = np.nansum(time_deviation * value_deviation, axis=1) / np.nansum(
+        time_deviation**2, axis=1
+    )
+    b = mean - a * time_mean
+
+    starting_values = value_matrix[
+        np.arange(coin_count), value_matrix.shape[1] - dataset_counts
+    ]
+
+    return __create_summary_batch(
+        coin_names,
+        mean,
+        std,
+        a,
+        b,
+        starting_values,
+        time_offsets,
+        dataset_counts,
+        get_mode_matrix(value_matrix),
+    )
+
+
+def get_multi_horizon_summary_batches(
+    coin_names: List[str],
+    time_matrix: ndarray,
+    value_matrix: ndarray,
+    time_offsets: ndarray,
+    horizons: List[float],
+) -> Dict[float, SummaryBatch]:
+    """Calculates summaries for several time horizons (in hours) from a single set of matrices as
+    produced by get_time_series_matrices. Each horizon covers the most recent values of each coin.
+
+    Prefix sums of t, v, tv, t² and v² are calculated once, so each additional horizon only costs
+    O(1) per coin for the trend line, mean and standard deviation. Modes still need a histogram of
+    the values within each horizon."""
+
+    coin_count, sample_count = value_matrix.shape
+    rows = np.arange(coin_count)
+
+    is_valid = ~np.isnan(value_matrix)
+    total_counts = np.count_nonzero(is_valid, axis=1)
+
+    # Values are shifted by the most recent value of each coin to avoid losing precision whilst
+    # summing squares.
+    value_shift = value_matrix[:, -1] if sample_count > 0 else np.zeros(coin_count)
+    t = np.where(is_valid, time_matrix, 0.0)
+    v = np.where(is_valid, value_matrix - value_shift[:, None], 0.0)
+
+    def prefix_sum(matrix: ndarray) -> ndarray:
+        prefix = np.zeros((coin_count, sample_count + 1))
+        np.cumsum(matrix, axis=1, out=prefix[:, 1:])
+
+        return prefix
+
+    prefix_n = prefix_sum(is_valid.astype(np.float64))
+    prefix_t = prefix_sum(t)
+    prefix_v = prefix_sum(v)
+    prefix_tv = prefix_sum(t * v)
+    prefix_tt = prefix_sum(t * t)
+    prefix_vv = prefix_sum(v * v)
+
+    batches = {}
+
+    for hours in horizons:
+        window_size = min(hours_to_ts_data_count(hours), sample_count)
+        start = sample_count - window_size
+
+        def window_sum(prefix: ndarray) -> ndarray:
+            return prefix[:, -1] - prefix[:, start]
+
+        n = window_sum(prefix_n)
+        sum_t = window_sum(prefix_t)
+        sum_v = window_sum(prefix_v)
+        sum_tv = window_sum(prefix_tv)
+        sum_tt = window_sum(prefix_tt)
+        sum_vv = window_sum(prefix_vv)
+
+        shifted_mean = sum_v / n
+        variance = (sum_vv - n * shifted_mean**2) / (n - 1)
+
+        a = (n * sum_tv - sum_t * sum_v) / (n * sum_tt - sum_t**2)
+        shifted_b = (sum_v - a * sum_t) / n
+
+        # Trend line offsets are relative to the oldest value in each window.
+        window_start = np.maximum(start, sample_count - total_counts)
+        window_start_time = time_matrix[
+            rows, np.minimum(window_start, sample_count - 1)
+        ]
+
+        batches[hours] = __create_summary_batch(
+            coin_names,
+            shifted_mean + value_shift,
+            np.sqrt(np.maximum(variance, 0.0)),
+            a,
+            shifted_b + value_shift + a * window_start_time,
+            value_matrix[rows, np.minimum(window_start, sample_count - 1)],
+            time_offsets + np.rint(window_start_time * 1000 * 60 * 60).astype(np.int64),
+            n.astype(np.int64),
+            get_mode_matrix(value_matrix[:, start:]),
+        )
+
+    return batches
+
+
+class SummaryCache:
+    """Least recently used cache of single coin summaries. Entries are keyed by coin name, the
+    number of hours summarized and the time of the most recent value in the time series, so a coin
+    is only summarized again once new data is available for it."""
+
+    def __init__(self, max_size: int = INVESTOR_APP_SUMMARY_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.__entries: OrderedDict[Tuple[str, float, int], SummaryBatch] = (
+            OrderedDict()
+        )
+        self.__lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __get(self, key: Tuple[str, float, int]) -> SummaryBatch | None:
+        summary = self.__entries.get(key)
+
+        if summary is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.__entries.move_to_end(key)
+
+        return summary
+
+    def __put(self, key: Tuple[str, float, int], summary: SummaryBatch):
+        self.__entries[key] = summary
+        self.__entries.move_to_end(key)
+
+        while len(self.__entries) > self.max_size:
+            self.__entries.popitem(last=False)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_summary_batch(
+        self, coin_names: List[str], time_series: List[TimeSeries], hours: float
+    ) -> SummaryBatch:
+        """Returns the same result as get_summary_batch for the given time series, only
+        summarizing coins that aren't already cached."""
+        keys = [
+            (coin_name, float(hours), series.latest_time_ms)
+            for coin_name, series in zip(coin_names, time_series)
+        ]
+
+        with self.__lock:
+            summaries = [self.__get(key) for key in keys]
+            missing = [i for i, summary in enumerate(summaries) if summary is None]
+
+            if len(missing) > 0:
+                new_summaries = get_summary_batch(
+                    [coin_names[i] for i in missing],
+                    *get_time_series_matrices([time_series[i] for i in missing]),
+                )
+
+                for j, i in enumerate(missing):
+                    summaries[i] = new_summaries.take([j])
+                    self.__put(keys[i], summaries[i])
+
+        if len(summaries) == 0:
+            return get_summary_batch([], *get_time_series_matrices([]))
+
+        # Concatenating copies each cached summary, so later analysis steps can't modify the cache.
+        return SummaryBatch.concatenate(summaries)
+
+
+class SellTriggerQueue:
+    """Sell triggers per coin, ordered by the price at which each becomes sellable, so every
+    trigger met by a new price is found by bisection rather than by checking each one. Sellable
+    prices only ever fall as the minimum acceptable value ratio decays - a price computed earlier
+    is at most MAX_VALUE_RATIO_DECAY_PER_HOUR too high per hour since. Only triggers within that
+    margin of the new price need checking, and a coin's prices are recomputed once they're older
+    than reprice_interval_ms to keep the margin small.
+
+    Triggers are claimed by whoever pops them, so a trigger can't be sold twice whilst its sale is
+    in flight. Failed sales should be released so the trigger can be added again, and successful
+    sales marked as sold so it never can be."""
+
+    def __init__(self, reprice_interval_ms: int = SELL_TRIGGER_REPRICE_INTERVAL_MS):
+        self.reprice_interval_ms = reprice_interval_ms
+        self.__triggers: Dict[str, SellTrigger] = {}
+        self.__sellable_prices: Dict[str, float] = {}
+        self.__prices_by_coin: Dict[str, List[Tuple[float, str]]] = {}
+        self.__priced_at: Dict[str, int] = {}
+        self.__claimed: Set[str] = set()
+        self.__sold: Set[str] = set()
+        self.__lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.__triggers)
+
+    def __contains__(self, buy_order_id: str) -> bool:
+        return buy_order_id in self.__triggers
+
+    def __add(self, trigger: SellTrigger):
+        sellable_price = get_sellable_price(
+            trigger, self.__priced_at[trigger.coin_name]
+        )
+
+        self.__triggers[trigger.buy_order_id] = trigger
+        self.__sellable_prices[trigger.buy_order_id] = sellable_price
+
+        insort(
+            self.__prices_by_coin.setdefault(trigger.coin_name, []),
+            (sellable_price, trigger.buy_order_id),
+        )
+
+    def __remove(self, buy_order_id: str):
+        trigger = self.__triggers.pop(buy_order_id, None)
+
+        if trigger is None:
+            return
+
+        prices = self.__prices_by_coin[trigger.coin_name]
+        sellable_price = self.__sellable_prices.pop(buy_order_id)
+
+        del prices[bisect_left(prices, (sellable_price, buy_order_id))]
+
+        if len(prices) == 0:
+            del self.__prices_by_coin[trigger.coin_name]
+            del self.__priced_at[trigger.coin_name]
+
+    def __reprice(self, coin_name: str, time_ms: int):
+        triggers = [
+            self.__triggers[buy_order_id]
+            for _, buy_order_id in self.__prices_by_coin.pop(coin_name)
+        ]
+
+        self.__priced_at[coin_name] = time_ms
+
+        for trigger in triggers:
+            self.__add(trigger)
+
+    def add(self, trigger: SellTrigger, time_ms: int) -> bool:
+        """Adds or replaces a trigger. Claimed triggers are left alone until released, and sold
+        triggers are never added again."""
+        with self.__lock:
+            if (
+                trigger.buy_order_id in self.__claimed
+                or trigger.buy_order_id in self.__sold
+            ):
+                return False
+
+            self.__remove(trigger.buy_order_id)
+            self.__priced_at.setdefault(trigger.coin_name, time_ms)
+            self.__add(trigger)
+
+            return True
+
+    def remove(self, buy_order_id: str):
+        with self.__lock:
+            self.__remove(buy_order_id)
+
+    def release(self, buy_order_id: str):
+        with self.__lock:
+            self.__claimed.discard(buy_order_id)
+
+    def mark_sold(self, buy_order_id: str):
+        """Releases a claimed trigger whose sale succeeded. The routine checking buy orders may
+        have read the order before it was sold, so the trigger can't be added again."""
+        with self.__lock:
+            self.__claimed.discard(buy_order_id)
+            self.__sold.add(buy_order_id)
+
+    def prune_sold(self, open_buy_order_ids: Set[str]):
+        """Forgets sold triggers whose buy orders are no longer open - the database keeps them from
+        being read, and so added, again."""
+        with self.__lock:
+            self.__sold &= open_buy_order_ids
+
+    def pop_triggered(
+        self, coin_name: str, price: float, time_ms: int
+    ) -> List[SellTrigger]:
+        """Removes and claims every trigger for the coin that's sellable at the given price."""
+        with self.__lock:
+            if coin_name not in self.__prices_by_coin:
+                return []
+
+            if time_ms - self.__priced_at[coin_name] > self.reprice_interval_ms:
+                self.__reprice(coin_name, time_ms)
+
+            hours_since_priced = convert_ms_time_to_hours(
+                max(time_ms - self.__priced_at[coin_name], 0)
+            )
+            max_decay = min(MAX_VALUE_RATIO_DECAY_PER_HOUR * hours_since_priced, 0.5)
+
+            prices = self.__prices_by_coin[coin_name]
+            end = bisect_right(prices, price / (1.0 - max_decay), key=lambda x: x[0])
+
+            triggered = [
+                self.__triggers[buy_order_id]
+                for _, buy_order_id in prices[:end]
+                if is_trigger_price_sufficient(
+                    self.__triggers[buy_order_id], price, time_ms
+                )
+            ]
+
+            for trigger in triggered:
+                self.__remove(trigger.buy_order_id)
+                self.__claimed.add(trigger.buy_order_id)
+
+            return triggered
+
+
+def get_coin_time_series_summaries(
+    coin_names: List[str],
+    time_matrix: ndarray,
+    value_matrix: ndarray,
+    time_offsets: ndarray,
+) -> List[TimeSeriesSummary]:
+    """Same as get_summary_batch, but returns TimeSeriesSummary models."""
+    return get_summary_batch(
+        coin_names, time_matrix, value_matrix, time_offsets
+    ).to_time_series_summaries()
+
+
 def get_market_analysis_rating(
-    ts_data: List[TimeSeriesSummary], rating_thresholds: List[RatingThreshold]
+    summaries: SummaryBatch, rating_thresholds: List[RatingThreshold]
 ) -> MarketCharacterization:
     """For a given set of time series summaries, calculate the market trend across all coins."""
 
     ratings = []
 
-    df = pd.DataFrame.from_records([ts_entry.__dict__ for ts_entry in ts_data])
-
-    df["value_at_zero"] = get_trend_value(
-        df["line_of_best_fit_coefficient"], 0.0, df["line_of_best_fit_offset"]
+    value_at_zero = get_trend_value(
+        summaries.line_of_best_fit_coefficient, 0.0, summaries.line_of_best_fit_offset
     )
 
-    # TODO don't hardcode 24 hours here
-    df["value_at_now"] = get_trend_value(
-        df["line_of_best_fit_coefficient"], 24.0, df["line_of_best_fit_offset"]
+    # Evaluate each trend line across RATING_THRESHOLD_HOURS whatever horizon it was fitted to, so
+    # every horizon is rated against the same thresholds.
+    value_at_now = get_trend_value(
+        summaries.line_of_best_fit_coefficient,
+        RATING_THRESHOLD_HOURS,
+        summaries.line_of_best_fit_offset,
     )
 
-    # This algebraic expression applies this equation to all rows in the pandas DataFrame (if you're
-    # not familiar with pandas).
-    df["percentage_change"] = (df["value_at_now"] / df["value_at_zero"]) - 1.0
-
-    median_value = df["percentage_change"].median()
+    median_value = np.nanmedian((value_at_now / value_at_zero) - 1.0)
 
     for rating_threshold in rating_thresholds:
         if rating_threshold.is_in_bounds(median_value):
@@ -220,94 +849,70 @@ def get_market_analysis_rating(
     return ratings[0]
 
 
-def get_outliers_in_time_series_data(
-    ts_data: List[TimeSeriesSummary], property_to_check: str, value_to_set: str
-) -> List[TimeSeriesSummary]:
-
-    ordered_data = list(sorted(ts_data, key=lambda x: getattr(x, property_to_check)))
+def get_outlier_mask(values: ndarray) -> ndarray:
+    """Flags values lying more than 1.5 times the inter-quartile range outside of the first and
+    third quartiles. Quartiles are selected with np.partition rather than fully sorting the data.
+    """
+    count = len(values)
 
-    ts_count = len(ordered_data)
+    if count == 0:
+        return np.zeros(0, dtype=bool)
 
     # flooring here to account for zero index.
-    first_quartile_index = math.floor(0.25 * ts_count)
-    third_quartile_index = math.floor(0.75 * ts_count)
+    first_quartile_index = math.floor(0.25 * count)
+    third_quartile_index = math.floor(0.75 * count)
+
+    partitioned_values = np.partition(
+        values, (first_quartile_index, third_quartile_index)
+    )
 
-    first_quartile = getattr(ordered_data[first_quartile_index], property_to_check)
-    third_quartile = getattr(ordered_data[third_quartile_index], property_to_check)
+    first_quartile = partitioned_values[first_quartile_index]
+    third_quartile = partitioned_values[third_quartile_index]
 
     inter_quartile_range = third_quartile - first_quartile
 
     lower_boundary = first_quartile - 1.5 * inter_quartile_range
     upper_boundary = third_quartile + 1.5 * inter_quartile_range
 
-    for data in ordered_data:
-        if (
-            getattr(data, property_to_check) > upper_boundary
-            or getattr(data, property_to_check) < lower_boundary
-        ):
-            setattr(data, value_to_set, True)
-
-    return ordered_data
+    return (values > upper_boundary) | (values < lower_boundary)
 
 
-def assign_outlier_properties(
-    ts_summaries: TimeSeriesSummary,
-) -> List[TimeSeriesSummary]:
-    ts_summaries_first_iter = get_outliers_in_time_series_data(
-        ts_summaries,
-        TimeSeriesSummary.normalized_line_of_best_fit_coefficient.key,
-        TimeSeriesSummary.is_outlier_in_gradient.key,
+def assign_outlier_properties(summaries: SummaryBatch) -> SummaryBatch:
+    """Flags coins with any kind of weird property using boolean masks. Deviation outliers are only
+    checked for coins that aren't outliers in gradient."""
+    summaries.is_outlier_in_gradient = get_outlier_mask(
+        summaries.normalized_line_of_best_fit_coefficient
     )
-
-    ts_summaries_second_iter = get_outliers_in_time_series_data(
-        ts_summaries_first_iter,
-        TimeSeriesSummary.normalized_starting_value.key,
-        TimeSeriesSummary.is_outlier_in_offset.key,
+    summaries.is_outlier_in_offset = get_outlier_mask(
+        summaries.normalized_starting_value
     )
 
-    gradient_outliers = [
-        ts_summary
-        for ts_summary in ts_summaries_second_iter
-        if ts_summary.is_outlier_in_gradient
-    ]
-    deviation_candidates = [
-        ts_summary
-        for ts_summary in ts_summaries_second_iter
-        if not ts_summary.is_outlier_in_gradient
-    ]
+    is_nominal = ~summaries.is_outlier_in_gradient
 
-    deviation_subset = get_outliers_in_time_series_data(
-        deviation_candidates,
-        TimeSeriesSummary.normalized_std.key,
-        TimeSeriesSummary.is_outlier_in_deviation.key,
+    summaries.is_outlier_in_deviation = np.zeros(len(summaries), dtype=bool)
+    summaries.is_outlier_in_deviation[is_nominal] = get_outlier_mask(
+        summaries.normalized_std[is_nominal]
     )
 
-    return gradient_outliers + deviation_subset
+    return summaries
 
 
 def assign_weighted_rankings(
-    summaries: List[TimeSeriesSummary], options: CoinSelectionCriteria
-) -> int:
-    for summary in summaries:
-        ranking = summary.initial_ranking
-
-        params = [
-            options.coin_should_be_volatile and summary.is_volatile,
-            options.coin_should_be_nominal and not summary.is_outlier_in_gradient,
-            options.coin_should_be_an_outlier and summary.is_outlier_in_gradient,
-            options.trend_line_should_be_falling
-            and summary.trend_state == TrendLineState.FALLING,
-            options.trend_line_should_be_flat
-            and summary.trend_state == TrendLineState.FLAT,
-            options.trend_line_should_be_rising
-            and summary.trend_state == TrendLineState.RISING,
-        ]
-
-        for param in params:
-            if param:
-                ranking += 100
+    summaries: SummaryBatch, options: CoinSelectionCriteria
+) -> SummaryBatch:
+    params = [
+        options.coin_should_be_volatile & summaries.is_volatile,
+        options.coin_should_be_nominal & ~summaries.is_outlier_in_gradient,
+        options.coin_should_be_an_outlier & summaries.is_outlier_in_gradient,
+        options.trend_line_should_be_falling
+        & summaries.is_trend_state(TrendLineState.FALLING),
+        options.trend_line_should_be_flat
+        & summaries.is_trend_state(TrendLineState.FLAT),
+        options.trend_line_should_be_rising
+        & summaries.is_trend_state(TrendLineState.RISING),
+    ]
 
-        summary.final_ranking = ranking
+    summaries.final_ranking = summaries.initial_ranking + 100 * np.sum(params, axis=0)
 
     return summaries
 
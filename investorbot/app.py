@@ -1,19 +1,33 @@
 import atexit
+from dataclasses import asdict
 from datetime import datetime, timedelta
+import logging
 from flask import Flask, abort, render_template, request
+from typing import List
 from flask_cors import CORS, cross_origin
 
+from investorbot.constants import (
+    DEFAULT_LOGS_NAME,
+    INVESTOR_APP_LIVE_SELLING,
+    INVESTOR_APP_STREAM_MARKET_DATA,
+    INVESTOR_APP_STREAM_USER_DATA,
+)
 from investorbot.context import bot_context
 from investorbot.db import init_db
 from investorbot.env import is_crypto_dot_com, is_simulation
 from investorbot import routines
 from apscheduler.schedulers.background import BackgroundScheduler
 
+from investorbot.integrations.cryptodotcom.enums import OrderDetailStatus
+from investorbot.integrations.cryptodotcom.services import CryptoService
+from investorbot.integrations.cryptodotcom.structs import OrderDetailJson
 from investorbot.integrations.simulation.services import SimulatedCryptoService
-from investorbot.models import CashBalance
+from investorbot.models import CashBalance, camel_case
 
 # from investorbot.smtp import send_test_email
 
+logger = logging.getLogger(DEFAULT_LOGS_NAME)
+
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "http://localhost:5371"}})
 
@@ -22,6 +36,28 @@ def analysis_routine():
     return routines.refresh_market_analysis_routine(hours=24)
 
 
+def stats_as_dict(stats, *properties: str) -> dict:
+    """Converts a stats struct to the same camel case keys as models' as_dict, along with the given
+    derived properties."""
+    values = {
+        **asdict(stats),
+        **{property: getattr(stats, property) for property in properties},
+    }
+
+    return {camel_case(name): value for name, value in values.items()}
+
+
+def run_job_on_filled_orders(job):
+    """Runs the given job straight away whenever an order is filled, rather than waiting for its
+    next scheduled run."""
+
+    def on_orders(orders: List[OrderDetailJson]):
+        if any(order.status == OrderDetailStatus.FILLED for order in orders):
+            job.modify(next_run_time=datetime.now())
+
+    return on_orders
+
+
 def run_api(host="127.0.0.1", port=5000, persist_data=False):
     smtp_service = bot_context.smtp_service
     data_provider = None
@@ -32,6 +68,25 @@ def run_api(host="127.0.0.1", port=5000, persist_data=False):
     if not persist_data:
         init_db()
 
+    is_crypto_service = isinstance(bot_context.crypto_service, CryptoService)
+
+    # Real sell orders are only ever placed automatically once explicitly opted in to.
+    live_selling = INVESTOR_APP_LIVE_SELLING and is_crypto_service
+
+    if live_selling:
+        logger.warning(
+            "Live automated selling is enabled - the sell routine will place real sell orders "
+            + "on Crypto.com."
+        )
+
+    if INVESTOR_APP_STREAM_MARKET_DATA and is_crypto_service:
+        # Sell triggers are checked against every pushed price, and triggered coins are sold on
+        # the sell worker thread.
+        bot_context.crypto_service.start_market_data_stream(
+            on_trades=routines.queue_triggered_coin_sales if live_selling else None
+        )
+        atexit.register(bot_context.crypto_service.stop_market_data_stream)
+
     scheduler = BackgroundScheduler()
 
     market_analysis_job = scheduler.add_job(
@@ -43,7 +98,7 @@ def run_api(host="127.0.0.1", port=5000, persist_data=False):
 
     market_analysis_job.modify(next_run_time=datetime.now() + timedelta(seconds=25))
 
-    scheduler.add_job(
+    heartbeat_job = scheduler.add_job(
         func=smtp_service.send_heartbeat,
         trigger="interval",
         minutes=15,
@@ -68,6 +123,15 @@ def run_api(host="127.0.0.1", port=5000, persist_data=False):
 
     sell_coin_job.modify(next_run_time=datetime.now() + timedelta(seconds=35))
 
+    # Filled buy orders are sold as soon as the fill is pushed rather than on the next poll. The
+    # sell routine then adds a sell trigger for each filled order, checked against every pushed
+    # price.
+    if INVESTOR_APP_STREAM_USER_DATA and is_crypto_service:
+        bot_context.crypto_service.start_user_data_stream(
+            on_orders=run_job_on_filled_orders(sell_coin_job) if live_selling else None
+        )
+        atexit.register(bot_context.crypto_service.stop_user_data_stream)
+
     if is_simulation():
         job = scheduler.add_job(
             func=data_provider.run_in_real_time,
@@ -77,7 +141,13 @@ def run_api(host="127.0.0.1", port=5000, persist_data=False):
         )
         job.modify(next_run_time=datetime.now() + timedelta(seconds=5))
 
-    if not is_crypto_dot_com():
+    if not is_crypto_dot_com() or live_selling:
+        if is_crypto_dot_com():
+            # Against crypto.com every other routine is run explicitly via CLI - only the sell
+            # routine is scheduled, and only once live selling has been opted in to.
+            for job in [market_analysis_job, heartbeat_job, buy_coin_job]:
+                job.pause()
+
         scheduler.start()
 
         # Shut down the scheduler when exiting the app
@@ -109,6 +179,10 @@ def index():
             "link": "/get-balance-history",
             "description": "show historical wallet value.",
         },
+        {
+            "link": "/get-client-stats",
+            "description": "show Crypto.com API client statistics.",
+        },
     ]
 
     return render_template("index.html", internal_links=internal_links)
@@ -132,7 +206,10 @@ def get_valuation():
 
 @app.route("/get-market-analysis")
 def get_market_analysis():
-    analysis = bot_context.db_service.get_market_analysis()[0]
+    # Several horizons may be stored, so default to the 24 hour market analysis.
+    hours = request.args.get("hours", 24.0, type=float)
+
+    analysis = bot_context.db_service.get_market_analysis(hours)[0]
 
     if analysis is None:
         return abort(404)
@@ -160,3 +237,30 @@ def get_balance_history():
     balances = [balance.as_dict() for balance in balance_history]
 
     return balances
+
+
+@app.route("/get-client-stats")
+def get_client_stats():
+    crypto_service = bot_context.crypto_service
+
+    if not isinstance(crypto_service, CryptoService):
+        return abort(404)
+
+    return {
+        "connections": [
+            stats_as_dict(stats, "reused_connection_count")
+            for stats in crypto_service.get_connection_stats()
+        ],
+        "rateLimits": [
+            stats_as_dict(stats, "mean_wait_seconds")
+            for stats in crypto_service.get_rate_limit_stats()
+        ],
+        "decoding": [
+            stats_as_dict(stats, "mean_decode_seconds")
+            for stats in crypto_service.get_decode_stats()
+        ],
+        "streams": [
+            stats_as_dict(stats, "mean_backfill_seconds")
+            for stats in crypto_service.get_stream_stats()
+        ],
+    }
@@ -13,6 +13,94 @@ INVESTOR_APP_VOLATILITY_THRESHOLD = float(
     if os.environ.get("INVESTOR_APP_VOLATILITY_THRESHOLD") is not None
     else 0.03
 )
+INVESTOR_APP_MODE_BIN_COUNT = int(
+    os.environ.get("INVESTOR_APP_MODE_BIN_COUNT")
+    if os.environ.get("INVESTOR_APP_MODE_BIN_COUNT") is not None
+    else 100
+)
+INVESTOR_APP_MODE_COUNT = int(
+    os.environ.get("INVESTOR_APP_MODE_COUNT")
+    if os.environ.get("INVESTOR_APP_MODE_COUNT") is not None
+    else 3
+)
+INVESTOR_APP_SUMMARY_CACHE_SIZE = int(
+    os.environ.get("INVESTOR_APP_SUMMARY_CACHE_SIZE")
+    if os.environ.get("INVESTOR_APP_SUMMARY_CACHE_SIZE") is not None
+    else 512
+)
+INVESTOR_APP_FETCH_CONCURRENCY = int(
+    os.environ.get("INVESTOR_APP_FETCH_CONCURRENCY")
+    if os.environ.get("INVESTOR_APP_FETCH_CONCURRENCY") is not None
+    else 8
+)
+INVESTOR_APP_TICKER_MAX_AGE_SECONDS = float(
+    os.environ.get("INVESTOR_APP_TICKER_MAX_AGE_SECONDS")
+    if os.environ.get("INVESTOR_APP_TICKER_MAX_AGE_SECONDS") is not None
+    else 10.0
+)
+INVESTOR_APP_HTTP_POOL_SIZE = int(
+    os.environ.get("INVESTOR_APP_HTTP_POOL_SIZE")
+    if os.environ.get("INVESTOR_APP_HTTP_POOL_SIZE") is not None
+    else max(10, INVESTOR_APP_FETCH_CONCURRENCY)
+)
+INVESTOR_APP_HTTP_CONNECT_TIMEOUT = float(
+    os.environ.get("INVESTOR_APP_HTTP_CONNECT_TIMEOUT")
+    if os.environ.get("INVESTOR_APP_HTTP_CONNECT_TIMEOUT") is not None
+    else 3.05
+)
+INVESTOR_APP_HTTP_READ_TIMEOUT = float(
+    os.environ.get("INVESTOR_APP_HTTP_READ_TIMEOUT")
+    if os.environ.get("INVESTOR_APP_HTTP_READ_TIMEOUT") is not None
+    else 10.0
+)
+INVESTOR_APP_HTTP_RETRY_COUNT = int(
+    os.environ.get("INVESTOR_APP_HTTP_RETRY_COUNT")
+    if os.environ.get("INVESTOR_APP_HTTP_RETRY_COUNT") is not None
+    else 3
+)
+INVESTOR_APP_HTTP_RETRY_BACKOFF = float(
+    os.environ.get("INVESTOR_APP_HTTP_RETRY_BACKOFF")
+    if os.environ.get("INVESTOR_APP_HTTP_RETRY_BACKOFF") is not None
+    else 0.5
+)
+INVESTOR_APP_PUBLIC_MARKET_RATE_LIMIT = float(
+    os.environ.get("INVESTOR_APP_PUBLIC_MARKET_RATE_LIMIT")
+    if os.environ.get("INVESTOR_APP_PUBLIC_MARKET_RATE_LIMIT") is not None
+    else 100.0
+)
+INVESTOR_APP_PRIVATE_ORDER_RATE_LIMIT = float(
+    os.environ.get("INVESTOR_APP_PRIVATE_ORDER_RATE_LIMIT")
+    if os.environ.get("INVESTOR_APP_PRIVATE_ORDER_RATE_LIMIT") is not None
+    else 150.0
+)
+INVESTOR_APP_PRIVATE_BALANCE_RATE_LIMIT = float(
+    os.environ.get("INVESTOR_APP_PRIVATE_BALANCE_RATE_LIMIT")
+    if os.environ.get("INVESTOR_APP_PRIVATE_BALANCE_RATE_LIMIT") is not None
+    else 30.0
+)
+INVESTOR_APP_PRIVATE_ORDER_HISTORY_RATE_LIMIT = float(
+    os.environ.get("INVESTOR_APP_PRIVATE_ORDER_HISTORY_RATE_LIMIT")
+    if os.environ.get("INVESTOR_APP_PRIVATE_ORDER_HISTORY_RATE_LIMIT") is not None
+    else 1.0
+)
+INVESTOR_APP_STREAM_MARKET_DATA = (
+    os.environ.get("INVESTOR_APP_STREAM_MARKET_DATA", "false").lower() == "true"
+)
+INVESTOR_APP_STREAM_USER_DATA = (
+    os.environ.get("INVESTOR_APP_STREAM_USER_DATA", "false").lower() == "true"
+)
+INVESTOR_APP_LIVE_SELLING = (
+    os.environ.get("INVESTOR_APP_LIVE_SELLING", "false").lower() == "true"
+)
+"""Opts in to run_api selling automatically against Crypto.com - i.e. placing real sell orders
+from the scheduled sell routine and from streamed prices."""
+INVESTOR_APP_JSON_BACKEND = os.environ.get("INVESTOR_APP_JSON_BACKEND")
+INVESTOR_APP_CAPTURE_MODE = os.environ.get("INVESTOR_APP_CAPTURE_MODE")
+INVESTOR_APP_CAPTURE_PATH = (
+    os.environ.get("INVESTOR_APP_CAPTURE_PATH")
+    if os.environ.get("INVESTOR_APP_CAPTURE_PATH") is not None
+    else "./api/exchange.capture"
+)
 INVESTOR_APP_DB_PATH = f"{INVESTOR_APP_PATH}app.db"
 INVESTOR_APP_DB_CONNECTION = f"sqlite:///{INVESTOR_APP_DB_PATH}"
 
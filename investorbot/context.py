@@ -1,6 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 import logging
 
+from investorbot.analysis import SellTriggerQueue, SummaryCache
 from investorbot.constants import (
     DEFAULT_LOGS_NAME,
     INVESTOR_APP_DB_CONNECTION,
@@ -51,6 +53,9 @@ class BotContext:
     __bot_db_service: BotDbService = None
     __crypto_service: ICryptoService = None
     __smtp_service: SmtpService = None
+    __summary_cache: SummaryCache = None
+    __sell_triggers: SellTriggerQueue = None
+    __sell_executor: ThreadPoolExecutor = None
 
     @property
     def db_service(self) -> BotDbService:
@@ -89,6 +94,34 @@ class BotContext:
 
         return crypto_service
 
+    @property
+    def summary_cache(self) -> SummaryCache:
+        """Time series summaries from previous market analyses, shared across routine runs."""
+        if self.__summary_cache is None:
+            self.__summary_cache = SummaryCache()
+
+        return self.__summary_cache
+
+    @property
+    def sell_triggers(self) -> SellTriggerQueue:
+        """Filled buy orders awaiting a price high enough to sell at, shared between the sell
+        routine and any price stream."""
+        if self.__sell_triggers is None:
+            self.__sell_triggers = SellTriggerQueue()
+
+        return self.__sell_triggers
+
+    @property
+    def sell_executor(self) -> ThreadPoolExecutor:
+        """A single worker thread that places sell orders for triggers popped by a price stream,
+        so sales are made one at a time without blocking the stream."""
+        if self.__sell_executor is None:
+            self.__sell_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="sell_worker"
+            )
+
+        return self.__sell_executor
+
     @property
     def smtp_service(self):
         return self.__smtp_service if self.__smtp_service is not None else SmtpService()
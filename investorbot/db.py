@@ -79,6 +79,18 @@ def get_market_analysis_ratings():
     ]
 
 
+def upgrade_db():
+    """Brings an existing application database up to date with the models, so databases created
+    before a column was added don't fail on their first query."""
+    if not path.exists(INVESTOR_APP_DB_PATH):
+        return
+
+    added_columns = bot_context.db_service.upgrade()
+
+    if len(added_columns) > 0:
+        logger.info(f"Added columns to the app database: {', '.join(added_columns)}")
+
+
 def init_db():
     app_service = bot_context.db_service
     crypto_service = bot_context.crypto_service
@@ -6,6 +6,22 @@ class AppIntegration(StrEnum):
     CRYPTODOTCOM = "CRYPTODOTCOM"
 
 
+class CaptureMode(StrEnum):
+    """Whether exchange responses are recorded to, or replayed from, a capture log."""
+
+    OFF = "OFF"
+    RECORD = "RECORD"
+    REPLAY = "REPLAY"
+
+
+class BuyOrderState(StrEnum):
+    """Lifecycle of a buy order placed by the app - OPEN buy orders are awaiting sale."""
+
+    OPEN = "OPEN"
+    SOLD = "SOLD"
+    CANCELED = "CANCELED"
+
+
 class OrderStatus(StrEnum):
     COMPLETED = "COMPLETED"
     CANCELED = "CANCELED"
@@ -4,6 +4,30 @@ import os
 CRYPTO_BASE_URL = "https://api.crypto.com/exchange/v1/"
 CRYPTO_MARKET_URL = f"{CRYPTO_BASE_URL}public/"
 CRYPTO_USER_URL = f"{CRYPTO_BASE_URL}private/"
+CRYPTO_WEBSOCKET_MARKET_URL = "wss://stream.crypto.com/exchange/v1/market"
+CRYPTO_WEBSOCKET_USER_URL = "wss://stream.crypto.com/exchange/v1/user"
+
+CRYPTO_WEBSOCKET_SUBSCRIPTION_SIZE = 100
+"""The number of channels subscribed to per websocket request."""
+
+CRYPTO_VALUATION_SAMPLE_INTERVAL_MS = 30 * 1000
+"""public/get-valuations samples roughly every 30 seconds - see get_valuation_method."""
+
+CRYPTO_ORDER_LIST_MAX_SIZE = 10
+"""The maximum number of orders private/create-order-list accepts per request."""
+
+CRYPTO_ORDER_HISTORY_PAGE_SIZE = 100
+"""The maximum number of orders private/get-order-history returns per request."""
+
+CRYPTO_ORDER_HISTORY_WINDOW_MS = 24 * 60 * 60 * 1000
+"""The time window requested per private/get-order-history page - the API's default of 1 day."""
+
+CRYPTO_ORDER_HISTORY_MAX_PAGES = int(
+    os.environ.get("CRYPTO_ORDER_HISTORY_MAX_PAGES")
+    if os.environ.get("CRYPTO_ORDER_HISTORY_MAX_PAGES") is not None
+    else 7
+)
+"""The maximum number of order history pages requested whilst looking up orders in bulk."""
 
 CRYPTO_KEY = os.environ.get("CRYPTO_KEY")
 CRYPTO_SECRET_KEY = os.environ.get("CRYPTO_SECRET_KEY")
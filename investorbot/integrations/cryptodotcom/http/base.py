@@ -1,72 +1,203 @@
-from dataclasses import dataclass
-import uuid
+import atexit
+from dataclasses import dataclass, field
+from functools import cache
 import hashlib
 import hmac
 import json
 import logging
-from typing import Dict
+from typing import Dict, List
+import aiohttp
 import requests
-from os import path
-from pathlib import Path
-from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from investorbot import env
-from investorbot.constants import DEFAULT_LOGS_NAME, INVESTOR_APP_ENVIRONMENT
+from investorbot.constants import (
+    DEFAULT_LOGS_NAME,
+    INVESTOR_APP_CAPTURE_MODE,
+    INVESTOR_APP_CAPTURE_PATH,
+    INVESTOR_APP_ENVIRONMENT,
+    INVESTOR_APP_HTTP_CONNECT_TIMEOUT,
+    INVESTOR_APP_HTTP_POOL_SIZE,
+    INVESTOR_APP_HTTP_READ_TIMEOUT,
+    INVESTOR_APP_HTTP_RETRY_BACKOFF,
+    INVESTOR_APP_HTTP_RETRY_COUNT,
+)
+from investorbot.enums import CaptureMode
+from investorbot.integrations.cryptodotcom.http.capture import (
+    CaptureRecorder,
+    CaptureReplayer,
+)
+from investorbot.integrations.cryptodotcom.http.decoding import JsonDecoder
+from investorbot.integrations.cryptodotcom.http.ratelimit import (
+    RATE_LIMITER,
+    RateLimiter,
+)
+from investorbot.structs.internal import ConnectionStats, DecodeStats, RateLimitStats
 
 logger = logging.getLogger(DEFAULT_LOGS_NAME)
 
 
+def create_session(
+    pool_size: int = INVESTOR_APP_HTTP_POOL_SIZE,
+    retry_count: int = INVESTOR_APP_HTTP_RETRY_COUNT,
+    retry_backoff: float = INVESTOR_APP_HTTP_RETRY_BACKOFF,
+) -> requests.Session:
+    """Creates a session that keeps connections alive between requests, so each request doesn't
+    need a new TCP and TLS handshake. Only GET requests are retried - private endpoints are POST
+    requests and placing an order twice is not an option."""
+    retry = Retry(
+        total=retry_count,
+        backoff_factor=retry_backoff,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False,
+    )
+
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+
+def get_capture_mode() -> CaptureMode:
+    """Responses are recorded by default in Development."""
+    if INVESTOR_APP_CAPTURE_MODE is not None:
+        return CaptureMode(INVESTOR_APP_CAPTURE_MODE.upper())
+
+    return (
+        CaptureMode.RECORD
+        if INVESTOR_APP_ENVIRONMENT == "Development"
+        else CaptureMode.OFF
+    )
+
+
+@cache
+def get_capture_recorder(file_path: str) -> CaptureRecorder:
+    """Clients recording to the same file share a recorder, which is flushed on exit."""
+    recorder = CaptureRecorder(file_path)
+    atexit.register(recorder.close)
+
+    return recorder
+
+
+@cache
+def get_capture_replayer(file_path: str) -> CaptureReplayer:
+    return CaptureReplayer(file_path)
+
+
+def get_default_capture_recorder() -> CaptureRecorder | None:
+    return (
+        get_capture_recorder(INVESTOR_APP_CAPTURE_PATH)
+        if get_capture_mode() == CaptureMode.RECORD
+        else None
+    )
+
+
+def get_default_capture_replayer() -> CaptureReplayer | None:
+    return (
+        get_capture_replayer(INVESTOR_APP_CAPTURE_PATH)
+        if get_capture_mode() == CaptureMode.REPLAY
+        else None
+    )
+
+
 @dataclass
-class HttpClient:
+class BaseHttpClient:
+    """Responses are recorded to a capture log if capture_recorder is set. If capture_replayer is
+    set, responses are served from a capture log instead - no requests are made and rate limits
+    don't apply."""
+
     api_url: str
     id_incr: int
+    rate_limiter: RateLimiter = field(default=RATE_LIMITER, kw_only=True, repr=False)
+    capture_recorder: CaptureRecorder | None = field(
+        default_factory=get_default_capture_recorder, kw_only=True, repr=False
+    )
+    capture_replayer: CaptureReplayer | None = field(
+        default_factory=get_default_capture_replayer, kw_only=True, repr=False
+    )
+    decoder: JsonDecoder = field(default_factory=JsonDecoder, kw_only=True, repr=False)
 
-    def write_request_to_file(
-        self, uri_string: str, response_text: str, response_code: str
-    ):
+    def get_rate_limit_stats(self) -> List[RateLimitStats]:
+        return self.rate_limiter.get_stats()
 
-        if INVESTOR_APP_ENVIRONMENT != "Development":
-            return
+    def get_decode_stats(self) -> DecodeStats:
+        return self.decoder.get_stats(self.api_url)
 
-        # from urlparse import urlparse  # Python 2
-        parsed_uri = urlparse(uri_string)
+    def decode_result(self, content: bytes | str) -> Dict:
+        data_dict = self.decoder.decode(content)["result"]
 
-        result = "./api{uri.path}".format(uri=parsed_uri)
-        directory_path_components = result.split("/")
+        # * data doesn't always exist even though it exists in about 90% of API calls.
+        return data_dict["data"] if "data" in data_dict else data_dict
 
-        directory_path = path.join(*directory_path_components)
-        logger.debug(directory_path)
 
-        Path(directory_path).mkdir(parents=True, exist_ok=True)
-        file_path = path.join(
-            directory_path, f"status{response_code}{uuid.uuid4()}.json"
-        )
+@dataclass
+class HttpClient(BaseHttpClient):
+    session: requests.Session = field(init=False, repr=False)
+    timeout = (INVESTOR_APP_HTTP_CONNECT_TIMEOUT, INVESTOR_APP_HTTP_READ_TIMEOUT)
 
-        response_dict = json.loads(response_text)
-        response_formatted = json.dumps(response_dict, indent=4)
+    def __post_init__(self):
+        self.session = create_session()
 
-        with open(file_path, "w") as f:
-            f.write(response_formatted)
+    def close(self):
+        self.session.close()
 
-    def get(self, method: str):
-        response = requests.get(f"{self.api_url}{method}")
+    def get_connection_stats(self) -> List[ConnectionStats]:
+        """Requests made and connections opened per host since the session was created. Hosts are
+        dropped from the statistics if their connection pool is discarded."""
+        connection_stats = []
+
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+
+            for key in pools.keys():
+                pool = pools.get(key)
+
+                if pool is None:
+                    continue
+
+                connection_stats.append(
+                    ConnectionStats(
+                        host=f"{key.key_scheme}://{key.key_host}:{key.key_port}",
+                        request_count=pool.num_requests,
+                        connection_count=pool.num_connections,
+                    )
+                )
+
+        return connection_stats
+
+    def get_content(self, method: str) -> bytes | str:
+        """Fetches the undecoded response body."""
+        if self.capture_replayer is not None:
+            return self.capture_replayer.get_response("GET", method)
+
+        self.rate_limiter.acquire(method)
+
+        response = self.session.get(f"{self.api_url}{method}", timeout=self.timeout)
 
         if response.status_code != 200:
             response.raise_for_status()
 
-        self.write_request_to_file(
-            f"{self.api_url}{method}", response.text, response.status_code
-        )
+        if self.capture_recorder is not None:
+            self.capture_recorder.record("GET", method, None, response.text)
 
-        return response.json()
+        return response.content
+
+    def get(self, method: str):
+        return self.decoder.decode(self.get_content(method))
 
     def get_data(self, method: str):
         return self.get(method)["result"]["data"]
 
 
-@dataclass
-class AuthenticatedHttpClient(HttpClient):
-    api_key: str
-    api_secret_key: str
+class RequestSigner:
+    """Builds signed requests for the private API. Expects api_key, api_secret_key and id_incr
+    attributes."""
 
     def __params_to_str(self, obj, level):
         if level >= 3:  # ! level 3 seems to be arbitrarily chosen in crypto.com docs
@@ -109,7 +240,7 @@ class AuthenticatedHttpClient(HttpClient):
             digestmod=hashlib.sha256,
         ).hexdigest()
 
-    def post_request(self, method: str, params={}) -> Dict:
+    def create_signed_request(self, method: str, params={}) -> Dict:
         req = {
             "id": self.id_incr,
             "method": "private/" + method,
@@ -122,22 +253,140 @@ class AuthenticatedHttpClient(HttpClient):
 
         req["sig"] = self.__get_signature(req)
 
+        return req
+
+    def create_auth_request(self) -> Dict:
+        """Authenticates a websocket connection to the user API."""
+        req = {
+            "id": self.id_incr,
+            "method": "public/auth",
+            "api_key": self.api_key,
+            "nonce": env.time.now_in_ms(),
+        }
+
+        req["sig"] = self.__get_signature(req)
+
+        return req
+
+
+@dataclass
+class AuthenticatedHttpClient(RequestSigner, HttpClient):
+    api_key: str
+    api_secret_key: str
+
+    def post_request(self, method: str, params={}) -> Dict:
+        if self.capture_replayer is not None:
+            return self.decode_result(
+                self.capture_replayer.get_response("POST", method, params)
+            )
+
+        self.rate_limiter.acquire(method, is_private=True)
+
+        req = self.create_signed_request(method, params)
+
         headers = {"Content-Type": "application/json"}
 
-        result = requests.post(f"{self.api_url}{method}", json=req, headers=headers)
+        result = self.session.post(
+            f"{self.api_url}{method}", json=req, headers=headers, timeout=self.timeout
+        )
 
         if result.status_code != 200:
             result.raise_for_status()
 
-        self.write_request_to_file(
-            f"{self.api_url}{method}", result.text, result.status_code
-        )
+        if self.capture_recorder is not None:
+            self.capture_recorder.record("POST", method, params, result.text)
 
         self.id_incr += 1
 
-        logger.debug(result.text)
+        logger.debug(result.content)
 
-        data_dict = result.json()["result"]
+        return self.decode_result(result.content)
 
-        # * data doesn't always exist even though it exists in about 90% of API calls.
-        return data_dict["data"] if "data" in data_dict else data_dict
+
+@dataclass
+class AsyncHttpClient(BaseHttpClient):
+    """Asyncio equivalent of HttpClient. The underlying aiohttp session is created on first use, as
+    it must be created within a running event loop, and is closed via close or async with.
+    """
+
+    session: aiohttp.ClientSession | None = field(init=False, default=None, repr=False)
+    pool_size = INVESTOR_APP_HTTP_POOL_SIZE
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=self.pool_size),
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=INVESTOR_APP_HTTP_CONNECT_TIMEOUT,
+                    sock_read=INVESTOR_APP_HTTP_READ_TIMEOUT,
+                ),
+                raise_for_status=True,
+            )
+
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+    async def get_content(self, method: str) -> bytes | str:
+        if self.capture_replayer is not None:
+            return self.capture_replayer.get_response("GET", method)
+
+        await self.rate_limiter.acquire_async(method)
+
+        async with self.get_session().get(f"{self.api_url}{method}") as response:
+            content = await response.read()
+
+        if self.capture_recorder is not None:
+            self.capture_recorder.record("GET", method, None, content.decode("utf-8"))
+
+        return content
+
+    async def get(self, method: str):
+        return self.decoder.decode(await self.get_content(method))
+
+    async def get_data(self, method: str):
+        return (await self.get(method))["result"]["data"]
+
+
+@dataclass
+class AsyncAuthenticatedHttpClient(RequestSigner, AsyncHttpClient):
+    api_key: str
+    api_secret_key: str
+
+    async def post_request(self, method: str, params={}) -> Dict:
+        if self.capture_replayer is not None:
+            return self.decode_result(
+                self.capture_replayer.get_response("POST", method, params)
+            )
+
+        await self.rate_limiter.acquire_async(method, is_private=True)
+
+        req = self.create_signed_request(method, params)
+
+        # Unlike the synchronous client, the id is incremented before the response arrives so
+        # concurrent requests don't share the same id.
+        self.id_incr += 1
+
+        headers = {"Content-Type": "application/json"}
+
+        async with self.get_session().post(
+            f"{self.api_url}{method}", json=req, headers=headers
+        ) as response:
+            content = await response.read()
+
+        if self.capture_recorder is not None:
+            self.capture_recorder.record(
+                "POST", method, params, content.decode("utf-8")
+            )
+
+        logger.debug(content)
+
+        return self.decode_result(content)
@@ -0,0 +1,165 @@
+from dataclasses import asdict, dataclass
+import json
+import logging
+from os import path
+from pathlib import Path
+import queue
+from threading import Event, Lock, Thread
+import time
+from typing import Dict, List
+import zlib
+
+from investorbot.constants import DEFAULT_LOGS_NAME
+
+logger = logging.getLogger(DEFAULT_LOGS_NAME)
+
+INDEX_SUFFIX = ".idx"
+
+
+def get_capture_key(http_method: str, method: str, params: dict | None = None) -> str:
+    """Identifies a request regardless of its id, nonce and signature - e.g.
+    'GET get-tickers?instrument_name=ETH_USD' or 'POST get-order-detail {"client_oid":"..."}'.
+    """
+    key = f"{http_method} {method}"
+
+    if params:
+        key += " " + json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+    return key
+
+
+@dataclass
+class CaptureIndexEntry:
+    key: str
+    method_key: str
+    offset: int
+    length: int
+    recorded_at: float
+
+
+class CaptureRecorder:
+    """Appends successful responses to a capture log from a background thread, so requests only
+    pay the cost of a queue put. Each response is zlib compressed and appended to the log, and
+    its position is appended to a sidecar index file so replays don't need to scan the log.
+    """
+
+    def __init__(self, file_path: str, compression_level: int = 6):
+        self.file_path = file_path
+        self.compression_level = compression_level
+        self.__queue = queue.SimpleQueue()
+        self.__thread = Thread(target=self.__run, name="CaptureRecorder", daemon=True)
+        self.__thread.start()
+
+    def record(
+        self,
+        http_method: str,
+        method: str,
+        params: dict | None,
+        response_text: str,
+    ):
+        self.__queue.put((http_method, method, params, response_text, time.time()))
+
+    def flush(self):
+        """Blocks until every response recorded so far has been written."""
+        flushed = Event()
+        self.__queue.put(flushed)
+        flushed.wait()
+
+    def close(self):
+        self.__queue.put(None)
+        self.__thread.join()
+
+    def __write(self, log_file, index_file, item):
+        http_method, method, params, response_text, recorded_at = item
+
+        payload = zlib.compress(response_text.encode("utf-8"), self.compression_level)
+
+        entry = CaptureIndexEntry(
+            key=get_capture_key(http_method, method, params),
+            method_key=get_capture_key(http_method, method),
+            offset=log_file.tell(),
+            length=len(payload),
+            recorded_at=recorded_at,
+        )
+
+        log_file.write(payload)
+        index_file.write(json.dumps(asdict(entry)) + "\n")
+
+    def __run(self):
+        Path(path.dirname(self.file_path) or ".").mkdir(parents=True, exist_ok=True)
+
+        with open(self.file_path, "ab") as log_file, open(
+            self.file_path + INDEX_SUFFIX, "a"
+        ) as index_file:
+            while True:
+                item = self.__queue.get()
+
+                if item is None:
+                    break
+
+                if isinstance(item, Event):
+                    log_file.flush()
+                    index_file.flush()
+                    item.set()
+                    continue
+
+                try:
+                    self.__write(log_file, index_file, item)
+                except Exception as error:
+                    logger.warning(f"Failed to record response: {error}")
+
+                # The log is only flushed once the queue has been drained, i.e. when idle.
+                if self.__queue.empty():
+                    log_file.flush()
+                    index_file.flush()
+
+
+class CaptureReplayer:
+    """Serves responses from a capture log in the order they were recorded. Requests are matched
+    on their method and params first, falling back to their method alone - e.g. create-order
+    params contain a randomly generated client_oid. Once every response for a request has been
+    served the last one is repeated."""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.__entries: Dict[str, List[CaptureIndexEntry]] = {}
+        self.__positions: Dict[str, int] = {}
+        self.__lock = Lock()
+
+        with open(file_path, "rb") as log_file:
+            self.__log = log_file.read()
+
+        with open(file_path + INDEX_SUFFIX, "r") as index_file:
+            for line in index_file:
+                if line.strip() == "":
+                    continue
+
+                entry = CaptureIndexEntry(**json.loads(line))
+
+                self.__entries.setdefault(entry.key, []).append(entry)
+
+                if entry.method_key != entry.key:
+                    self.__entries.setdefault(entry.method_key, []).append(entry)
+
+    def get_response(
+        self, http_method: str, method: str, params: dict | None = None
+    ) -> str:
+        key = get_capture_key(http_method, method, params)
+
+        if key not in self.__entries:
+            key = get_capture_key(http_method, method)
+
+        entries = self.__entries.get(key)
+
+        if entries is None:
+            raise LookupError(f"No captured response for {http_method} {method}.")
+
+        with self.__lock:
+            position = self.__positions.get(key, 0)
+            self.__positions[key] = position + 1
+
+        entry = entries[min(position, len(entries) - 1)]
+
+        return zlib.decompress(
+            self.__log[entry.offset : entry.offset + entry.length]
+        ).decode("utf-8")
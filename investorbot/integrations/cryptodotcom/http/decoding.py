@@ -0,0 +1,121 @@
+import json
+import logging
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+from numpy import ndarray
+
+from investorbot import mappings
+from investorbot.constants import DEFAULT_LOGS_NAME, INVESTOR_APP_JSON_BACKEND
+from investorbot.structs.internal import DecodeStats
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(DEFAULT_LOGS_NAME)
+
+JSON_BACKENDS: Dict[str, Callable[[bytes | str], Any]] = {"json": json.loads}
+
+if orjson is not None:
+    JSON_BACKENDS["orjson"] = orjson.loads
+
+DEFAULT_JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+NUMERIC_CHARACTERS = b"0123456789.-+eE"
+NUMERIC_TRANSLATION = bytes(
+    byte if byte in NUMERIC_CHARACTERS else ord(" ") for byte in range(256)
+)
+"""Maps every byte that can't be part of a number to whitespace."""
+
+
+def extract_valuation_arrays(content: bytes) -> Tuple[ndarray, ndarray]:
+    """Extracts t and v from a public/get-valuations response body by blanking out everything
+    that isn't a number. Raises ValueError if the body isn't in the expected shape."""
+    # Valuation objects contain no arrays, so the first ']' closes the data array.
+    data_start = content.index(b"[", content.index(b'"data"')) + 1
+    data = content[data_start : content.index(b"]", data_start)]
+    count = data.count(b'"t"')
+
+    if count == 0:
+        return np.empty(0), np.empty(0)
+
+    # Only numbers are left once keys and punctuation are blanked out, i.e. each object's t and v
+    # in the order they're written.
+    pairs = np.fromstring(data.translate(NUMERIC_TRANSLATION), sep=" ")
+
+    if pairs.size != 2 * count:
+        raise ValueError(f"Expected {count} valuations but decoded {pairs.size / 2}.")
+
+    pairs = pairs.reshape(count, 2)
+    v_first = data.find(b'"v"') < data.find(b'"t"')
+
+    return (pairs[:, 1], pairs[:, 0]) if v_first else (pairs[:, 0], pairs[:, 1])
+
+
+class JsonDecoder:
+    """Decodes response bodies with the fastest JSON backend installed (orjson), falling back to
+    the standard library, and keeps track of the time spent decoding."""
+
+    def __init__(self, backend: str | None = INVESTOR_APP_JSON_BACKEND):
+        self.backend = backend if backend is not None else DEFAULT_JSON_BACKEND
+
+        if self.backend not in JSON_BACKENDS:
+            raise ValueError(f"JSON backend {self.backend} is not installed.")
+
+        self.__loads = JSON_BACKENDS[self.backend]
+        self.__lock = Lock()
+        self.__decode_count = 0
+        self.__byte_count = 0
+        self.__total_decode_seconds = 0.0
+
+    def __record(self, content: bytes | str, start_time: float):
+        elapsed = perf_counter() - start_time
+
+        with self.__lock:
+            self.__decode_count += 1
+            self.__byte_count += len(content)
+            self.__total_decode_seconds += elapsed
+
+    def decode(self, content: bytes | str) -> Any:
+        start_time = perf_counter()
+        result = self.__loads(content)
+        self.__record(content, start_time)
+
+        return result
+
+    def decode_valuation_arrays(self, content: bytes | str) -> Tuple[ndarray, ndarray]:
+        """Extracts t and v from a public/get-valuations response body straight into float64
+        arrays, without decoding a dict per value. Arrays are ordered as returned by the API,
+        i.e. from most recent to oldest. Falls back to decoding the full response if the body
+        isn't in the expected shape."""
+        start_time = perf_counter()
+
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+
+        try:
+            t, v = extract_valuation_arrays(content)
+        except ValueError as value_error:
+            logger.warning(f"Decoding valuations in full instead: {value_error}")
+
+            t, v = mappings.valuation_data_to_arrays(
+                self.__loads(content)["result"]["data"]
+            )
+
+        self.__record(content, start_time)
+
+        return t, v
+
+    def get_stats(self, source: str) -> DecodeStats:
+        with self.__lock:
+            return DecodeStats(
+                source=source,
+                backend=self.backend,
+                decode_count=self.__decode_count,
+                byte_count=self.__byte_count,
+                total_decode_seconds=self.__total_decode_seconds,
+            )
@@ -1,9 +1,46 @@
-from typing import List
+from typing import List, Tuple
+from numpy import ndarray
 from investorbot.integrations.cryptodotcom.constants import CRYPTO_MARKET_URL
-from investorbot.integrations.cryptodotcom.http.base import HttpClient
+from investorbot.integrations.cryptodotcom.http.base import AsyncHttpClient, HttpClient
 from investorbot.integrations.cryptodotcom.structs import InstrumentJson, TickerJson
 
 
+def filter_usd_tickers(tickers: List[TickerJson]) -> List[TickerJson]:
+    """Filters tickers down to high volume USD instruments."""
+    data = [
+        ticker
+        for ticker in tickers
+        if str(ticker.instrument_name).endswith("_USD")
+        and not str(ticker.instrument_name).startswith("USDT_")
+        and float(ticker.total_traded_volume_usd_24h) > 200_000.0
+    ]
+
+    result = sorted(
+        data,
+        key=lambda x: float(x.percentage_change_24h)
+        * float(x.total_traded_volume_usd_24h),
+    )  # TODO write test for sorting behavior - this is pretty implicit
+    result.reverse()
+
+    return result
+
+
+def hours_to_count(hours: int | float):
+    return int((2880 / 24) * hours)
+
+
+def get_valuation_method(instrument_name: str, valuation_type: str, hours=24) -> str:
+    """Allegedly fetches per minute data market valuation data for the requested coin name
+    (https://exchange-docs.crypto.com/exchange/v1/rest-ws/index.html#public-get-valuations). If
+    the documentation was correct you'd need to request 1440 data points (24 hours * 60
+    minutes), but in reality, the API returns alternating intervals of 20 seconds and 40
+    seconds, hence the default count here is 2880 to correspond with 24 hours-worth of data.
+    """
+    count = hours_to_count(hours)
+
+    return f"get-valuations?instrument_name={instrument_name}&valuation_type={valuation_type}&count={count}"
+
+
 class MarketHttpClient(HttpClient):
     def __init__(
         self,
@@ -11,25 +48,19 @@ class MarketHttpClient(HttpClient):
     ):
         super().__init__(api_url=api_url, id_incr=1)
 
-    def get_usd_tickers(self) -> list[TickerJson]:
+    def get_tickers(self) -> List[TickerJson]:
         ticker_data = self.get_data("get-tickers")
 
-        data = [
-            TickerJson(obj)
-            for obj in ticker_data
-            if str(obj["i"]).endswith("_USD")
-            and not str(obj["i"]).startswith("USDT_")
-            and float(obj["vv"]) > 200_000.0
-        ]
-
-        result = sorted(
-            data,
-            key=lambda x: float(x.percentage_change_24h)
-            * float(x.total_traded_volume_usd_24h),
-        )  # TODO write test for sorting behavior - this is pretty implicit
-        result.reverse()
+        return [TickerJson(obj) for obj in ticker_data]
 
-        return result
+    def get_usd_tickers(
+        self, tickers: List[TickerJson] | None = None
+    ) -> list[TickerJson]:
+        """Filters tickers down to high volume USD instruments. All tickers are fetched if none are
+        given."""
+        return filter_usd_tickers(
+            tickers if tickers is not None else self.get_tickers()
+        )
 
     def get_instruments(self) -> List[InstrumentJson]:
         instrument_data = self.get_data("get-instruments")
@@ -45,22 +76,71 @@ class MarketHttpClient(HttpClient):
 
         return data[0]
 
-    def __hours_to_count(self, hours: int | float):
-        return int((2880 / 24) * hours)
-
     def get_valuation(
         self, instrument_name: str, valuation_type: str, hours=24
     ) -> dict:
-        """Allegedly fetches per minute data market valuation data for the requested coin name
-        (https://exchange-docs.crypto.com/exchange/v1/rest-ws/index.html#public-get-valuations). If
-        the documentation was correct you'd need to request 1440 data points (24 hours * 60
-        minutes), but in reality, the API returns alternating intervals of 20 seconds and 40
-        seconds, hence the default count here is 2880 to correspond with 24 hours-worth of data.
-        """
-        count = self.__hours_to_count(hours)
-
-        valuation_data = self.get_data(
-            f"get-valuations?instrument_name={instrument_name}&valuation_type={valuation_type}&count={count}"
+        """See get_valuation_method."""
+        return self.get_data(
+            get_valuation_method(instrument_name, valuation_type, hours)
+        )
+
+    def get_valuation_arrays(
+        self, instrument_name: str, valuation_type: str, hours=24
+    ) -> Tuple[ndarray, ndarray]:
+        """Same as get_valuation, but times and values are decoded straight into arrays - see
+        JsonDecoder.decode_valuation_arrays."""
+        return self.decoder.decode_valuation_arrays(
+            self.get_content(
+                get_valuation_method(instrument_name, valuation_type, hours)
+            )
+        )
+
+
+class AsyncMarketHttpClient(AsyncHttpClient):
+    """Asyncio equivalent of MarketHttpClient."""
+
+    def __init__(
+        self,
+        api_url=CRYPTO_MARKET_URL,
+    ):
+        super().__init__(api_url=api_url, id_incr=1)
+
+    async def get_tickers(self) -> List[TickerJson]:
+        ticker_data = await self.get_data("get-tickers")
+
+        return [TickerJson(obj) for obj in ticker_data]
+
+    async def get_usd_tickers(
+        self, tickers: List[TickerJson] | None = None
+    ) -> list[TickerJson]:
+        return filter_usd_tickers(
+            tickers if tickers is not None else await self.get_tickers()
+        )
+
+    async def get_instruments(self) -> List[InstrumentJson]:
+        instrument_data = await self.get_data("get-instruments")
+
+        return [InstrumentJson(**obj) for obj in instrument_data]
+
+    async def get_ticker(self, instrument_name: str) -> TickerJson:
+        ticker_data = await self.get_data(
+            f"get-tickers?instrument_name={instrument_name}"
+        )
+
+        return [TickerJson(obj) for obj in ticker_data][0]
+
+    async def get_valuation(
+        self, instrument_name: str, valuation_type: str, hours=24
+    ) -> dict:
+        return await self.get_data(
+            get_valuation_method(instrument_name, valuation_type, hours)
         )
 
-        return valuation_data
+    async def get_valuation_arrays(
+        self, instrument_name: str, valuation_type: str, hours=24
+    ) -> Tuple[ndarray, ndarray]:
+        return self.decoder.decode_valuation_arrays(
+            await self.get_content(
+                get_valuation_method(instrument_name, valuation_type, hours)
+            )
+        )
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+from threading import Lock
+import time
+from typing import Callable, Dict, List
+
+from investorbot.constants import (
+    DEFAULT_LOGS_NAME,
+    INVESTOR_APP_PRIVATE_BALANCE_RATE_LIMIT,
+    INVESTOR_APP_PRIVATE_ORDER_HISTORY_RATE_LIMIT,
+    INVESTOR_APP_PRIVATE_ORDER_RATE_LIMIT,
+    INVESTOR_APP_PUBLIC_MARKET_RATE_LIMIT,
+)
+from investorbot.structs.internal import RateLimitStats
+
+logger = logging.getLogger(DEFAULT_LOGS_NAME)
+
+PUBLIC_MARKET = "public_market"
+PRIVATE_ORDER = "private_order"
+PRIVATE_BALANCE = "private_balance"
+PRIVATE_ORDER_HISTORY = "private_order_history"
+
+PRIVATE_ORDER_METHODS = frozenset(
+    [
+        "create-order",
+        "create-order-list",
+        "cancel-order",
+        "cancel-all-orders",
+        "get-order-detail",
+    ]
+)
+
+
+def get_rate_limit_bucket(method: str, is_private: bool) -> str:
+    """Private order methods share one bucket and get-order-history has its own, much lower limit.
+    Every other private method (e.g. user-balance or get-open-orders) falls under crypto.com's
+    lower limit for the remaining private methods."""
+    if not is_private:
+        return PUBLIC_MARKET
+
+    # Strip any query string, e.g. 'get-tickers?instrument_name=ETH_USD'.
+    method = method.split("?")[0]
+
+    if method == "get-order-history":
+        return PRIVATE_ORDER_HISTORY
+
+    return PRIVATE_ORDER if method in PRIVATE_ORDER_METHODS else PRIVATE_BALANCE
+
+
+class TokenBucket:
+    """Allows up to capacity requests in a burst, refilling at rate requests per second. Each
+    request reserves a token up front - if none are left the request is queued behind earlier
+    reservations rather than failing, and the time it has to wait is returned."""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.__clock = clock
+        self.__tokens = capacity
+        self.__updated_at = clock()
+        self.__lock = Lock()
+
+        self.__request_count = 0
+        self.__queued_request_count = 0
+        self.__total_wait_seconds = 0.0
+        self.__max_wait_seconds = 0.0
+
+    def reserve(self) -> float:
+        """Takes a token and returns how many seconds the caller must wait before using it."""
+        with self.__lock:
+            now = self.__clock()
+
+            self.__tokens = min(
+                self.capacity, self.__tokens + (now - self.__updated_at) * self.rate
+            )
+            self.__updated_at = now
+            self.__tokens -= 1
+
+            # A negative balance is the queue of requests reserved ahead of this one.
+            wait_seconds = max(-self.__tokens / self.rate, 0.0)
+
+            self.__request_count += 1
+            self.__total_wait_seconds += wait_seconds
+            self.__max_wait_seconds = max(self.__max_wait_seconds, wait_seconds)
+
+            if wait_seconds > 0:
+                self.__queued_request_count += 1
+
+        if wait_seconds > 0:
+            logger.debug(
+                f"Request queued for {wait_seconds:.3f}s by the {self.name} rate limit."
+            )
+
+        return wait_seconds
+
+    def acquire(self) -> float:
+        wait_seconds = self.reserve()
+
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+
+        return wait_seconds
+
+    async def acquire_async(self) -> float:
+        wait_seconds = self.reserve()
+
+        if wait_seconds > 0:
+            await asyncio.sleep(wait_seconds)
+
+        return wait_seconds
+
+    def get_stats(self) -> RateLimitStats:
+        with self.__lock:
+            return RateLimitStats(
+                bucket=self.name,
+                request_count=self.__request_count,
+                queued_request_count=self.__queued_request_count,
+                total_wait_seconds=self.__total_wait_seconds,
+                max_wait_seconds=self.__max_wait_seconds,
+            )
+
+
+class RateLimiter:
+    """Token buckets for crypto.com's public market, private order, private order history and
+    private balance limits
+    (https://exchange-docs.crypto.com/exchange/v1/rest-ws/index.html#rate-limits). Private limits
+    are enforced per 100ms window, hence bursts are limited to a tenth of the per second rate."""
+
+    def __init__(
+        self,
+        public_market_rate: float = INVESTOR_APP_PUBLIC_MARKET_RATE_LIMIT,
+        private_order_rate: float = INVESTOR_APP_PRIVATE_ORDER_RATE_LIMIT,
+        private_balance_rate: float = INVESTOR_APP_PRIVATE_BALANCE_RATE_LIMIT,
+        private_order_history_rate: float = INVESTOR_APP_PRIVATE_ORDER_HISTORY_RATE_LIMIT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.buckets: Dict[str, TokenBucket] = {
+            PUBLIC_MARKET: TokenBucket(
+                PUBLIC_MARKET, public_market_rate, max(public_market_rate, 1), clock
+            ),
+            PRIVATE_ORDER: TokenBucket(
+                PRIVATE_ORDER,
+                private_order_rate,
+                max(private_order_rate / 10, 1),
+                clock,
+            ),
+            PRIVATE_BALANCE: TokenBucket(
+                PRIVATE_BALANCE,
+                private_balance_rate,
+                max(private_balance_rate / 10, 1),
+                clock,
+            ),
+            PRIVATE_ORDER_HISTORY: TokenBucket(
+                PRIVATE_ORDER_HISTORY,
+                private_order_history_rate,
+                max(private_order_history_rate / 10, 1),
+                clock,
+            ),
+        }
+
+    def get_bucket(self, method: str, is_private: bool) -> TokenBucket:
+        return self.buckets[get_rate_limit_bucket(method, is_private)]
+
+    def acquire(self, method: str, is_private: bool = False) -> float:
+        return self.get_bucket(method, is_private).acquire()
+
+    async def acquire_async(self, method: str, is_private: bool = False) -> float:
+        return await self.get_bucket(method, is_private).acquire_async()
+
+    def get_stats(self) -> List[RateLimitStats]:
+        return [bucket.get_stats() for bucket in self.buckets.values()]
+
+
+RATE_LIMITER = RateLimiter()
+"""Rate limits apply per account and IP address, so every client in the process shares the same
+buckets by default."""
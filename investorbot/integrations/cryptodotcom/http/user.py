@@ -1,19 +1,103 @@
+from dataclasses import fields
 import json
 import logging
-from typing import Dict
+from typing import Dict, List
 import uuid
 from investorbot.constants import DEFAULT_LOGS_NAME
 from investorbot.integrations.cryptodotcom.constants import CRYPTO_USER_URL
-from investorbot.integrations.cryptodotcom.http.base import AuthenticatedHttpClient
+from investorbot.integrations.cryptodotcom.http.base import (
+    AsyncAuthenticatedHttpClient,
+    AuthenticatedHttpClient,
+)
 from investorbot.integrations.cryptodotcom.structs import (
     OrderJson,
     OrderDetailJson,
+    OrderListResultJson,
     PositionBalanceJson,
     UserBalanceJson,
 )
 
 logger = logging.getLogger(DEFAULT_LOGS_NAME)
 
+ORDER_DETAIL_FIELDS = set(field.name for field in fields(OrderDetailJson))
+ORDER_LIST_RESULT_FIELDS = set(field.name for field in fields(OrderListResultJson))
+
+
+def json_to_user_balance(user_balances: List[dict]) -> UserBalanceJson:
+    user_balance = user_balances[0]  # ! zero index assumes only one wallet - may break
+
+    user_balance_obj = UserBalanceJson(**user_balance)
+
+    position_balances = [
+        PositionBalanceJson(**position_balance)
+        for position_balance in user_balance_obj.position_balances
+    ]
+
+    user_balance_obj.position_balances = position_balances
+
+    return user_balance_obj
+
+
+def json_to_order_detail_json(order: dict) -> OrderDetailJson:
+    # Bulk order endpoints may return more properties than get-order-detail.
+    return OrderDetailJson(
+        **{key: value for key, value in order.items() if key in ORDER_DETAIL_FIELDS}
+    )
+
+
+def json_to_order_list_results(result: dict) -> List[OrderListResultJson]:
+    return [
+        OrderListResultJson(
+            **{
+                "index": None,
+                **{
+                    key: value
+                    for key, value in order_result.items()
+                    if key in ORDER_LIST_RESULT_FIELDS
+                },
+            }
+        )
+        for order_result in result["result_list"]
+    ]
+
+
+def get_create_order_params(
+    instrument_name: str,
+    instrument_price_usd: str,
+    quantity: str,
+    side: str,
+) -> Dict:
+    return {
+        "client_oid": str(uuid.uuid4()),
+        "instrument_name": instrument_name,
+        "side": side,
+        "type": "LIMIT",
+        "price": f"{instrument_price_usd}",
+        "quantity": f"{quantity}",
+        "time_in_force": "GOOD_TILL_CANCEL",
+    }
+
+
+def get_create_order_list_params(orders: List[Dict]) -> Dict:
+    """Orders are given in the same format as private/create-order params."""
+    return {"contingency_type": "LIST", "order_list": orders}
+
+
+def get_order_history_params(
+    start_time_ms: int | None = None,
+    end_time_ms: int | None = None,
+    limit: int = 100,
+) -> Dict:
+    params = {"limit": limit}
+
+    if start_time_ms is not None:
+        params["start_time"] = start_time_ms
+
+    if end_time_ms is not None:
+        params["end_time"] = end_time_ms
+
+    return params
+
 
 class UserHttpClient(AuthenticatedHttpClient):
     def __init__(
@@ -27,20 +111,7 @@ class UserHttpClient(AuthenticatedHttpClient):
         )
 
     def get_balance(self) -> UserBalanceJson:
-        user_balance = self.post_request("user-balance")[
-            0
-        ]  # ! zero index assumes only one wallet - may break
-
-        user_balance_obj = UserBalanceJson(**user_balance)
-
-        position_balances = [
-            PositionBalanceJson(**position_balance)
-            for position_balance in user_balance_obj.position_balances
-        ]
-
-        user_balance_obj.position_balances = position_balances
-
-        return user_balance_obj
+        return json_to_user_balance(self.post_request("user-balance"))
 
     def get_create_order_params(
         self,
@@ -49,15 +120,9 @@ class UserHttpClient(AuthenticatedHttpClient):
         quantity: str,
         side: str,
     ) -> Dict:
-        return {
-            "client_oid": str(uuid.uuid4()),
-            "instrument_name": instrument_name,
-            "side": side,
-            "type": "LIMIT",
-            "price": f"{instrument_price_usd}",
-            "quantity": f"{quantity}",
-            "time_in_force": "GOOD_TILL_CANCEL",
-        }
+        return get_create_order_params(
+            instrument_name, instrument_price_usd, quantity, side
+        )
 
     def create_order(
         self,
@@ -77,10 +142,114 @@ class UserHttpClient(AuthenticatedHttpClient):
 
         return OrderJson(**result)
 
+    def create_order_list(self, orders: List[Dict]) -> List[OrderListResultJson]:
+        """Places up to CRYPTO_ORDER_LIST_MAX_SIZE orders in a single request. Each order is
+        accepted or rejected individually - see OrderListResultJson."""
+        params = get_create_order_list_params(orders)
+
+        logger.info(json.dumps(params, indent=4))
+
+        return json_to_order_list_results(
+            self.post_request("create-order-list", params)
+        )
+
     def get_order_detail(self, client_oid: int) -> OrderDetailJson:
         return OrderDetailJson(
             **self.post_request("get-order-detail", {"client_oid": str(client_oid)})
         )
 
+    def get_open_orders(self) -> List[OrderDetailJson]:
+        return [
+            json_to_order_detail_json(order)
+            for order in self.post_request("get-open-orders")
+        ]
+
+    def get_order_history(
+        self,
+        start_time_ms: int | None = None,
+        end_time_ms: int | None = None,
+        limit: int = 100,
+    ) -> List[OrderDetailJson]:
+        """Fetches filled and cancelled orders. The API defaults to the last 24 hours of orders if
+        no start time is given and returns at most 100 orders per request."""
+        params = get_order_history_params(start_time_ms, end_time_ms, limit)
+
+        return [
+            json_to_order_detail_json(order)
+            for order in self.post_request("get-order-history", params)
+        ]
+
     def cancel_order(self, order_id: int):
         return self.post_request("cancel-order", {"client_oid": str(order_id)})
+
+
+class AsyncUserHttpClient(AsyncAuthenticatedHttpClient):
+    """Asyncio equivalent of UserHttpClient."""
+
+    def __init__(
+        self,
+        api_key,
+        api_secret_key,
+        api_url=CRYPTO_USER_URL,
+    ):
+        super().__init__(
+            id_incr=1, api_key=api_key, api_secret_key=api_secret_key, api_url=api_url
+        )
+
+    async def get_balance(self) -> UserBalanceJson:
+        return json_to_user_balance(await self.post_request("user-balance"))
+
+    async def create_order(
+        self,
+        instrument_name: str,
+        instrument_price_usd: str,
+        quantity: str,
+        side: str,
+    ) -> OrderJson:
+        params = get_create_order_params(
+            instrument_name, instrument_price_usd, quantity, side
+        )
+
+        logger.info(json.dumps(params, indent=4))
+
+        result = await self.post_request("create-order", params)
+
+        return OrderJson(**result)
+
+    async def create_order_list(self, orders: List[Dict]) -> List[OrderListResultJson]:
+        params = get_create_order_list_params(orders)
+
+        logger.info(json.dumps(params, indent=4))
+
+        return json_to_order_list_results(
+            await self.post_request("create-order-list", params)
+        )
+
+    async def get_order_detail(self, client_oid: int) -> OrderDetailJson:
+        return OrderDetailJson(
+            **await self.post_request(
+                "get-order-detail", {"client_oid": str(client_oid)}
+            )
+        )
+
+    async def get_open_orders(self) -> List[OrderDetailJson]:
+        return [
+            json_to_order_detail_json(order)
+            for order in await self.post_request("get-open-orders")
+        ]
+
+    async def get_order_history(
+        self,
+        start_time_ms: int | None = None,
+        end_time_ms: int | None = None,
+        limit: int = 100,
+    ) -> List[OrderDetailJson]:
+        params = get_order_history_params(start_time_ms, end_time_ms, limit)
+
+        return [
+            json_to_order_detail_json(order)
+            for order in await self.post_request("get-order-history", params)
+        ]
+
+    async def cancel_order(self, order_id: int):
+        return await self.post_request("cancel-order", {"client_oid": str(order_id)})
@@ -6,7 +6,11 @@ from investorbot.integrations.cryptodotcom.structs import (
     OrderDetailJson,
     PositionBalanceJson,
 )
-from investorbot.structs.internal import OrderDetail, PositionBalance, RatingThreshold
+from investorbot.structs.internal import (
+    OrderDetail,
+    PositionBalance,
+    RatingThreshold,
+)
 
 
 def json_to_position_balance(balance: PositionBalanceJson) -> PositionBalance:
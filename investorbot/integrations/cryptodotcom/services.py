@@ -1,99 +1,530 @@
+import asyncio
 import logging
 import math
-from typing import List
+from typing import Callable, Dict, List, Set
+
+import aiohttp
+from requests import HTTPError, RequestException
+from investorbot import env
 from investorbot.integrations.cryptodotcom import mappings
+from investorbot.mappings import valuation_arrays_to_time_series
 from investorbot.constants import (
     DEFAULT_LOGS_NAME,
     INVESTMENT_INCREMENTS,
 )
 from investorbot.integrations.cryptodotcom.constants import (
     CRYPTO_KEY,
+    CRYPTO_ORDER_HISTORY_MAX_PAGES,
+    CRYPTO_ORDER_HISTORY_PAGE_SIZE,
+    CRYPTO_ORDER_HISTORY_WINDOW_MS,
+    CRYPTO_ORDER_LIST_MAX_SIZE,
     CRYPTO_SECRET_KEY,
+    CRYPTO_WEBSOCKET_MARKET_URL,
+    CRYPTO_WEBSOCKET_USER_URL,
+)
+from investorbot.integrations.cryptodotcom.enums import OrderDetailStatus
+from investorbot.integrations.cryptodotcom.http.market import (
+    AsyncMarketHttpClient,
+    MarketHttpClient,
+)
+from investorbot.integrations.cryptodotcom.http.user import (
+    AsyncUserHttpClient,
+    UserHttpClient,
+    get_create_order_params,
+)
+from investorbot.integrations.cryptodotcom.snapshots import (
+    MarketSnapshot,
+    WalletSnapshot,
 )
-from investorbot.integrations.cryptodotcom.http.market import MarketHttpClient
-from investorbot.integrations.cryptodotcom.http.user import UserHttpClient
-from investorbot.integrations.cryptodotcom.structs import UserBalanceJson
-from investorbot.interfaces.services import ICryptoService
+from investorbot.integrations.cryptodotcom.websocket import (
+    AccountState,
+    MarketDataService,
+    UserDataService,
+)
+from investorbot.integrations.cryptodotcom.structs import (
+    OrderDetailJson,
+    OrderListResultJson,
+    TickerJson,
+    UserBalanceJson,
+)
+from investorbot.interfaces.services import IAsyncCryptoService, ICryptoService
 from investorbot.models import BuyOrder, CashBalance, CoinProperties, SellOrder
 from investorbot.structs.egress import CoinPurchase, CoinSale
-from investorbot.structs.internal import LatestTrade, OrderDetail, PositionBalance
-
+from investorbot.structs.internal import (
+    ConnectionStats,
+    DecodeStats,
+    LatestTrade,
+    OrderDetail,
+    OrderPlacementResult,
+    PositionBalance,
+    RateLimitStats,
+    StreamStats,
+    TimeSeries,
+)
 
 logger = logging.getLogger(DEFAULT_LOGS_NAME)
 
 
+def calculate_investable_coin_count(cash_balance: CashBalance) -> int:
+    usd_balance = cash_balance.usd_balance
+    total_estimated_value_usd = cash_balance.total_estimated_value_usd
+
+    percentage_to_invest = (
+        usd_balance / total_estimated_value_usd - 0.5
+    )  # TODO make configurable
+
+    number_of_coins_to_invest = (
+        math.floor(
+            total_estimated_value_usd * percentage_to_invest / INVESTMENT_INCREMENTS
+        )
+        if percentage_to_invest > 0
+        else 0
+    )
+
+    return number_of_coins_to_invest
+
+
+def get_streamed_wallet_balance(
+    user_data: UserDataService | None,
+) -> UserBalanceJson | None:
+    """The streamed wallet is always current, so it's used regardless of invalidation."""
+    if user_data is None or not user_data.is_live:
+        return None
+
+    return user_data.account.get_wallet_balance()
+
+
+def get_streamed_account(user_data: UserDataService | None) -> AccountState | None:
+    return user_data.account if user_data is not None and user_data.is_live else None
+
+
+def get_streamed_ticker(
+    market_data: MarketDataService | None, coin_name: str
+) -> TickerJson | None:
+    if market_data is None or not market_data.is_live:
+        return None
+
+    return market_data.prices.get_ticker(coin_name)
+
+
+def get_streamed_tickers(market_data: MarketDataService | None) -> List[TickerJson]:
+    if market_data is None or not market_data.is_live:
+        return []
+
+    return market_data.prices.get_tickers()
+
+
+def get_streamed_time_series(
+    market_data: MarketDataService | None, coin_name: str, hours: int | float
+) -> TimeSeries | None:
+    """Streamed mark prices are only used once the history covers the requested hours."""
+    if market_data is None or not market_data.is_live:
+        return None
+
+    return market_data.history.get_time_series(
+        coin_name, env.time.now_in_ms() - int(hours * 60 * 60 * 1000)
+    )
+
+
+def ticker_to_latest_trade(ticker: TickerJson) -> LatestTrade:
+    return LatestTrade(ticker.instrument_name, ticker.latest_trade)
+
+
+def add_order_details(
+    order_details: Dict[str, OrderDetail],
+    remaining_order_ids: Set[str],
+    orders: List[OrderDetailJson],
+    account: AccountState | None = None,
+):
+    """Maps each order matching one of the remaining order ids and removes it from the remaining
+    order ids. Matched orders are added to the streamed account state, if given."""
+    for order in orders:
+        order_id = str(order.client_oid)
+
+        if order_id in remaining_order_ids:
+            order_details[order_id] = mappings.json_to_order_detail(order)
+            remaining_order_ids.remove(order_id)
+
+            if account is not None:
+                account.update_order(order)
+
+
+def add_streamed_order_details(
+    order_details: Dict[str, OrderDetail],
+    remaining_order_ids: Set[str],
+    account: AccountState | None,
+):
+    if account is None:
+        return
+
+    add_order_details(
+        order_details,
+        remaining_order_ids,
+        [
+            order
+            for order in map(account.get_order, list(remaining_order_ids))
+            if order is not None
+        ],
+    )
+
+
+def get_previous_order_history_end_time(
+    orders: List[OrderDetailJson], end_time_ms: int
+) -> int:
+    """A full page of order history may have more orders before its oldest one, so the next page
+    ends there. Otherwise every order in the window was returned, so the previous window is
+    requested next."""
+    if len(orders) >= CRYPTO_ORDER_HISTORY_PAGE_SIZE:
+        return min(min(int(order.create_time) for order in orders), end_time_ms - 1)
+
+    return end_time_ms - CRYPTO_ORDER_HISTORY_WINDOW_MS
+
+
+def get_buy_order(order_spec: CoinPurchase, client_oid: str) -> BuyOrder:
+    return BuyOrder(
+        buy_order_id=client_oid,
+        coin_name=order_spec.coin_properties.coin_name,
+        price_per_coin=order_spec.price_per_coin,
+    )
+
+
+def get_buy_order_params(order_specs: List[CoinPurchase]) -> List[Dict]:
+    return [
+        get_create_order_params(
+            order_spec.coin_properties.coin_name,
+            order_spec.price_per_coin,
+            order_spec.quantity,
+            "BUY",
+        )
+        for order_spec in order_specs
+    ]
+
+
+def get_sell_order_params(coin_sales: Dict[str, CoinSale]) -> List[Dict]:
+    return [
+        get_create_order_params(
+            coin_sale.coin_properties.coin_name,
+            coin_sale.price_per_coin,
+            coin_sale.quantity,
+            "SELL",
+        )
+        for coin_sale in coin_sales.values()
+    ]
+
+
+def get_order_list_chunks(orders: List[Dict]) -> List[List[Dict]]:
+    return [
+        orders[i : i + CRYPTO_ORDER_LIST_MAX_SIZE]
+        for i in range(0, len(orders), CRYPTO_ORDER_LIST_MAX_SIZE)
+    ]
+
+
+ORDER_LIST_MISSING_RESULT_ERROR = "No result was returned for the order."
+
+
+def get_order_list_errors(
+    order_count: int, results: List[OrderListResultJson]
+) -> List[str | None]:
+    """Matches create-order-list results to their orders by index. None means the order was
+    placed. Results without a valid index are logged and ignored, leaving their orders with
+    ORDER_LIST_MISSING_RESULT_ERROR - see get_unconfirmed_order_indices."""
+    errors = [ORDER_LIST_MISSING_RESULT_ERROR] * order_count
+
+    for result in results:
+        if not isinstance(result.index, int) or not 0 <= result.index < order_count:
+            logger.warning(
+                f"Ignoring order list result with an invalid index: {result}"
+            )
+            continue
+
+        errors[result.index] = (
+            None if result.code == 0 else f"{result.code}: {result.message}"
+        )
+
+    return errors
+
+
+def get_unconfirmed_order_indices(errors: List[str | None]) -> List[int]:
+    """Orders missing from create-order-list results may still have been placed, like orders
+    in a request that failed ambiguously."""
+    return [
+        i for i, error in enumerate(errors) if error == ORDER_LIST_MISSING_RESULT_ERROR
+    ]
+
+
+def is_order_placement_ambiguous(status: int | None) -> bool:
+    """Without a response, or with a server error, the exchange may still have accepted the
+    orders."""
+    return status is None or status >= 500
+
+
+def get_reconciled_order_errors(
+    orders: List[Dict], placed_orders: List[OrderDetailJson], error_message: str
+) -> List[str | None]:
+    """Matches orders to those found on the exchange by client_oid after an ambiguous failure.
+    Orders found were placed despite the error - the rest are assumed to have failed."""
+    placed_order_ids = set(
+        str(order.client_oid)
+        for order in placed_orders
+        if order.status != OrderDetailStatus.REJECTED
+    )
+
+    return [
+        None if str(order["client_oid"]) in placed_order_ids else error_message
+        for order in orders
+    ]
+
+
+def get_buy_order_results(
+    order_specs: List[CoinPurchase], orders: List[Dict], errors: List[str | None]
+) -> List[OrderPlacementResult]:
+    return [
+        (
+            OrderPlacementResult(
+                order_spec.coin_properties.coin_name,
+                order=get_buy_order(order_spec, order["client_oid"]),
+            )
+            if error is None
+            else OrderPlacementResult(
+                order_spec.coin_properties.coin_name, error_message=error
+            )
+        )
+        for order_spec, order, error in zip(order_specs, orders, errors)
+    ]
+
+
+def get_sell_order_results(
+    coin_sales: Dict[str, CoinSale], orders: List[Dict], errors: List[str | None]
+) -> List[OrderPlacementResult]:
+    return [
+        (
+            OrderPlacementResult(
+                coin_sale.coin_properties.coin_name,
+                order=SellOrder(order["client_oid"], buy_order_id),
+            )
+            if error is None
+            else OrderPlacementResult(
+                coin_sale.coin_properties.coin_name, error_message=error
+            )
+        )
+        for (buy_order_id, coin_sale), order, error in zip(
+            coin_sales.items(), orders, errors
+        )
+    ]
+
+
 class CryptoService(ICryptoService):
     market: MarketHttpClient
+    market_snapshot: MarketSnapshot
     user: UserHttpClient
+    wallet_snapshot: WalletSnapshot
 
     def __init__(self):
         self.market = MarketHttpClient()
+        self.market_snapshot = MarketSnapshot(self.market.get_tickers)
         self.user = UserHttpClient(CRYPTO_KEY, CRYPTO_SECRET_KEY)
+        self.wallet_snapshot = WalletSnapshot()
+        self.market_data: MarketDataService | None = None
+        self.user_data: UserDataService | None = None
 
-    def __get_coin_balance(self, coin_name: str, wallet_balance: UserBalanceJson):
-        name = coin_name.split("_")[0] if "_USD" in coin_name else coin_name
+    def start_market_data_stream(
+        self,
+        url: str = CRYPTO_WEBSOCKET_MARKET_URL,
+        on_trades: Callable[[List[LatestTrade]], None] | None = None,
+    ):
+        """Streams tickers for every USD instrument via websocket. Latest trades are read from the
+        stream rather than requested via REST for as long as the stream is live, and each batch of
+        pushed trades is passed to on_trades."""
 
-        balance = next(
-            (x for x in wallet_balance.position_balances if x.instrument_name == name),
-            None,
-        )
+        def on_tickers(tickers: List[TickerJson]):
+            on_trades([ticker_to_latest_trade(ticker) for ticker in tickers])
 
-        return (
-            mappings.json_to_position_balance(balance) if balance is not None else None
-        )
+        if self.market_data is None:
+            self.market_data = MarketDataService(
+                self.__get_usd_instrument_names,
+                url,
+                on_tickers if on_trades is not None else None,
+                market=self.market,
+            )
 
-    def get_coin_balance(self, coin_name: str) -> PositionBalance | None:
-        wallet_balance = self.user.get_balance()
+        self.market_data.start()
 
-        return self.__get_coin_balance(coin_name, wallet_balance)
+    def stop_market_data_stream(self):
+        if self.market_data is not None:
+            self.market_data.stop()
 
-    def get_cash_balance(self) -> CashBalance:
-        wallet_balance = self.user.get_balance()
-        usd_balance = float(self.__get_coin_balance("USD", wallet_balance).market_value)
+    def __get_usd_instrument_names(self) -> List[str]:
+        return [
+            ticker.instrument_name
+            for ticker in self.market_snapshot.get_tickers()
+            if ticker.instrument_name.endswith("_USD")
+        ]
 
-        return CashBalance(usd_balance, wallet_balance.total_cash_balance)
+    def start_user_data_stream(
+        self,
+        url: str = CRYPTO_WEBSOCKET_USER_URL,
+        on_orders: Callable[[List[OrderDetailJson]], None] | None = None,
+    ):
+        """Streams order and balance updates via websocket. Order details and the wallet are read
+        from the stream rather than requested via REST whilst the stream is live."""
+        if self.user_data is None:
+            self.user_data = UserDataService(
+                self.user.api_key, self.user.api_secret_key, url, on_orders
+            )
 
-    def get_investable_coin_count(self) -> int:
-        cash_balance = self.get_cash_balance()
-        usd_balance = cash_balance.usd_balance
-        total_estimated_value_usd = cash_balance.total_estimated_value_usd
+        self.user_data.start()
 
-        percentage_to_invest = (
-            usd_balance / total_estimated_value_usd - 0.5
-        )  # TODO make configurable
+    def stop_user_data_stream(self):
+        if self.user_data is not None:
+            self.user_data.stop()
 
-        number_of_coins_to_invest = (
-            math.floor(
-                total_estimated_value_usd * percentage_to_invest / INVESTMENT_INCREMENTS
-            )
-            if percentage_to_invest > 0
-            else 0
-        )
+    def __get_wallet_snapshot(self) -> WalletSnapshot:
+        wallet_balance = get_streamed_wallet_balance(self.user_data)
+
+        if wallet_balance is None and self.wallet_snapshot.wallet_balance is None:
+            wallet_balance = self.user.get_balance()
+
+        if wallet_balance is not None:
+            self.wallet_snapshot.update(wallet_balance)
+
+        return self.wallet_snapshot
+
+    def get_connection_stats(self) -> List[ConnectionStats]:
+        """Connection reuse per host across both the public and private API clients."""
+        return self.market.get_connection_stats() + self.user.get_connection_stats()
+
+    def get_decode_stats(self) -> List[DecodeStats]:
+        """Time spent decoding responses from the public and private APIs."""
+        return [self.market.get_decode_stats(), self.user.get_decode_stats()]
+
+    def get_rate_limit_stats(self) -> List[RateLimitStats]:
+        """Requests made and time spent queued per rate limit bucket."""
+        rate_limiters = {
+            id(client.rate_limiter): client.rate_limiter
+            for client in [self.market, self.user]
+        }
 
-        return number_of_coins_to_invest
+        return [
+            stats
+            for rate_limiter in rate_limiters.values()
+            for stats in rate_limiter.get_stats()
+        ]
+
+    def get_stream_stats(self) -> List[StreamStats]:
+        """Reconnections and backfilled gaps per websocket stream that has been started."""
+        return [
+            stream.get_stream_stats()
+            for stream in [self.market_data, self.user_data]
+            if stream is not None
+        ]
+
+    def invalidate_wallet_snapshot(self):
+        self.wallet_snapshot.invalidate()
+
+    def get_coin_balance(self, coin_name: str) -> PositionBalance | None:
+        return self.__get_wallet_snapshot().get_coin_balance(coin_name)
+
+    def get_cash_balance(self) -> CashBalance:
+        return self.__get_wallet_snapshot().get_cash_balance()
+
+    def get_investable_coin_count(self) -> int:
+        return calculate_investable_coin_count(self.get_cash_balance())
 
     def get_latest_trade(self, coin_name: str) -> LatestTrade:
-        ticker_json = self.market.get_ticker(coin_name)
+        ticker_json = get_streamed_ticker(self.market_data, coin_name)
 
-        return LatestTrade(ticker_json.instrument_name, ticker_json.latest_trade)
+        if ticker_json is None:
+            ticker_json = self.market_snapshot.get_ticker(coin_name)
+
+        # Fall back to requesting the ticker directly if it's missing from the bulk request.
+        if ticker_json is None:
+            ticker_json = self.market.get_ticker(coin_name)
+
+        return ticker_to_latest_trade(ticker_json)
 
     def get_latest_trades(self) -> List[LatestTrade]:
-        tickers = self.market.get_usd_tickers()
-        trades = [
-            LatestTrade(ticker.instrument_name, ticker.latest_trade)
-            for ticker in tickers
-        ]
+        tickers = get_streamed_tickers(self.market_data)
 
-        return trades
+        if len(tickers) == 0:
+            tickers = self.market_snapshot.get_tickers()
+
+        return [
+            ticker_to_latest_trade(ticker)
+            for ticker in self.market.get_usd_tickers(tickers)
+        ]
 
     def get_coin_time_series_data(self, coin_name: str, hours=24) -> dict:
         return self.market.get_valuation(coin_name, "mark_price", hours)
 
+    def get_coin_time_series(self, coin_name: str, hours=24) -> TimeSeries:
+        time_series = get_streamed_time_series(self.market_data, coin_name, hours)
+
+        if time_series is not None:
+            return time_series
+
+        t, v = self.market.get_valuation_arrays(coin_name, "mark_price", hours)
+
+        return valuation_arrays_to_time_series(t, v)
+
     def get_order_detail(self, order_id: str) -> OrderDetail:
         order_detail_json = self.user.get_order_detail(order_id)
 
         return mappings.json_to_order_detail(order_detail_json)
 
+    def __add_order_history(
+        self,
+        order_details: Dict[str, OrderDetail],
+        remaining_order_ids: Set[str],
+        account: AccountState | None,
+    ):
+        """Pages back through order history until every remaining order has been found, or
+        CRYPTO_ORDER_HISTORY_MAX_PAGES have been requested."""
+        end_time_ms = env.time.now_in_ms()
+
+        for _ in range(CRYPTO_ORDER_HISTORY_MAX_PAGES):
+            if len(remaining_order_ids) == 0:
+                break
+
+            orders = self.user.get_order_history(
+                end_time_ms - CRYPTO_ORDER_HISTORY_WINDOW_MS,
+                end_time_ms,
+                CRYPTO_ORDER_HISTORY_PAGE_SIZE,
+            )
+
+            add_order_details(order_details, remaining_order_ids, orders, account)
+            end_time_ms = get_previous_order_history_end_time(orders, end_time_ms)
+
+    def get_order_details(self, order_ids: List[str]) -> Dict[str, OrderDetail]:
+        """Open orders and order history are fetched in bulk and matched against the given order
+        ids. Only orders missing from both are requested individually - e.g. orders older than
+        the pages of order history requested. Whilst the user data stream is live, orders it has seen
+        aren't requested at all, and orders fetched via REST are added to its
+        account state."""
+        remaining_order_ids = set(str(order_id) for order_id in order_ids)
+        order_details: Dict[str, OrderDetail] = {}
+        account = get_streamed_account(self.user_data)
+
+        add_streamed_order_details(order_details, remaining_order_ids, account)
+
+        if len(remaining_order_ids) == 0:
+            return order_details
+
+        add_order_details(
+            order_details, remaining_order_ids, self.user.get_open_orders(), account
+        )
+
+        self.__add_order_history(order_details, remaining_order_ids, account)
+
+        for order_id in list(remaining_order_ids):
+            add_order_details(
+                order_details,
+                remaining_order_ids,
+                [self.user.get_order_detail(order_id)],
+                account,
+            )
+
+        return order_details
+
     def get_coin_properties(self) -> List[CoinProperties]:
         instruments = self.market.get_instruments()
 
@@ -110,11 +541,10 @@ class CryptoService(ICryptoService):
             "BUY",
         )
 
-        return BuyOrder(
-            buy_order_id=order.client_oid,
-            coin_name=order_spec.coin_properties.coin_name,
-            price_per_coin=order_spec.price_per_coin,
-        )
+        # Reserved quantities have changed, so the wallet needs to be fetched again.
+        self.invalidate_wallet_snapshot()
+
+        return get_buy_order(order_spec, order.client_oid)
 
     def place_coin_sell_order(
         self, buy_order_id: str, coin_sale: CoinSale
@@ -126,6 +556,343 @@ class CryptoService(ICryptoService):
             "SELL",
         )
 
+        self.invalidate_wallet_snapshot()
+
         sell_order = SellOrder(order.client_oid, buy_order_id)
 
         return sell_order
+
+    def __reconcile_orders(
+        self, orders: List[Dict], error: Exception | str
+    ) -> List[str | None]:
+        """Looks for orders on the exchange after a request that may have placed them failed."""
+        try:
+            placed_orders = self.user.get_open_orders() + self.user.get_order_history()
+        except RequestException as request_error:
+            logger.error(
+                f"Unable to confirm whether {len(orders)} orders were placed: "
+                + f"{request_error}"
+            )
+            placed_orders = []
+
+        return get_reconciled_order_errors(orders, placed_orders, str(error))
+
+    def __place_orders(self, orders: List[Dict]) -> List[str | None]:
+        """Places orders via private/create-order-list and returns an error per order, or None if
+        the order was placed."""
+        errors = []
+
+        for chunk in get_order_list_chunks(orders):
+            try:
+                results = self.user.create_order_list(chunk)
+            except RequestException as request_error:
+                # Earlier chunks may have been placed already - raising here would lose track of
+                # them, so the chunk is reported per order instead.
+                logger.warning(request_error)
+
+                status = (
+                    request_error.response.status_code
+                    if isinstance(request_error, HTTPError)
+                    and request_error.response is not None
+                    else None
+                )
+
+                errors += (
+                    self.__reconcile_orders(chunk, request_error)
+                    if is_order_placement_ambiguous(status)
+                    else [str(request_error)] * len(chunk)
+                )
+                continue
+
+            chunk_errors = get_order_list_errors(len(chunk), results)
+            unconfirmed = get_unconfirmed_order_indices(chunk_errors)
+
+            if len(unconfirmed) > 0:
+                reconciled_errors = self.__reconcile_orders(
+                    [chunk[i] for i in unconfirmed], ORDER_LIST_MISSING_RESULT_ERROR
+                )
+
+                for i, error in zip(unconfirmed, reconciled_errors):
+                    chunk_errors[i] = error
+
+            errors += chunk_errors
+
+        self.invalidate_wallet_snapshot()
+
+        return errors
+
+    def place_coin_buy_orders(
+        self, order_specs: List[CoinPurchase]
+    ) -> List[OrderPlacementResult]:
+        orders = get_buy_order_params(order_specs)
+
+        return get_buy_order_results(order_specs, orders, self.__place_orders(orders))
+
+    def place_coin_sell_orders(
+        self, coin_sales: Dict[str, CoinSale]
+    ) -> List[OrderPlacementResult]:
+        orders = get_sell_order_params(coin_sales)
+
+        return get_sell_order_results(coin_sales, orders, self.__place_orders(orders))
+
+
+class AsyncCryptoService(IAsyncCryptoService):
+    """Asyncio equivalent of CryptoService, allowing a single event loop to make many concurrent
+    requests - e.g. asyncio.gather over get_coin_time_series for every coin. Streams started by a
+    CryptoService can be shared via market_data and user_data."""
+
+    market: AsyncMarketHttpClient
+    user: AsyncUserHttpClient
+    wallet_snapshot: WalletSnapshot
+
+    def __init__(
+        self,
+        market: AsyncMarketHttpClient | None = None,
+        user: AsyncUserHttpClient | None = None,
+        market_data: MarketDataService | None = None,
+        user_data: UserDataService | None = None,
+    ):
+        self.market = market if market is not None else AsyncMarketHttpClient()
+        self.user = (
+            user
+            if user is not None
+            else AsyncUserHttpClient(CRYPTO_KEY, CRYPTO_SECRET_KEY)
+        )
+        self.wallet_snapshot = WalletSnapshot()
+        self.market_data = market_data
+        self.user_data = user_data
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def close(self):
+        await self.market.close()
+        await self.user.close()
+
+    async def __get_wallet_snapshot(self) -> WalletSnapshot:
+        wallet_balance = get_streamed_wallet_balance(self.user_data)
+
+        if wallet_balance is None and self.wallet_snapshot.wallet_balance is None:
+            wallet_balance = await self.user.get_balance()
+
+        if wallet_balance is not None:
+            self.wallet_snapshot.update(wallet_balance)
+
+        return self.wallet_snapshot
+
+    def invalidate_wallet_snapshot(self):
+        self.wallet_snapshot.invalidate()
+
+    async def get_coin_balance(self, coin_name: str) -> PositionBalance | None:
+        return (await self.__get_wallet_snapshot()).get_coin_balance(coin_name)
+
+    async def get_cash_balance(self) -> CashBalance:
+        return (await self.__get_wallet_snapshot()).get_cash_balance()
+
+    async def get_investable_coin_count(self) -> int:
+        return calculate_investable_coin_count(await self.get_cash_balance())
+
+    async def get_latest_trade(self, coin_name: str) -> LatestTrade:
+        ticker_json = get_streamed_ticker(self.market_data, coin_name)
+
+        if ticker_json is None:
+            ticker_json = await self.market.get_ticker(coin_name)
+
+        return ticker_to_latest_trade(ticker_json)
+
+    async def get_latest_trades(self) -> List[LatestTrade]:
+        tickers = get_streamed_tickers(self.market_data)
+
+        return [
+            ticker_to_latest_trade(ticker)
+            for ticker in await self.market.get_usd_tickers(
+                tickers if len(tickers) > 0 else None
+            )
+        ]
+
+    async def get_coin_time_series_data(self, coin_name: str, hours=24) -> dict:
+        return await self.market.get_valuation(coin_name, "mark_price", hours)
+
+    async def get_coin_time_series(self, coin_name: str, hours=24) -> TimeSeries:
+        time_series = get_streamed_time_series(self.market_data, coin_name, hours)
+
+        if time_series is not None:
+            return time_series
+
+        t, v = await self.market.get_valuation_arrays(coin_name, "mark_price", hours)
+
+        return valuation_arrays_to_time_series(t, v)
+
+    async def get_order_detail(self, order_id: str) -> OrderDetail:
+        order_detail_json = await self.user.get_order_detail(order_id)
+
+        return mappings.json_to_order_detail(order_detail_json)
+
+    async def __add_order_history(
+        self,
+        order_details: Dict[str, OrderDetail],
+        remaining_order_ids: Set[str],
+        account: AccountState | None,
+    ):
+        """See CryptoService.__add_order_history - pages are requested one after another, as each
+        page's end time depends on the previous page."""
+        end_time_ms = env.time.now_in_ms()
+
+        for _ in range(CRYPTO_ORDER_HISTORY_MAX_PAGES):
+            if len(remaining_order_ids) == 0:
+                break
+
+            orders = await self.user.get_order_history(
+                end_time_ms - CRYPTO_ORDER_HISTORY_WINDOW_MS,
+                end_time_ms,
+                CRYPTO_ORDER_HISTORY_PAGE_SIZE,
+            )
+
+            add_order_details(order_details, remaining_order_ids, orders, account)
+            end_time_ms = get_previous_order_history_end_time(orders, end_time_ms)
+
+    async def get_order_details(self, order_ids: List[str]) -> Dict[str, OrderDetail]:
+        """See CryptoService.get_order_details - orders missing from the bulk requests are
+        requested concurrently."""
+        remaining_order_ids = set(str(order_id) for order_id in order_ids)
+        order_details: Dict[str, OrderDetail] = {}
+        account = get_streamed_account(self.user_data)
+
+        add_streamed_order_details(order_details, remaining_order_ids, account)
+
+        if len(remaining_order_ids) == 0:
+            return order_details
+
+        add_order_details(
+            order_details,
+            remaining_order_ids,
+            await self.user.get_open_orders(),
+            account,
+        )
+
+        await self.__add_order_history(order_details, remaining_order_ids, account)
+
+        add_order_details(
+            order_details,
+            remaining_order_ids,
+            await asyncio.gather(
+                *(
+                    self.user.get_order_detail(order_id)
+                    for order_id in list(remaining_order_ids)
+                )
+            ),
+            account,
+        )
+
+        return order_details
+
+    async def get_coin_properties(self) -> List[CoinProperties]:
+        instruments = await self.market.get_instruments()
+
+        return [
+            mappings.json_to_coin_properties(instrument) for instrument in instruments
+        ]
+
+    async def place_coin_buy_order(self, order_spec: CoinPurchase) -> BuyOrder:
+        order = await self.user.create_order(
+            order_spec.coin_properties.coin_name,
+            order_spec.price_per_coin,
+            order_spec.quantity,
+            "BUY",
+        )
+
+        self.invalidate_wallet_snapshot()
+
+        return get_buy_order(order_spec, order.client_oid)
+
+    async def place_coin_sell_order(
+        self, buy_order_id: str, coin_sale: CoinSale
+    ) -> SellOrder:
+        order = await self.user.create_order(
+            coin_sale.coin_properties.coin_name,
+            coin_sale.price_per_coin,
+            coin_sale.quantity,
+            "SELL",
+        )
+
+        self.invalidate_wallet_snapshot()
+
+        return SellOrder(order.client_oid, buy_order_id)
+
+    async def __reconcile_orders(
+        self, orders: List[Dict], error: Exception | str
+    ) -> List[str | None]:
+        """See CryptoService.__reconcile_orders."""
+        try:
+            placed_orders = await self.user.get_open_orders()
+            placed_orders += await self.user.get_order_history()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as request_error:
+            logger.error(
+                f"Unable to confirm whether {len(orders)} orders were placed: "
+                + f"{request_error}"
+            )
+            placed_orders = []
+
+        return get_reconciled_order_errors(orders, placed_orders, str(error))
+
+    async def __place_orders(self, orders: List[Dict]) -> List[str | None]:
+        """See CryptoService.__place_orders - chunks are placed concurrently."""
+
+        async def place_chunk(chunk: List[Dict]) -> List[str | None]:
+            try:
+                results = await self.user.create_order_list(chunk)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as request_error:
+                logger.warning(request_error)
+
+                status = (
+                    request_error.status
+                    if isinstance(request_error, aiohttp.ClientResponseError)
+                    else None
+                )
+
+                if is_order_placement_ambiguous(status):
+                    return await self.__reconcile_orders(chunk, request_error)
+
+                return [str(request_error)] * len(chunk)
+
+            errors = get_order_list_errors(len(chunk), results)
+            unconfirmed = get_unconfirmed_order_indices(errors)
+
+            if len(unconfirmed) > 0:
+                reconciled_errors = await self.__reconcile_orders(
+                    [chunk[i] for i in unconfirmed], ORDER_LIST_MISSING_RESULT_ERROR
+                )
+
+                for i, error in zip(unconfirmed, reconciled_errors):
+                    errors[i] = error
+
+            return errors
+
+        chunk_errors = await asyncio.gather(
+            *(place_chunk(chunk) for chunk in get_order_list_chunks(orders))
+        )
+
+        self.invalidate_wallet_snapshot()
+
+        return [error for errors in chunk_errors for error in errors]
+
+    async def place_coin_buy_orders(
+        self, order_specs: List[CoinPurchase]
+    ) -> List[OrderPlacementResult]:
+        orders = get_buy_order_params(order_specs)
+
+        return get_buy_order_results(
+            order_specs, orders, await self.__place_orders(orders)
+        )
+
+    async def place_coin_sell_orders(
+        self, coin_sales: Dict[str, CoinSale]
+    ) -> List[OrderPlacementResult]:
+        orders = get_sell_order_params(coin_sales)
+
+        return get_sell_order_results(
+            coin_sales, orders, await self.__place_orders(orders)
+        )
@@ -0,0 +1,109 @@
+from threading import Lock
+import time
+from typing import Callable, Dict, List
+
+from investorbot.constants import INVESTOR_APP_TICKER_MAX_AGE_SECONDS
+from investorbot.integrations.cryptodotcom import mappings
+from investorbot.integrations.cryptodotcom.structs import (
+    PositionBalanceJson,
+    TickerJson,
+    UserBalanceJson,
+)
+from investorbot.models import CashBalance
+from investorbot.structs.internal import PositionBalance
+
+
+def get_coin_balance_name(coin_name: str) -> str:
+    return coin_name.split("_")[0] if "_USD" in coin_name else coin_name
+
+
+class MarketSnapshot:
+    """Latest ticker for every instrument, refreshed from a single bulk public/get-tickers request
+    once the snapshot is older than max_age_seconds. Routines running within seconds of each other
+    read from the same snapshot rather than requesting a ticker per coin."""
+
+    def __init__(
+        self,
+        fetch_tickers: Callable[[], List[TickerJson]],
+        max_age_seconds: float = INVESTOR_APP_TICKER_MAX_AGE_SECONDS,
+    ):
+        self.max_age_seconds = max_age_seconds
+        self.__fetch_tickers = fetch_tickers
+        self.__tickers: Dict[str, TickerJson] = {}
+        self.__refreshed_at: float | None = None
+        self.__lock = Lock()
+
+    @property
+    def is_fresh(self) -> bool:
+        return (
+            self.__refreshed_at is not None
+            and time.monotonic() - self.__refreshed_at <= self.max_age_seconds
+        )
+
+    def __refresh_if_stale(self):
+        # Only one thread needs to refresh a stale snapshot - the rest wait for it.
+        with self.__lock:
+            if self.is_fresh:
+                return
+
+            tickers = self.__fetch_tickers()
+
+            self.__tickers = {ticker.instrument_name: ticker for ticker in tickers}
+            self.__refreshed_at = time.monotonic()
+
+    def invalidate(self):
+        self.__refreshed_at = None
+
+    def update(self, tickers: List[TickerJson]):
+        """Replaces individual tickers without affecting when the snapshot is next refreshed."""
+        with self.__lock:
+            for ticker in tickers:
+                self.__tickers[ticker.instrument_name] = ticker
+
+    def get_ticker(self, instrument_name: str) -> TickerJson | None:
+        self.__refresh_if_stale()
+
+        return self.__tickers.get(instrument_name)
+
+    def get_tickers(self) -> List[TickerJson]:
+        self.__refresh_if_stale()
+
+        return list(self.__tickers.values())
+
+
+class WalletSnapshot:
+    """The user's wallet, fetched once and reused until invalidated. Position balances are indexed
+    by currency name."""
+
+    def __init__(self):
+        self.__wallet_balance: UserBalanceJson | None = None
+        self.__position_balances: Dict[str, PositionBalanceJson] = {}
+
+    @property
+    def wallet_balance(self) -> UserBalanceJson | None:
+        return self.__wallet_balance
+
+    def invalidate(self):
+        self.__wallet_balance = None
+
+    def update(self, wallet_balance: UserBalanceJson):
+        if wallet_balance is self.__wallet_balance:
+            return
+
+        self.__position_balances = {
+            balance.instrument_name: balance
+            for balance in wallet_balance.position_balances
+        }
+        self.__wallet_balance = wallet_balance
+
+    def get_coin_balance(self, coin_name: str) -> PositionBalance | None:
+        balance = self.__position_balances.get(get_coin_balance_name(coin_name))
+
+        return (
+            mappings.json_to_position_balance(balance) if balance is not None else None
+        )
+
+    def get_cash_balance(self) -> CashBalance:
+        usd_balance = float(self.get_coin_balance("USD").market_value)
+
+        return CashBalance(usd_balance, float(self.__wallet_balance.total_cash_balance))
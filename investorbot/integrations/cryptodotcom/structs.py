@@ -70,6 +70,18 @@ class OrderJson:
     client_oid: str
 
 
+@dataclass
+class OrderListResultJson:
+    """Result of a single order placed via private/create-order-list. A non-zero code means the
+    order was rejected. index is None if the exchange didn't return one."""
+
+    index: int | None
+    code: int
+    order_id: int | None = None
+    client_oid: str | None = None
+    message: str | None = None
+
+
 @dataclass
 class OrderDetailJson:
     account_id: str
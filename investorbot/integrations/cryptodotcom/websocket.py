@@ -0,0 +1,538 @@
+import asyncio
+from bisect import bisect_left, bisect_right
+from collections import deque
+import json
+import logging
+import random
+from threading import Lock, Thread
+import time
+from typing import Callable, Deque, Dict, List, Tuple
+
+import numpy as np
+
+from websockets.asyncio.client import ClientConnection, connect
+
+from investorbot import env
+from investorbot.constants import DEFAULT_LOGS_NAME
+from investorbot import mappings
+from investorbot.integrations.cryptodotcom.constants import (
+    CRYPTO_VALUATION_SAMPLE_INTERVAL_MS,
+    CRYPTO_WEBSOCKET_MARKET_URL,
+    CRYPTO_WEBSOCKET_SUBSCRIPTION_SIZE,
+    CRYPTO_WEBSOCKET_USER_URL,
+)
+from investorbot.integrations.cryptodotcom.http.base import RequestSigner
+from investorbot.integrations.cryptodotcom.http.decoding import JsonDecoder
+from investorbot.integrations.cryptodotcom.http.market import MarketHttpClient
+from investorbot.integrations.cryptodotcom.http.user import (
+    json_to_order_detail_json,
+    json_to_user_balance,
+)
+from investorbot.integrations.cryptodotcom.structs import (
+    OrderDetailJson,
+    TickerJson,
+    UserBalanceJson,
+)
+from investorbot.structs.internal import StreamStats, TimeSeries
+
+logger = logging.getLogger(DEFAULT_LOGS_NAME)
+
+HEARTBEAT_INTERVAL_SECONDS = 30.0
+"""Crypto.com sends a heartbeat every 30 seconds, so a live connection never goes quiet for
+longer."""
+
+CONNECT_DELAY_SECONDS = 1.0
+"""Crypto.com recommends waiting a second after connecting before sending requests, as rate
+limits are pro-rated from the time the connection was established."""
+
+RECONNECT_BASE_DELAY_SECONDS = 1.0
+RECONNECT_MAX_DELAY_SECONDS = 60.0
+
+PRICE_HISTORY_SIZE = 2880
+"""Samples kept per instrument - i.e. 24 hours at the public/get-valuations sample interval."""
+
+
+def get_reconnect_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter, so clients dropped at the same time don't all
+    reconnect at the same time."""
+    return random.uniform(
+        0.0,
+        min(RECONNECT_MAX_DELAY_SECONDS, RECONNECT_BASE_DELAY_SECONDS * 2**attempt),
+    )
+
+
+class PriceStore:
+    """Latest ticker per instrument. Written by a single market data thread and read from any
+    thread without locks - each update replaces an instrument's ticker in a single dict
+    assignment, which is atomic in CPython, and stored tickers are never modified."""
+
+    def __init__(self):
+        self.__tickers: Dict[str, TickerJson] = {}
+
+    def __len__(self):
+        return len(self.__tickers)
+
+    def update(self, ticker: TickerJson):
+        self.__tickers[ticker.instrument_name] = ticker
+
+    def get_ticker(self, instrument_name: str) -> TickerJson | None:
+        return self.__tickers.get(instrument_name)
+
+    def get_tickers(self) -> List[TickerJson]:
+        return list(self.__tickers.values())
+
+
+class PriceHistory:
+    """Mark price per instrument, sampled at most once per sample interval so streamed prices line
+    up with public/get-valuations mark_price data. Gaps left by dropped connections can be
+    backfilled from that data. Unlike PriceStore, samples are appended in place, so reads and
+    writes share a lock."""
+
+    def __init__(
+        self,
+        sample_interval_ms: int = CRYPTO_VALUATION_SAMPLE_INTERVAL_MS,
+        max_size: int = PRICE_HISTORY_SIZE,
+    ):
+        self.sample_interval_ms = sample_interval_ms
+        self.max_size = max_size
+        self.__samples: Dict[str, Deque[Tuple[int, float]]] = {}
+        self.__lock = Lock()
+
+    def __len__(self):
+        return len(self.__samples)
+
+    def add(self, instrument_name: str, time_ms: int, value: float):
+        with self.__lock:
+            samples = self.__samples.get(instrument_name)
+
+            if samples is None:
+                samples = deque(maxlen=self.max_size)
+                self.__samples[instrument_name] = samples
+
+            if len(samples) == 0 or time_ms - samples[-1][0] >= self.sample_interval_ms:
+                samples.append((time_ms, value))
+
+    def backfill(self, instrument_name: str, samples: List[Tuple[int, float]]) -> int:
+        """Merges samples into the instrument's history, skipping any that overlap an existing
+        sample. Returns the number of samples added."""
+        with self.__lock:
+            existing_samples = self.__samples.get(instrument_name, [])
+            existing_times = [time_ms for time_ms, _ in existing_samples]
+
+            def is_overlapping(time_ms: int) -> bool:
+                # Only the nearest existing sample either side can overlap.
+                i = bisect_left(existing_times, time_ms)
+
+                return any(
+                    abs(time_ms - existing_times[j]) < self.sample_interval_ms
+                    for j in (i - 1, i)
+                    if 0 <= j < len(existing_times)
+                )
+
+            new_samples = [
+                (time_ms, value)
+                for time_ms, value in samples
+                if not is_overlapping(time_ms)
+            ]
+
+            if len(new_samples) > 0:
+                self.__samples[instrument_name] = deque(
+                    sorted(list(existing_samples) + new_samples),
+                    maxlen=self.max_size,
+                )
+
+            return len(new_samples)
+
+    def get_latest_times(self) -> Dict[str, int]:
+        with self.__lock:
+            return {
+                instrument_name: samples[-1][0]
+                for instrument_name, samples in self.__samples.items()
+                if len(samples) > 0
+            }
+
+    def get_time_series(
+        self, instrument_name: str, start_time_ms: int | None = None
+    ) -> TimeSeries | None:
+        """Samples from the last one at or before start_time_ms onwards, or all samples if no
+        start time is given. Returns None if the history doesn't reach back that far."""
+        with self.__lock:
+            samples = list(self.__samples.get(instrument_name, []))
+
+        if start_time_ms is not None:
+            i = bisect_right([time_ms for time_ms, _ in samples], start_time_ms)
+            samples = samples[i - 1 :] if i > 0 else []
+
+        if len(samples) == 0:
+            return None
+
+        # Ordered from most recent to oldest, as returned by public/get-valuations.
+        t = np.array([time_ms for time_ms, _ in reversed(samples)], dtype=np.float64)
+        v = np.array([value for _, value in reversed(samples)], dtype=np.float64)
+
+        return mappings.valuation_arrays_to_time_series(t, v)
+
+
+class AccountState:
+    """Latest order details and wallet balance pushed via the user channels. Like PriceStore,
+    readers never need a lock - orders and the wallet are replaced, never modified."""
+
+    def __init__(self):
+        self.__orders: Dict[str, OrderDetailJson] = {}
+        self.__wallet_balance: UserBalanceJson | None = None
+
+    def clear(self):
+        self.__orders = {}
+        self.__wallet_balance = None
+
+    def update_order(self, order: OrderDetailJson):
+        """Orders are keyed by client_oid. Updates older than the stored order are ignored, so
+        orders fetched via REST can be added without overwriting newer pushed ones."""
+        order_id = str(order.client_oid)
+        existing_order = self.__orders.get(order_id)
+
+        if existing_order is None or int(order.update_time) >= int(
+            existing_order.update_time
+        ):
+            self.__orders[order_id] = order
+
+    def update_wallet_balance(self, wallet_balance: UserBalanceJson):
+        self.__wallet_balance = wallet_balance
+
+    def get_order(self, order_id: str) -> OrderDetailJson | None:
+        return self.__orders.get(str(order_id))
+
+    def get_wallet_balance(self) -> UserBalanceJson | None:
+        return self.__wallet_balance
+
+
+class WebsocketService:
+    """Runs a websocket connection on its own thread and event loop, so routines on other threads
+    never wait on it. Heartbeats are answered and dropped connections are reopened here -
+    subclasses subscribe to channels in on_connect, receive each channel's results via on_result
+    and catch up on anything missed whilst disconnected via on_reconnect."""
+
+    def __init__(self, url: str, name: str):
+        self.url = url
+        self.name = name
+        self.decoder = JsonDecoder()
+        self.__thread: Thread | None = None
+        self.__loop: asyncio.AbstractEventLoop | None = None
+        self.__task: asyncio.Task | None = None
+        self.__is_connected = False
+        self.__last_message_at: float | None = None
+        self.__reconnect_task: asyncio.Task | None = None
+        self.__reconnect_count = 0
+        self.__gap_count = 0
+        self.__backfilled_sample_count = 0
+        self.__total_backfill_seconds = 0.0
+        self.__max_backfill_seconds = 0.0
+
+    @property
+    def is_live(self) -> bool:
+        """Whether the stream is connected and has heard from the exchange recently. Channels
+        only push changes, so a live stream's data is current even if it's been quiet for a
+        while."""
+        return (
+            self.__is_connected
+            and self.__last_message_at is not None
+            and time.monotonic() - self.__last_message_at
+            <= 2 * HEARTBEAT_INTERVAL_SECONDS
+        )
+
+    def start(self):
+        if self.__thread is not None and self.__thread.is_alive():
+            return
+
+        self.__thread = Thread(target=self.__run_loop, name=self.name, daemon=True)
+        self.__thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        if self.__loop is not None and self.__task is not None:
+            self.__loop.call_soon_threadsafe(self.__task.cancel)
+
+        if self.__thread is not None:
+            self.__thread.join(timeout)
+
+    def join(self):
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def get_stream_stats(self) -> StreamStats:
+        return StreamStats(
+            self.name,
+            self.is_live,
+            self.__reconnect_count,
+            self.__gap_count,
+            self.__backfilled_sample_count,
+            self.__total_backfill_seconds,
+            self.__max_backfill_seconds,
+        )
+
+    def record_backfill(self, gap_count: int, sample_count: int, seconds: float):
+        self.__gap_count += gap_count
+        self.__backfilled_sample_count += sample_count
+        self.__total_backfill_seconds += seconds
+        self.__max_backfill_seconds = max(self.__max_backfill_seconds, seconds)
+
+    async def on_connect(self, websocket: ClientConnection):
+        pass
+
+    async def on_reconnect(self, reconnected_at_ms: int):
+        """Runs alongside the stream once resubscribed, so messages are still handled whilst
+        any missed data is fetched."""
+        pass
+
+    def on_result(self, result: dict):
+        pass
+
+    async def subscribe(self, websocket: ClientConnection, channels: List[str]):
+        logger.info(f"{self.name} subscribing to {len(channels)} channels.")
+
+        for i in range(0, len(channels), CRYPTO_WEBSOCKET_SUBSCRIPTION_SIZE):
+            await websocket.send(
+                json.dumps(
+                    {
+                        "id": i + 1,
+                        "method": "subscribe",
+                        "params": {
+                            "channels": channels[
+                                i : i + CRYPTO_WEBSOCKET_SUBSCRIPTION_SIZE
+                            ]
+                        },
+                        "nonce": env.time.now_in_ms(),
+                    }
+                )
+            )
+
+    async def receive(self, websocket: ClientConnection) -> dict:
+        """Waits for the next message, for requests that need a response before continuing."""
+        message = await websocket.recv()
+        self.__last_message_at = time.monotonic()
+
+        return self.decoder.decode(message)
+
+    async def handle_message(self, websocket: ClientConnection, message_dict: dict):
+        method = message_dict.get("method")
+
+        if method == "public/heartbeat":
+            await websocket.send(
+                json.dumps(
+                    {"id": message_dict["id"], "method": "public/respond-heartbeat"}
+                )
+            )
+        elif message_dict.get("code", 0) != 0:
+            logger.warning(f"{self.name} request failed: {message_dict}")
+        elif "channel" in message_dict.get("result", {}):
+            self.on_result(message_dict["result"])
+
+    def __run_loop(self):
+        self.__loop = asyncio.new_event_loop()
+        self.__task = self.__loop.create_task(self.__stream())
+
+        try:
+            self.__loop.run_until_complete(self.__task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as error:
+            logger.error(f"{self.name} stopped: {error}")
+        finally:
+            self.__is_connected = False
+            self.__loop.close()
+
+    async def __stream(self):
+        attempt = 0
+        has_connected = False
+
+        while True:
+            try:
+                async with connect(self.url) as websocket:
+                    self.__is_connected = True
+                    self.__last_message_at = time.monotonic()
+
+                    await asyncio.sleep(CONNECT_DELAY_SECONDS)
+                    await self.on_connect(websocket)
+
+                    attempt = 0
+
+                    if has_connected:
+                        self.__reconnect_count += 1
+                        self.__reconnect_task = asyncio.create_task(
+                            self.on_reconnect(env.time.now_in_ms())
+                        )
+
+                    has_connected = True
+
+                    async for message in websocket:
+                        self.__last_message_at = time.monotonic()
+                        await self.handle_message(
+                            websocket, self.decoder.decode(message)
+                        )
+
+                logger.warning(f"{self.name} connection closed.")
+            except Exception as error:
+                logger.warning(f"{self.name} connection failed: {error}")
+
+            self.__is_connected = False
+
+            delay = get_reconnect_delay(attempt)
+            attempt += 1
+
+            logger.info(f"{self.name} reconnecting in {delay:.1f} seconds.")
+
+            await asyncio.sleep(delay)
+
+
+class MarketDataService(WebsocketService):
+    """Streams ticker updates for the given instruments into a PriceStore, and their mark prices
+    into a PriceHistory. Intervals missed whilst disconnected are backfilled into the history via
+    public/get-valuations, so it never silently skips a period of time."""
+
+    def __init__(
+        self,
+        get_instrument_names: Callable[[], List[str]],
+        url: str = CRYPTO_WEBSOCKET_MARKET_URL,
+        on_tickers: Callable[[List[TickerJson]], None] | None = None,
+        market: MarketHttpClient | None = None,
+    ):
+        super().__init__(url, "MarketDataService")
+        self.prices = PriceStore()
+        self.history = PriceHistory()
+        self.market = market if market is not None else MarketHttpClient()
+        self.__get_instrument_names = get_instrument_names
+        self.__on_tickers = on_tickers
+
+    def backfill(self, reconnected_at_ms: int) -> Tuple[int, int]:
+        """Requests valuations for every instrument whose history stops more than a sample
+        interval before reconnecting. Returns the number of gaps and samples added."""
+        gap_count = 0
+        sample_count = 0
+        max_age_ms = self.history.max_size * self.history.sample_interval_ms
+
+        for instrument_name, latest_time_ms in self.history.get_latest_times().items():
+            gap_ms = min(reconnected_at_ms - latest_time_ms, max_age_ms)
+
+            if gap_ms <= self.history.sample_interval_ms:
+                continue
+
+            gap_count += 1
+
+            valuations = self.market.get_valuation(
+                instrument_name,
+                "mark_price",
+                (gap_ms + self.history.sample_interval_ms) / (1000 * 60 * 60),
+            )
+
+            sample_count += self.history.backfill(
+                instrument_name,
+                [
+                    (int(valuation["t"]), float(valuation["v"]))
+                    for valuation in valuations
+                    if latest_time_ms < int(valuation["t"]) <= reconnected_at_ms
+                ],
+            )
+
+        return gap_count, sample_count
+
+    async def on_reconnect(self, reconnected_at_ms: int):
+        start_time = time.perf_counter()
+
+        try:
+            gap_count, sample_count = await asyncio.to_thread(
+                self.backfill, reconnected_at_ms
+            )
+        except Exception as error:
+            logger.error(f"Failed to backfill market data: {error}")
+            return
+
+        duration = time.perf_counter() - start_time
+
+        logger.info(
+            f"Backfilled {sample_count} samples across {gap_count} gaps in "
+            + f"{duration:.3f} seconds."
+        )
+
+        self.record_backfill(gap_count, sample_count, duration)
+
+    async def on_connect(self, websocket: ClientConnection):
+        instrument_names = self.__get_instrument_names()
+
+        await self.subscribe(
+            websocket,
+            [f"ticker.{instrument_name}" for instrument_name in instrument_names]
+            + [f"mark.{instrument_name}" for instrument_name in instrument_names],
+        )
+
+    def on_result(self, result: dict):
+        if result["channel"] == "mark":
+            # Sampled from the same price source as public/get-valuations mark_price data.
+            for data in result["data"]:
+                self.history.add(
+                    result["instrument_name"], int(data["t"]), float(data["v"])
+                )
+
+            return
+
+        if result["channel"] != "ticker":
+            return
+
+        tickers = [TickerJson(data) for data in result["data"]]
+
+        for ticker in tickers:
+            self.prices.update(ticker)
+
+        if self.__on_tickers is not None:
+            self.__on_tickers(tickers)
+
+
+class UserDataService(RequestSigner, WebsocketService):
+    """Streams the user's order and balance updates into an AccountState. The connection is
+    authenticated with the same signing scheme as the private REST API."""
+
+    def __init__(
+        self,
+        api_key: str,
+        api_secret_key: str,
+        url: str = CRYPTO_WEBSOCKET_USER_URL,
+        on_orders: Callable[[List[OrderDetailJson]], None] | None = None,
+    ):
+        super().__init__(url, "UserDataService")
+        self.api_key = api_key
+        self.api_secret_key = api_secret_key
+        self.id_incr = 1
+        self.account = AccountState()
+        self.__on_orders = on_orders
+
+    async def on_connect(self, websocket: ClientConnection):
+        # Updates pushed whilst disconnected are lost, so orders and the wallet are fetched via
+        # REST again until the stream has caught up.
+        self.account.clear()
+
+        await websocket.send(json.dumps(self.create_auth_request()))
+
+        # Subscriptions are only accepted once authenticated. Heartbeats may arrive first.
+        while True:
+            message_dict = await self.receive(websocket)
+
+            if message_dict.get("method") != "public/auth":
+                await self.handle_message(websocket, message_dict)
+                continue
+
+            if message_dict.get("code", 0) != 0:
+                raise ConnectionError(f"Authentication failed: {message_dict}")
+
+            break
+
+        await self.subscribe(websocket, ["user.order", "user.balance"])
+
+    def on_result(self, result: dict):
+        if result["channel"] == "user.balance":
+            self.account.update_wallet_balance(json_to_user_balance(result["data"]))
+        elif result["channel"].startswith("user.order"):
+            orders = [json_to_order_detail_json(order) for order in result["data"]]
+
+            for order in orders:
+                self.account.update_order(order)
+
+            if self.__on_orders is not None:
+                self.__on_orders(orders)
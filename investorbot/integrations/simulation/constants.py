@@ -3,3 +3,12 @@ from investorbot.constants import INVESTOR_APP_PATH
 SIMULATION_DB_PATH = f"{INVESTOR_APP_PATH}simulation.db"
 SIMULATION_DB_CONNECTION = f"sqlite:///{SIMULATION_DB_PATH}"
 TIME_SERIES_DATA_PATH = f"{INVESTOR_APP_PATH}/simulation.csv"
+
+SIMULATION_WARM_UP_STEPS = 2880
+"""Number of time increments generated up front - enough for an initial market analysis."""
+
+SIMULATION_RETENTION_STEPS = 4320
+"""Number of time increments retained per coin - 24 hours at the default 20 second increment."""
+
+SIMULATION_TREND_UPDATE_STEPS = 10
+"""The overall market trend may shift once every this many time increments."""
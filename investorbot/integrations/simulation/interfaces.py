@@ -3,7 +3,7 @@ from datetime import datetime
 from typing import List, Tuple
 
 from investorbot.interfaces.providers import ITimeProvider
-from investorbot.structs.internal import LatestTrade
+from investorbot.structs.internal import LatestTrade, TimeSeries
 
 
 class ITimeSimulation(ITimeProvider):
@@ -35,6 +35,10 @@ class IDataProvider(ABC):
     def get_coin_time_series_data(self, coin_name: str) -> dict:
         pass
 
+    @abstractmethod
+    def get_coin_time_series(self, coin_name: str) -> TimeSeries:
+        pass
+
     @abstractmethod
     def increment_ts_data(self) -> Tuple[dict, datetime]:
         pass
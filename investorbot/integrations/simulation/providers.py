@@ -1,19 +1,24 @@
 from datetime import datetime, timedelta
 import logging
+from threading import Lock
 import time
 from typing import List, Tuple
 import numpy as np
-import pandas as pd
-from pandas import DataFrame
+from numpy import ndarray
 
 from investorbot import env
 from investorbot.constants import DEFAULT_LOGS_NAME
+from investorbot.integrations.simulation.constants import (
+    SIMULATION_RETENTION_STEPS,
+    SIMULATION_TREND_UPDATE_STEPS,
+    SIMULATION_WARM_UP_STEPS,
+)
 from investorbot.integrations.simulation.data.tickers import TICKERS
 from investorbot.integrations.simulation.interfaces import (
     IDataProvider,
     ITimeSimulation,
 )
-from investorbot.structs.internal import LatestTrade
+from investorbot.structs.internal import LatestTrade, TimeSeries
 
 logger = logging.getLogger(DEFAULT_LOGS_NAME)
 
@@ -43,8 +48,65 @@ class SimulatedTimeProvider(ITimeSimulation):
         return self.now_time
 
 
+class TimeSeriesBuffer:
+    """Preallocated ring buffer holding a value per coin for each point in time. Once capacity is
+    reached the oldest values are overwritten, so memory use stays fixed however long the
+    simulation runs."""
+
+    def __init__(self, coin_names: List[str], capacity: int):
+        self.coin_names = coin_names
+        self.columns = {coin_name: i for i, coin_name in enumerate(coin_names)}
+        self.capacity = capacity
+        self.count = 0
+        self.lock = Lock()
+
+        self.times = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros((capacity, len(coin_names)), dtype=np.float64)
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def extend(self, times: ndarray, values: ndarray):
+        """Appends a row of values per time, with one column per coin in the order of
+        coin_names."""
+        count = len(times)
+
+        # Rows which would immediately be overwritten are never written.
+        times = times[-self.capacity :]
+        values = values[-self.capacity :]
+
+        with self.lock:
+            start = self.count + count - len(times)
+            indices = np.arange(start, start + len(times)) % self.capacity
+
+            self.times[indices] = times
+            self.values[indices] = values
+            self.count += count
+
+    def get_time_series(self, coin_name: str) -> Tuple[ndarray, ndarray]:
+        """Returns copies of the times and values retained for the given coin, ordered from
+        oldest to most recent."""
+        column = self.columns[coin_name]
+
+        with self.lock:
+            if self.count <= self.capacity:
+                return (
+                    self.times[: self.count].copy(),
+                    self.values[: self.count, column].copy(),
+                )
+
+            start = self.count % self.capacity
+
+            return (
+                np.concatenate((self.times[start:], self.times[:start])),
+                np.concatenate(
+                    (self.values[start:, column], self.values[:start, column])
+                ),
+            )
+
+
 class DataProvider(IDataProvider):
-    time_series_data: DataFrame
+    time_series_data: TimeSeriesBuffer = None
     """Cached market value history. Used to fetch timeseries data."""
 
     rng = None
@@ -71,7 +133,7 @@ class DataProvider(IDataProvider):
             logger.info(
                 "As this is a static data provider, let's generate some static data."
             )
-            self.run_in_real_time(steps=1)
+            self.run_in_real_time(steps=0)
 
     def roll_dice(self) -> float:
         return self.rng.integers(low=1, high=6, endpoint=True, size=4).mean()
@@ -103,32 +165,42 @@ class DataProvider(IDataProvider):
         else:
             logger.info(f"Market change trending at {self.trend_percentage}%")
 
-    def get_random_value(self, mean, st_deviation):
+    def get_random_values(self, mean, st_deviation, size) -> ndarray:
         """Generate random values based on normal distribution."""
-        return np.random.normal(loc=mean, scale=st_deviation)
+        return self.rng.normal(loc=mean, scale=st_deviation, size=size)
 
-    def increment_ts_data(self) -> DataFrame:
-        """Updates self.current_ticker_values and returns corresponding DataFrame to append to cached
-        time series data."""
+    def increment_ts_data(self, steps=1) -> Tuple[dict, datetime]:
+        """Increments time by the given number of steps, generating a new value for every coin at
+        each step. Values are appended to the cached time series data and self.current_ticker_values
+        is updated to the latest values."""
 
         current_ticker_values = self.current_ticker_values[0]
-        trend_percentage = self.trend_percentage
+        coin_names = list(current_ticker_values.keys())
 
         sigma = 0.0004  # standard deviation
 
-        for coin_name in current_ticker_values.keys():
-            s = self.get_random_value(trend_percentage, sigma)
+        times = np.empty(steps, dtype=np.int64)
 
-            new_price = float(current_ticker_values[coin_name]) * (1 + s)
-            current_ticker_values[coin_name] = new_price
+        for i in range(steps):
+            env.time.increment_time()
+            times[i] = env.time.now_in_ms()
 
-        current_time = env.time.now_in_ms()
+        s = self.get_random_values(
+            self.trend_percentage, sigma, (steps, len(coin_names))
+        )
 
-        self.current_ticker_values = current_ticker_values, current_time
+        values = np.fromiter(
+            (float(current_ticker_values[coin_name]) for coin_name in coin_names),
+            np.float64,
+            len(coin_names),
+        ) * np.cumprod(1 + s, axis=0)
 
-        df = pd.DataFrame(current_ticker_values, index=[current_time])
-        df.index.name = "t"
-        return df
+        self.time_series_data.extend(times, values)
+
+        current_ticker_values.update(zip(coin_names, values[-1].tolist()))
+        self.current_ticker_values = current_ticker_values, int(times[-1])
+
+        return self.current_ticker_values
 
     def get_latest_trade(self, coin_name: str) -> LatestTrade:
         return LatestTrade(coin_name, self.current_ticker_values[0][coin_name])
@@ -141,25 +213,34 @@ class DataProvider(IDataProvider):
 
     def get_coin_time_series_data(self, coin_name: str) -> dict:
         # TODO:
-        #       converting DataFrame to List[dict] seems a bit superfluous here - this is a hangup
+        #       converting arrays to List[dict] seems a bit superfluous here - this is a hangup
         #       from the application being designed around the Crypto.com API - can most likely be
         #       simplified.
 
-        coin_data = self.time_series_data[coin_name]
-        coin_data = [{"t": x, "v": y} for x, y in zip(coin_data.index, coin_data)]
+        t, v = self.time_series_data.get_time_series(coin_name)
 
         # TODO make investorbot intelligent enough to recognize ordering of data rather than
         # reversing here.
-        coin_data.reverse()
+        return [{"t": x, "v": y} for x, y in zip(t[::-1].tolist(), v[::-1].tolist())]
 
-        return coin_data
+    def get_coin_time_series(self, coin_name: str) -> TimeSeries:
+        """Reads time series data straight from the ring buffer without converting it to the JSON
+        format used by get_coin_time_series_data."""
+        t, v = self.time_series_data.get_time_series(coin_name)
 
-    def run_in_real_time(self, steps=3600):
-        i = 0
+        time_offset = int(t[0])
 
+        return TimeSeries((t - time_offset) / (1000 * 60 * 60), v, time_offset)
+
+    def run_in_real_time(self, steps=3600):
         initial_data = get_first_row()
-        time_series_data = pd.DataFrame(initial_data, index=[self.start_time])
-        time_series_data.index.name = "t"
+
+        time_series_data = TimeSeriesBuffer(
+            list(initial_data.keys()), SIMULATION_RETENTION_STEPS
+        )
+        time_series_data.extend(
+            np.array([self.start_time]), np.array([list(initial_data.values())])
+        )
         self.time_series_data = time_series_data
 
         if not isinstance(env.time, ITimeSimulation):
@@ -167,24 +248,31 @@ class DataProvider(IDataProvider):
                 "Tried incrementing time whilst running in realtime."
             )
 
-        # TODO make i values configurable
-        while i < (steps + 2880):
-            current_time = env.time.increment_time()
-            new_values = self.increment_ts_data()
+        i = 0
+
+        # Warm up generates enough data to run an initial market analysis. Values are generated in
+        # bulk up to each market trend update, rather than one step at a time.
+        while i < SIMULATION_WARM_UP_STEPS:
+            steps_until_update = -i % SIMULATION_TREND_UPDATE_STEPS
+            chunk_size = min(steps_until_update + 1, SIMULATION_WARM_UP_STEPS - i)
+
+            self.increment_ts_data(chunk_size)
+            i += chunk_size
+
+            if (i - 1) % SIMULATION_TREND_UPDATE_STEPS == 0:
+                self.trend_updater()
+
+        logger.info("Finished generating initial market data!")
 
-            # TODO could end up being a performance bottleneck here.
-            self.time_series_data = pd.concat([self.time_series_data, new_values])
+        # After warm up run the simulation as though it's generating realtime data.
+        while i < (steps + SIMULATION_WARM_UP_STEPS):
+            self.increment_ts_data()
 
-            if i % 10 == 0:
+            if i % SIMULATION_TREND_UPDATE_STEPS == 0:
                 self.trend_updater()
 
-            logger.info(current_time)
+            logger.info(env.time.now())
 
-            # After 2880 there's enough data to run an initial market analysis so after 2880 run the
-            # simulation as though it's generating realtime data.
-            if i > 2880:
-                if i <= 2881:
-                    logger.info("Finished generating initial market data!")
-                time.sleep(1)
+            time.sleep(1)
 
             i += 1
@@ -1,11 +1,12 @@
 from datetime import datetime
 import logging
 import math
-from typing import List
+from typing import Dict, List
 import uuid
 
 import sqlalchemy
 from sqlalchemy import func
+from sqlalchemy.orm import Session
 from investorbot import env
 from investorbot.constants import INVESTMENT_INCREMENTS, DEFAULT_LOGS_NAME
 from investorbot.enums import OrderStatus
@@ -28,7 +29,13 @@ from investorbot.integrations.simulation.models import (
     PositionBalanceSimulated,
 )
 from investorbot.structs.egress import CoinPurchase, CoinSale
-from investorbot.structs.internal import LatestTrade, OrderDetail, PositionBalance
+from investorbot.structs.internal import (
+    LatestTrade,
+    OrderDetail,
+    OrderPlacementResult,
+    PositionBalance,
+    TimeSeries,
+)
 
 logger = logging.getLogger(DEFAULT_LOGS_NAME)
 
@@ -115,8 +122,10 @@ class SimulatedCryptoService(ICryptoService):
 
         return cash_balance
 
-    def __get_coin_balance(self, coin_name: str) -> PositionBalanceSimulated | None:
-        session = self.simulation_db.session
+    def __get_coin_balance(
+        self, coin_name: str, session: Session | None = None
+    ) -> PositionBalanceSimulated | None:
+        session = session if session is not None else self.simulation_db.session
 
         data = (
             session.query(
@@ -132,6 +141,7 @@ class SimulatedCryptoService(ICryptoService):
     # TODO method can most likely be simplified.
     def __adjust_balance(
         self,
+        session: Session,
         coin_name: str,
         quantity: float,
         total_value: float,
@@ -139,7 +149,7 @@ class SimulatedCryptoService(ICryptoService):
     ):
         quantity = float(quantity)
 
-        current_wallet_entry = self.__get_coin_balance(coin_name)
+        current_wallet_entry = self.__get_coin_balance(coin_name, session)
 
         if current_wallet_entry is None:
             current_wallet_entry = PositionBalanceSimulated(coin_name, 0.0, 0.0)
@@ -173,7 +183,9 @@ New quantity is {new_coin_quantity}
             reserved_quantity=0.0,
         )
 
-        self.simulation_db.add_wallet_entry(new_wallet_entry)
+        # Added to the given session so that several adjustments can share a transaction.
+        new_wallet_entry.creation_time = env.time.now()
+        session.add(new_wallet_entry)
 
     def __get_position_balance_adjustment(
         self, coin_name, quantity_str, price_per_coin_str, fee_pct=0.005
@@ -212,6 +224,10 @@ New quantity is {new_coin_quantity}
             reserved_quantity=result.reserved_quantity,
         )
 
+    def invalidate_wallet_snapshot(self):
+        # Wallet balances are always read straight from the simulation database.
+        pass
+
     def get_investable_coin_count(self) -> int:
         # TODO update tests once percentage-to-invest is configurable
         cash_balance = self.get_cash_balance()
@@ -242,14 +258,10 @@ New quantity is {new_coin_quantity}
     def get_coin_time_series_data(self, coin_name: str, hours=24) -> dict:
         return self.data.get_coin_time_series_data(coin_name)
 
-    def get_order_detail(self, order_id: str) -> OrderDetail:
-        session = self.simulation_db.session
-
-        query = sqlalchemy.select(OrderDetailSimulated).where(
-            OrderDetailSimulated.order_id == order_id
-        )
-        data = session.scalar(query)
+    def get_coin_time_series(self, coin_name: str, hours=24) -> TimeSeries:
+        return self.data.get_coin_time_series(coin_name)
 
+    def __to_order_detail(self, data: OrderDetailSimulated) -> OrderDetail:
         time_created_ms: datetime = data.creation_time
 
         return OrderDetail(
@@ -263,6 +275,28 @@ New quantity is {new_coin_quantity}
             time_created_ms=int(time_created_ms.timestamp() * 1000),
         )
 
+    def get_order_detail(self, order_id: str) -> OrderDetail:
+        session = self.simulation_db.session
+
+        query = sqlalchemy.select(OrderDetailSimulated).where(
+            OrderDetailSimulated.order_id == order_id
+        )
+        data = session.scalar(query)
+
+        return self.__to_order_detail(data)
+
+    def get_order_details(self, order_ids: List[str]) -> Dict[str, OrderDetail]:
+        session = self.simulation_db.session
+
+        query = sqlalchemy.select(OrderDetailSimulated).where(
+            OrderDetailSimulated.order_id.in_(order_ids)
+        )
+
+        return {
+            data.order_id: self.__to_order_detail(data)
+            for data in session.scalars(query)
+        }
+
     def get_coin_properties(self) -> List[CoinProperties]:
         coin_properties = [
             mappings.json_to_coin_properties(InstrumentJson(**coin_properties))
@@ -271,7 +305,9 @@ New quantity is {new_coin_quantity}
 
         return coin_properties
 
-    def place_coin_buy_order(self, order_spec: CoinPurchase) -> BuyOrder:
+    def __place_coin_buy_order(
+        self, session: Session, order_spec: CoinPurchase
+    ) -> BuyOrder:
         order_id = self.__get_guid()
         coin_name = order_spec.coin_properties.coin_name
 
@@ -292,8 +328,10 @@ New quantity is {new_coin_quantity}
         fee_currency = result.fee_currency
         fee_amount = result.fee_amount
 
-        self.__adjust_balance("USD", quantity, total_value, True)
-        self.__adjust_balance(fee_currency, net_quantity, net_total_value, False)
+        self.__adjust_balance(session, "USD", quantity, total_value, True)
+        self.__adjust_balance(
+            session, fee_currency, net_quantity, net_total_value, False
+        )
 
         order_detail = OrderDetailSimulated(
             status=OrderStatus.COMPLETED,
@@ -308,14 +346,43 @@ New quantity is {new_coin_quantity}
         current_time = env.time.now()
         order_detail.creation_time = current_time
 
-        self.simulation_db.add_item(order_detail)
+        session.add(order_detail)
 
         buy_order.creation_time = current_time
 
         return buy_order
 
-    def place_coin_sell_order(
-        self, buy_order_id: str, coin_sale: CoinSale
+    def place_coin_buy_order(self, order_spec: CoinPurchase) -> BuyOrder:
+        with self.simulation_db.session as session:
+            buy_order = self.__place_coin_buy_order(session, order_spec)
+            session.commit()
+
+        return buy_order
+
+    def place_coin_buy_orders(
+        self, order_specs: List[CoinPurchase]
+    ) -> List[OrderPlacementResult]:
+        """Wallet adjustments for every order are committed in a single transaction."""
+        results = []
+
+        with self.simulation_db.session as session:
+            for order_spec in order_specs:
+                coin_name = order_spec.coin_properties.coin_name
+
+                try:
+                    buy_order = self.__place_coin_buy_order(session, order_spec)
+                    results.append(OrderPlacementResult(coin_name, order=buy_order))
+                except ValueError as error:
+                    results.append(
+                        OrderPlacementResult(coin_name, error_message=str(error))
+                    )
+
+            session.commit()
+
+        return results
+
+    def __place_coin_sell_order(
+        self, session: Session, buy_order_id: str, coin_sale: CoinSale
     ) -> SellOrder:
         sell_order_id = self.__get_guid()
 
@@ -332,8 +399,10 @@ New quantity is {new_coin_quantity}
         fee_currency = result.fee_currency
         fee_amount = result.fee_amount
 
-        self.__adjust_balance("USD", quantity, net_total_value, False)
-        self.__adjust_balance(fee_currency, net_quantity, net_total_value, True)
+        self.__adjust_balance(session, "USD", quantity, net_total_value, False)
+        self.__adjust_balance(
+            session, fee_currency, net_quantity, net_total_value, True
+        )
 
         order_detail = OrderDetailSimulated(
             status=OrderStatus.COMPLETED,
@@ -348,9 +417,42 @@ New quantity is {new_coin_quantity}
         current_time = env.time.now()
         order_detail.creation_time = current_time
 
-        self.simulation_db.add_item(order_detail)
+        session.add(order_detail)
 
         sell_order = SellOrder(sell_order_id, buy_order_id)
         sell_order.creation_time = current_time
 
         return sell_order
+
+    def place_coin_sell_order(
+        self, buy_order_id: str, coin_sale: CoinSale
+    ) -> SellOrder:
+        with self.simulation_db.session as session:
+            sell_order = self.__place_coin_sell_order(session, buy_order_id, coin_sale)
+            session.commit()
+
+        return sell_order
+
+    def place_coin_sell_orders(
+        self, coin_sales: Dict[str, CoinSale]
+    ) -> List[OrderPlacementResult]:
+        """Wallet adjustments for every order are committed in a single transaction."""
+        results = []
+
+        with self.simulation_db.session as session:
+            for buy_order_id, coin_sale in coin_sales.items():
+                coin_name = coin_sale.coin_properties.coin_name
+
+                try:
+                    sell_order = self.__place_coin_sell_order(
+                        session, buy_order_id, coin_sale
+                    )
+                    results.append(OrderPlacementResult(coin_name, order=sell_order))
+                except ValueError as error:
+                    results.append(
+                        OrderPlacementResult(coin_name, error_message=str(error))
+                    )
+
+            session.commit()
+
+        return results
@@ -1,9 +1,15 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Dict, List
 
 from investorbot.models import BuyOrder, CashBalance, CoinProperties, SellOrder
 from investorbot.structs.egress import CoinPurchase, CoinSale
-from investorbot.structs.internal import LatestTrade, OrderDetail, PositionBalance
+from investorbot.structs.internal import (
+    LatestTrade,
+    OrderDetail,
+    OrderPlacementResult,
+    PositionBalance,
+    TimeSeries,
+)
 
 
 class ICryptoService(ABC):
@@ -20,6 +26,13 @@ class ICryptoService(ABC):
     def get_investable_coin_count(self) -> int:
         pass
 
+    @abstractmethod
+    def invalidate_wallet_snapshot(self):
+        """Wallet balances may be reused between calls to get_coin_balance, get_cash_balance and
+        get_investable_coin_count. This forces the next call to fetch the wallet again.
+        """
+        pass
+
     @abstractmethod
     def get_latest_trade(self, coin_name: str) -> LatestTrade:
         pass
@@ -32,10 +45,22 @@ class ICryptoService(ABC):
     def get_coin_time_series_data(self, coin_name: str, hours=24) -> dict:
         pass
 
+    @abstractmethod
+    def get_coin_time_series(self, coin_name: str, hours=24) -> TimeSeries:
+        """Columnar equivalent of get_coin_time_series_data - time series data is returned as
+        arrays ready for analysis."""
+        pass
+
     @abstractmethod
     def get_order_detail(self, order_id: str) -> OrderDetail:
         pass
 
+    @abstractmethod
+    def get_order_details(self, order_ids: List[str]) -> Dict[str, OrderDetail]:
+        """Fetches the details of multiple orders at once, keyed by order id. Orders that can't be
+        found are omitted."""
+        pass
+
     @abstractmethod
     def get_coin_properties(self) -> List[CoinProperties]:
         pass
@@ -49,3 +74,90 @@ class ICryptoService(ABC):
         self, buy_order_id: str, coin_sale: CoinSale
     ) -> SellOrder:
         pass
+
+    @abstractmethod
+    def place_coin_buy_orders(
+        self, order_specs: List[CoinPurchase]
+    ) -> List[OrderPlacementResult]:
+        """Places several buy orders at once. Results are returned in the same order as the given
+        order specs, and a failed order doesn't prevent the remaining orders being placed.
+        """
+        pass
+
+    @abstractmethod
+    def place_coin_sell_orders(
+        self, coin_sales: Dict[str, CoinSale]
+    ) -> List[OrderPlacementResult]:
+        """Same as place_coin_buy_orders, with coin sales keyed by the id of the buy order being
+        sold."""
+        pass
+
+
+class IAsyncCryptoService(ABC):
+    """Asyncio equivalent of ICryptoService."""
+
+    @abstractmethod
+    async def get_coin_balance(self, coin_name: str) -> PositionBalance | None:
+        pass
+
+    @abstractmethod
+    async def get_cash_balance(self) -> CashBalance:
+        pass
+
+    @abstractmethod
+    async def get_investable_coin_count(self) -> int:
+        pass
+
+    @abstractmethod
+    def invalidate_wallet_snapshot(self):
+        pass
+
+    @abstractmethod
+    async def get_latest_trade(self, coin_name: str) -> LatestTrade:
+        pass
+
+    @abstractmethod
+    async def get_latest_trades(self) -> List[LatestTrade]:
+        pass
+
+    @abstractmethod
+    async def get_coin_time_series_data(self, coin_name: str, hours=24) -> dict:
+        pass
+
+    @abstractmethod
+    async def get_coin_time_series(self, coin_name: str, hours=24) -> TimeSeries:
+        pass
+
+    @abstractmethod
+    async def get_order_detail(self, order_id: str) -> OrderDetail:
+        pass
+
+    @abstractmethod
+    async def get_order_details(self, order_ids: List[str]) -> Dict[str, OrderDetail]:
+        pass
+
+    @abstractmethod
+    async def get_coin_properties(self) -> List[CoinProperties]:
+        pass
+
+    @abstractmethod
+    async def place_coin_buy_order(self, order_spec: CoinPurchase) -> BuyOrder:
+        pass
+
+    @abstractmethod
+    async def place_coin_sell_order(
+        self, buy_order_id: str, coin_sale: CoinSale
+    ) -> SellOrder:
+        pass
+
+    @abstractmethod
+    async def place_coin_buy_orders(
+        self, order_specs: List[CoinPurchase]
+    ) -> List[OrderPlacementResult]:
+        pass
+
+    @abstractmethod
+    async def place_coin_sell_orders(
+        self, coin_sales: Dict[str, CoinSale]
+    ) -> List[OrderPlacementResult]:
+        pass
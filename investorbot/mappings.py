@@ -0,0 +1,36 @@
+from typing import List, Tuple
+import numpy as np
+from numpy import ndarray
+from investorbot.structs.internal import TimeSeries
+
+
+def valuation_data_to_arrays(valuation_data: List[dict]) -> Tuple[ndarray, ndarray]:
+    """Decodes valuation data in the format [{ 'v': '1.0' 't': 1 }, ... ] into float64 arrays of
+    times and values, in the same order."""
+    count = len(valuation_data)
+
+    t = np.fromiter((entry["t"] for entry in valuation_data), np.float64, count)
+    v = np.fromiter((entry["v"] for entry in valuation_data), np.float64, count)
+
+    return t, v
+
+
+def valuation_data_to_time_series(valuation_data: List[dict]) -> TimeSeries:
+    """Decodes valuation data ordered from most recent to oldest straight into float64 arrays. The
+    arrays are returned as reversed views rather than copies."""
+    return valuation_arrays_to_time_series(*valuation_data_to_arrays(valuation_data))
+
+
+def valuation_arrays_to_time_series(t: ndarray, v: ndarray) -> TimeSeries:
+    """Same as valuation_data_to_time_series for times in milliseconds and values already decoded
+    into float64 arrays, ordered from most recent to oldest. t is converted to hours in place.
+    """
+    count = len(t)
+
+    time_offset = int(t[-1]) if count > 0 else 0
+
+    # Convert to hours in place.
+    t -= time_offset
+    t /= 1000 * 60 * 60
+
+    return TimeSeries(t[::-1], v[::-1], time_offset)
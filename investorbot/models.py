@@ -17,7 +17,7 @@ from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
 from sqlalchemy.orm import MappedAsDataclass
 
-from investorbot.enums import TrendLineState
+from investorbot.enums import BuyOrderState, TrendLineState
 
 
 def camel_case(s) -> str:
@@ -85,6 +85,9 @@ class BuyOrder(TimestampMixin, SerializableBase):
     buy_order_id: Mapped[str] = mapped_column(primary_key=True)
     coin_name: Mapped[str] = mapped_column(ForeignKey("coin_properties.coin_name"))
     price_per_coin: Mapped[float] = mapped_column(Float())
+    state: Mapped[str] = mapped_column(
+        String(), default=BuyOrderState.OPEN, index=True, init=False
+    )
     coin_properties: Mapped[Optional[CoinProperties]] = relationship(
         init=False, back_populates="buy_orders"
     )
@@ -214,6 +217,9 @@ class MarketAnalysis(SerializableBase):
         cascade="all, delete",
     )
 
+    horizon_hours: Mapped[float] = mapped_column(Float(), default=24.0)
+    """The number of hours' worth of time series data the market analysis is based on."""
+
 
 class CoinSelectionCriteria(SerializableBase):
     """Coin selection criteria can be used to configure the app's decision-making process to invest
@@ -1,54 +1,155 @@
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 import logging
+from time import perf_counter
+from typing import Dict, List, Tuple
 
 from argh import arg
-from requests import HTTPError
 from investorbot.context import bot_context
 from investorbot.constants import (
     INVESTMENT_INCREMENTS,
+    INVESTOR_APP_FETCH_CONCURRENCY,
     DEFAULT_LOGS_NAME,
 )
 from investorbot.env import time
 from investorbot.decorators import routine
 from investorbot.models import MarketAnalysis
 from investorbot.structs.egress import CoinPurchase, CoinSale
+from investorbot.structs.internal import (
+    LatestTrade,
+    SellTrigger,
+    TimeSeries,
+)
 import investorbot.analysis as analysis
 
 logger = logging.getLogger(DEFAULT_LOGS_NAME)
 logging.basicConfig(level=logging.INFO)
 
 
-def get_initial_ts_summaries(hours_int):
-    ts_summaries = []
+def get_initial_time_series(
+    hours_int,
+    max_workers: int = INVESTOR_APP_FETCH_CONCURRENCY,
+) -> Tuple[List[str], List[TimeSeries]]:
+    """Fetches time series data for every coin with up to max_workers requests in flight at once.
+    The returned lists are in the same order as get_latest_trades."""
     crypto_service = bot_context.crypto_service
+    start_time = perf_counter()
 
     # Get latest trade prices for all instruments being sold at high trading volume and with USD.
     # TODO Parameterize trading currency rather than hardcoding USD. Also parameterize trading
     # volume threshold - this is being done implicitly in get_latest_trades currently.
-    for latest_trade in crypto_service.get_latest_trades():
-        logger.info(
-            f"Fetching latest {hours_int} hour's worth of data for {latest_trade.coin_name}."
-        )
+    coin_names = [
+        latest_trade.coin_name for latest_trade in crypto_service.get_latest_trades()
+    ]
+    time_series: List[TimeSeries] = [None] * len(coin_names)
 
-        # Time series data refers to x number of hours' worth of data for a particular instrument or
-        # 'coin'.
-        time_series_data = crypto_service.get_coin_time_series_data(
-            latest_trade.coin_name, hours_int
-        )
+    logger.info(
+        f"Fetching latest {hours_int} hour's worth of data for {len(coin_names)} coins."
+    )
 
-        # Convert timeseries data into summary object.
-        ts_summary = analysis.get_coin_time_series_summary(
-            latest_trade.coin_name, time_series_data
-        )
+    # Time series data refers to x number of hours' worth of data for a particular instrument or
+    # 'coin'.
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                crypto_service.get_coin_time_series, coin_name, hours_int
+            ): i
+            for i, coin_name in enumerate(coin_names)
+        }
 
-        # Add to the list of summary objects.
-        ts_summaries.append(ts_summary)
+        try:
+            for future in as_completed(futures):
+                i = futures[future]
+                time_series[i] = future.result()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+
+            raise
+
+    logger.info(
+        f"Fetched time series data for {len(coin_names)} coins in "
+        + f"{perf_counter() - start_time:.3f} seconds."
+    )
 
-    return ts_summaries
+    return coin_names, time_series
+
+
+def get_initial_time_series_matrices(hours_int):
+    coin_names, time_series = get_initial_time_series(hours_int)
+
+    # Stack all coins into (coins x samples) matrices so summaries are calculated in one pass.
+    time_matrix, value_matrix, time_offsets = analysis.get_time_series_matrices(
+        time_series
+    )
+
+    return coin_names, time_matrix, value_matrix, time_offsets
+
+
+def get_initial_ts_summaries(hours_int):
+    summary_cache = bot_context.summary_cache
+
+    coin_names, time_series = get_initial_time_series(hours_int)
+
+    start_time = perf_counter()
+
+    # Coins without any new data since the previous run reuse their cached summary, whilst every
+    # other coin is summarized in a single (coins x samples) pass.
+    summaries = summary_cache.get_summary_batch(coin_names, time_series, hours_int)
+
+    logger.info(
+        f"Summarized {len(coin_names)} coins in {perf_counter() - start_time:.3f} seconds. "
+        + f"Summary cache hits: {summary_cache.hits}, misses: {summary_cache.misses}."
+    )
+
+    return summaries
+
+
+def create_market_analysis(initial_ts_summaries, horizon_hours: float):
+    """Rates the market for a batch of time series summaries, ranks each coin accordingly and
+    stores the resulting market analysis in the application database."""
+    bot_db = bot_context.db_service
+
+    # Rating thresholds are basically a constant - they only exist in the database to the make the
+    # app configurable. FIXME - Rating thresholds are a subset of coin_selection_criteria -
+    # unnecessarily complicated.
+    rating_thresholds = bot_db.get_rating_thresholds()
+
+    # Compare coins and attribute outlier properties to coins with any kind of weird property.
+    partially_complete_ts_summaries = analysis.assign_outlier_properties(
+        initial_ts_summaries
+    )
+
+    # Assign the market analysis with a confidence rating to quantify how well the market is doing.
+    confidence_rating = analysis.get_market_analysis_rating(
+        partially_complete_ts_summaries, rating_thresholds
+    )
+
+    # Fetch the selection criteria based on current market confidence.
+    options = bot_db.get_selection_criteria(confidence_rating.value)
+
+    # Use selection criteria to apply weightings to each coin's rank.
+    complete_ts_summaries = analysis.assign_weighted_rankings(
+        partially_complete_ts_summaries, options
+    )
+
+    # Create the final market analysis object to add to the db. Summaries are only converted to ORM
+    # models at this point.
+    market_analysis = MarketAnalysis(
+        confidence_rating.value,
+        time.now_in_ms(),
+        complete_ts_summaries.to_time_series_summaries(),
+        horizon_hours=horizon_hours,
+    )
+
+    bot_db.add_item(market_analysis)
 
 
 def get_coins_to_purchase():
     crypto_service = bot_context.crypto_service
 
+    # Fetch the wallet once per routine run.
+    crypto_service.invalidate_wallet_snapshot()
+
     coin_count = crypto_service.get_investable_coin_count()
 
     log_message = (
@@ -84,40 +185,37 @@ def refresh_market_analysis_routine(hours: int) -> MarketAnalysis:
     hours_int = int(hours)
     initial_ts_summaries = get_initial_ts_summaries(hours_int)
 
-    # Rating thresholds are basically a constant - they only exist in the database to the make the
-    # app configurable. FIXME - Rating thresholds are a subset of coin_selection_criteria -
-    # unnecessarily complicated.
-    rating_thresholds = bot_db.get_rating_thresholds()
+    create_market_analysis(initial_ts_summaries, hours_int)
 
-    # Compare coins and attribute outlier properties to coins with any kind of weird property.
-    partially_complete_ts_summaries = analysis.assign_outlier_properties(
-        initial_ts_summaries
-    )
+    # Refetch the market analysis here to ensure ORM model is in sync with database.
+    market_analysis, _ = bot_db.get_market_analysis(hours_int)
 
-    # Assign the market analysis with a confidence rating to quantify how well the market is doing.
-    confidence_rating = analysis.get_market_analysis_rating(
-        partially_complete_ts_summaries, rating_thresholds
-    )
+    return market_analysis
 
-    # Fetch the selection criteria based on current market confidence.
-    options = bot_db.get_selection_criteria(confidence_rating.value)
 
-    # Use selection criteria to apply weightings to each coin's rank.
-    complete_ts_summaries = analysis.assign_weighted_rankings(
-        partially_complete_ts_summaries, options
-    )
+@arg(
+    "horizons",
+    default="1,4,24,168",
+    help="Comma separated hours for each market analysis - e.g. 1,4,24,168",
+)
+@routine("Multi-Horizon Market Analysis")
+def refresh_multi_horizon_market_analysis_routine(horizons: str):
+    """Same as the market analysis routine, but stores a market analysis for each of the given
+    horizons. Time series data is fetched once for the longest horizon and each shorter horizon is
+    derived from the most recent values of that data."""
 
-    # Create the final market analysis object to add to the db.
-    market_analysis = MarketAnalysis(
-        confidence_rating.value, time.now_in_ms(), complete_ts_summaries
-    )
+    horizon_hours = sorted(float(hours) for hours in str(horizons).split(","))
 
-    bot_db.add_item(market_analysis)
+    coin_names, time_matrix, value_matrix, time_offsets = (
+        get_initial_time_series_matrices(max(horizon_hours))
+    )
 
-    # Refetch the market analysis here to ensure ORM model is in sync with database.
-    market_analysis, _ = bot_db.get_market_analysis()
+    summary_batches = analysis.get_multi_horizon_summary_batches(
+        coin_names, time_matrix, value_matrix, time_offsets, horizon_hours
+    )
 
-    return market_analysis
+    for hours, initial_ts_summaries in summary_batches.items():
+        create_market_analysis(initial_ts_summaries, hours)
 
 
 @routine("Coin Purchase")
@@ -129,17 +227,11 @@ def buy_coin_routine():
     bot_db = bot_context.db_service
     crypto_service = bot_context.crypto_service
 
-    purchase_count = 0
-    coin_names = get_coins_to_purchase()
-    coin_count = len(coin_names)
+    order_specs = []
 
-    for coin_name in coin_names:
+    for coin_name in get_coins_to_purchase():
         latest_trade = crypto_service.get_latest_trade(coin_name)
 
-        if purchase_count == coin_count:
-            logger.info("Maximum number of coin investments reached.")
-            break
-
         coin_name = latest_trade.coin_name
 
         logger.info(
@@ -148,32 +240,162 @@ def buy_coin_routine():
 
         coin_props = bot_db.get_coin_properties(coin_name)
 
-        spec = CoinPurchase(coin_props, latest_trade.price)
+        order_specs.append(CoinPurchase(coin_props, latest_trade.price))
+
+    if len(order_specs) == 0:
+        return
+
+    # Orders are placed together so that none of them wait on the orders placed before them.
+    buy_orders = []
+
+    for result in crypto_service.place_coin_buy_orders(order_specs):
+        if not result.is_successful:
+            logger.warning(
+                f"Buy order for {result.coin_name} failed: {result.error_message}"
+            )
+            continue
+
+        buy_orders.append(result.order)
+
+    bot_db.add_items(buy_orders)
 
-        buy_order = crypto_service.place_coin_buy_order(spec)
-        bot_db.add_item(buy_order)
 
-        purchase_count += 1
+def place_triggered_sell_orders(triggers: List[SellTrigger], prices: Dict[str, float]):
+    """Places sell orders for triggers popped from the sell trigger queue at the given price per
+    coin. Triggers are marked as sold once sold, or released if their sale failed."""
+    bot_db = bot_context.db_service
+    crypto_service = bot_context.crypto_service
+    sell_triggers = bot_context.sell_triggers
+
+    coin_sales = {
+        trigger.buy_order_id: CoinSale(
+            trigger.coin_properties, prices[trigger.coin_name], trigger.quantity
+        )
+        for trigger in triggers
+    }
+
+    for trigger in triggers:
+        logger.info(
+            f"Selling {trigger.coin_name} at value ratio "
+            + f"{prices[trigger.coin_name] / trigger.price_per_coin}"
+        )
+
+    try:
+        results = crypto_service.place_coin_sell_orders(coin_sales)
+    except Exception:
+        for buy_order_id in coin_sales:
+            sell_triggers.release(buy_order_id)
+
+        raise
+
+    for buy_order_id, result in zip(coin_sales, results):
+        if not result.is_successful:
+            logger.warning(
+                f"Sell order for {result.coin_name} failed: {result.error_message}"
+            )
+            logger.info("Continuing with routine...")
+            sell_triggers.release(buy_order_id)
+        else:
+            bot_db.add_sell_order(result.order)
+            sell_triggers.mark_sold(buy_order_id)
+
+
+def try_place_triggered_sell_orders(
+    triggers: List[SellTrigger], prices: Dict[str, float]
+):
+    """Same as place_triggered_sell_orders, but failures are logged rather than raised."""
+    try:
+        place_triggered_sell_orders(triggers, prices)
+    except Exception as error:
+        logger.error(f"Failed to sell triggered coins: {error}")
+
+
+def pop_triggered_coins(
+    latest_trades: List[LatestTrade],
+) -> Tuple[List[SellTrigger], Dict[str, float]]:
+    """Pops and claims every sell trigger met by the given trades, along with the price per coin
+    that met them."""
+    sell_triggers = bot_context.sell_triggers
+
+    if len(sell_triggers) == 0:
+        return [], {}
+
+    now_ms = time.now_in_ms()
+    triggers = []
+    prices = {}
+
+    for latest_trade in latest_trades:
+        coin_triggers = sell_triggers.pop_triggered(
+            latest_trade.coin_name, latest_trade.price, now_ms
+        )
+
+        if len(coin_triggers) > 0:
+            triggers += coin_triggers
+            prices[latest_trade.coin_name] = latest_trade.price
+
+    return triggers, prices
+
+
+def sell_triggered_coins(latest_trades: List[LatestTrade]):
+    """Sells any coins triggered by the given trades straight away."""
+    triggers, prices = pop_triggered_coins(latest_trades)
+
+    if len(triggers) > 0:
+        try_place_triggered_sell_orders(triggers, prices)
+
+
+def queue_triggered_coin_sales(latest_trades: List[LatestTrade]) -> Future | None:
+    """Pops any coins triggered by the given trades and sells them on the sell worker thread - e.g.
+    as prices are pushed by a market data stream, which shouldn't wait on sales."""
+    triggers, prices = pop_triggered_coins(latest_trades)
+
+    if len(triggers) == 0:
+        return None
+
+    return bot_context.sell_executor.submit(
+        try_place_triggered_sell_orders, triggers, prices
+    )
 
 
 @routine("Sell Coins")
 def sell_coin_routine():
     """Pulls all BuyOrders from the application database, fetches corresponding data via the Crypto
     API and cross-references this with the user's wallet to verify that a SELL trade can be placed.
-    SELL orders will then be placed for coin balances that have met the minimum return threshold -
-    e.g. 101 percent of the original BuyOrder value."""
+    Sellable orders are added to the sell trigger queue, and SELL orders will then be placed for
+    coin balances that have met the minimum return threshold - e.g. 101 percent of the original
+    BuyOrder value - whether that's by the latest trade checked here, or by a later price pushed to
+    sell_triggered_coins."""
 
     bot_db = bot_context.db_service
     crypto_service = bot_context.crypto_service
+    sell_triggers = bot_context.sell_triggers
 
-    # Get all buy orders that have been placed by the app.
-    buy_orders = bot_db.get_all_buy_orders()
+    # Fetch the wallet once per routine run - it's only fetched again after sell orders have been
+    # placed.
+    crypto_service.invalidate_wallet_snapshot()
+
+    # Get buy orders placed by the app that are still awaiting sale. Orders that have already been
+    # sold or cancelled don't need to be checked again, nor remembered by the sell trigger queue.
+    buy_orders = bot_db.get_open_buy_orders()
+
+    sell_triggers.prune_sold({buy_order.buy_order_id for buy_order in buy_orders})
+
+    # Get order details from Crypto.com in bulk - at this the point each order could be in various
+    # states such as: 'COMPLETED', 'CANCELED', 'OTHER', etc. - in other words the order may not yet
+    # be in a state to sell.
+    order_details = crypto_service.get_order_details(
+        [buy_order.buy_order_id for buy_order in buy_orders]
+    )
+
+    now_ms = time.now_in_ms()
+    coin_names = set()
 
     for buy_order in buy_orders:
-        # Get order details from Crypto.com - at this the point the order could be in various states
-        # such as: 'COMPLETED', 'CANCELED', 'OTHER', etc. - in other words the order may not yet be
-        # in a state to sell.
-        order_detail = crypto_service.get_order_detail(buy_order.buy_order_id)
+        order_detail = order_details.get(buy_order.buy_order_id)
+
+        if order_detail is None:
+            logger.warning(f"No order details found for {buy_order.buy_order_id}.")
+            continue
 
         # Attempt to fetch the user's current balance for a particular coin. coin_balance will be
         # None here if the order has not yet been filled and the user has none of the currency in
@@ -187,50 +409,36 @@ def sell_coin_routine():
             buy_order, order_detail, coin_balance
         )
 
-        # If the buy order has been cancelled, there's no reason to store the order id in the
-        # database, hence delete any reference to the order.
+        # If the buy order has been cancelled, there's no reason to check the order again.
         if validation_result.order_has_been_cancelled:
-            bot_db.delete_buy_order(buy_order.buy_order_id)
+            bot_db.cancel_buy_order(buy_order.buy_order_id)
 
         # No further action required if the buy order cannot be sold at this time.
         if not coin_is_sellable:
+            sell_triggers.remove(buy_order.buy_order_id)
             logger.info(validation_result.reasoning(buy_order.coin_name))
             continue
 
-        # TODO potentially use websockets here to track the price.
-        #
-        # region Potential Web Socket Routine
-        latest_trade = crypto_service.get_latest_trade(buy_order.coin_name)
-
-        value_ratio = latest_trade.price / buy_order.price_per_coin
-
-        if not analysis.is_value_ratio_sufficient(value_ratio, order_detail):
-            logger.info(f"Value ratio {value_ratio} not sufficient.")
-            continue
-
-        coin_sale = CoinSale(
-            buy_order.coin_properties,
-            latest_trade.price,
-            order_detail.order_quantity_minus_fee,
+        # The order is sold as soon as a price meets the decaying value ratio threshold.
+        sell_triggers.add(
+            SellTrigger(
+                buy_order.buy_order_id,
+                buy_order.coin_name,
+                buy_order.price_per_coin,
+                order_detail.order_quantity_minus_fee,
+                order_detail.time_created_ms,
+                buy_order.coin_properties,
+            ),
+            now_ms,
         )
+        coin_names.add(buy_order.coin_name)
 
-        logger.info(
-            f"Selling {coin_sale.coin_properties.coin_name} at value ratio {value_ratio}"
-        )
+    # Check the latest trades too, in case prices aren't being pushed.
+    sell_triggered_coins(
+        [crypto_service.get_latest_trade(coin_name) for coin_name in coin_names]
+    )
 
-        try:
-            sell_order = crypto_service.place_coin_sell_order(
-                buy_order.buy_order_id, coin_sale
-            )
-            bot_db.add_item(sell_order)
-        except HTTPError as http_error:
-            # ! FIXME need to find the specific error here rather than hiding 500 errors.
-            if http_error.response.status_code != 500:
-                raise http_error
-            else:
-                logger.warning(http_error)
-                logger.info("Continuing with routine...")
-        # endregion
+    logger.info(f"{len(sell_triggers)} orders awaiting a sufficient value ratio.")
 
     cash_balance = crypto_service.get_cash_balance()
     bot_db.add_item(cash_balance)
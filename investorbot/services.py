@@ -9,8 +9,10 @@ import sqlalchemy
 from sqlalchemy import Engine
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import StaticPool
 
 from investorbot import env
+from investorbot.enums import BuyOrderState
 from investorbot.integrations.cryptodotcom import mappings
 from investorbot.constants import (
     DEFAULT_LOGS_NAME,
@@ -28,6 +30,7 @@ from investorbot.models import (
     CoinProperties,
     CoinSelectionCriteria,
     MarketAnalysis,
+    SellOrder,
     TimeSeriesSummary,
 )
 from investorbot.analysis import convert_ms_time_to_hours
@@ -40,7 +43,13 @@ class BaseAppService:
 
     def __init__(self, base: DeclarativeBase, connection_string):
         if connection_string == "sqlite:///:memory:":
-            self.__engine = sqlalchemy.create_engine(connection_string)
+            # Each connection to an in-memory database gets its own empty database, so every
+            # thread - e.g. the sell worker - shares the one connection.
+            self.__engine = sqlalchemy.create_engine(
+                connection_string,
+                connect_args={"check_same_thread": False},
+                poolclass=StaticPool,
+            )
         else:
             self.__engine = sqlalchemy.create_engine(
                 connection_string, pool_size=200, max_overflow=20
@@ -54,6 +63,52 @@ class BaseAppService:
     def run_migration(self):
         self.__base.metadata.create_all(self.__engine)
 
+    def add_missing_columns(self) -> List[str]:
+        """create_all won't alter tables that already exist, so columns added to a model since its
+        table was created are added here - set to their default and indexed where the model says
+        so. Returns the names of the columns added."""
+        quote = self.__engine.dialect.identifier_preparer.quote
+        added_columns = []
+
+        with self.__engine.begin() as connection:
+            inspector = sqlalchemy.inspect(connection)
+
+            for table in self.__base.metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    continue
+
+                column_names = set(
+                    column["name"] for column in inspector.get_columns(table.name)
+                )
+
+                for column in table.columns:
+                    if column.name in column_names:
+                        continue
+
+                    column_type = column.type.compile(dialect=self.__engine.dialect)
+
+                    connection.execute(
+                        sqlalchemy.text(
+                            f"ALTER TABLE {quote(table.name)} "
+                            + f"ADD COLUMN {quote(column.name)} {column_type}"
+                        )
+                    )
+
+                    if column.default is not None and column.default.is_scalar:
+                        connection.execute(
+                            sqlalchemy.update(table).values(
+                                {column.name: column.default.arg}
+                            )
+                        )
+
+                    for index in table.indexes:
+                        if column.name in index.columns:
+                            index.create(connection, checkfirst=True)
+
+                    added_columns.append(f"{table.name}.{column.name}")
+
+        return added_columns
+
     def add_item(self, db_object: DeclarativeBase):
         with self.session as session:
             session.add(db_object)
@@ -79,6 +134,26 @@ class BotDbService(BaseAppService):
     def __init__(self, connection_string):
         super().__init__(Base, connection_string)
 
+    def upgrade(self) -> List[str]:
+        """Adds columns missing from an existing database - see add_missing_columns. Buy orders
+        sold before their state was stored are marked as sold."""
+        added_columns = self.add_missing_columns()
+
+        if "buy_orders.state" in added_columns:
+            with self.session as session:
+                session.execute(
+                    sqlalchemy.update(BuyOrder)
+                    .where(
+                        BuyOrder.buy_order_id.in_(
+                            sqlalchemy.select(SellOrder.buy_order_id)
+                        )
+                    )
+                    .values(state=BuyOrderState.SOLD)
+                )
+                session.commit()
+
+        return added_columns
+
     def get_buy_order(self, buy_order_id: str) -> BuyOrder | None:
         session = self.session
 
@@ -105,6 +180,43 @@ class BotDbService(BaseAppService):
 
         return items_list
 
+    def get_open_buy_orders(self) -> List[BuyOrder]:
+        """Same as get_all_buy_orders, but only returns buy orders that are still awaiting
+        sale."""
+        session = self.session
+
+        query = (
+            sqlalchemy.select(BuyOrder)
+            .where(BuyOrder.state == BuyOrderState.OPEN)
+            .options(joinedload(BuyOrder.coin_properties))
+            .options(joinedload(BuyOrder.sell_order))
+        )
+
+        return list(session.scalars(query))
+
+    def __set_buy_order_state(
+        self, session: Session, buy_order_id: str, state: BuyOrderState
+    ):
+        session.execute(
+            sqlalchemy.update(BuyOrder)
+            .where(BuyOrder.buy_order_id == buy_order_id)
+            .values(state=state)
+        )
+
+    def add_sell_order(self, sell_order: SellOrder):
+        """Stores the sell order and marks its buy order as sold in the same transaction."""
+        with self.session as session:
+            session.add(sell_order)
+            self.__set_buy_order_state(
+                session, sell_order.buy_order_id, BuyOrderState.SOLD
+            )
+            session.commit()
+
+    def cancel_buy_order(self, buy_order_id: str):
+        with self.session as session:
+            self.__set_buy_order_state(session, buy_order_id, BuyOrderState.CANCELED)
+            session.commit()
+
     def delete_buy_order(self, buy_order_id: int):
         with self.session as session:
             item = (
@@ -130,25 +242,35 @@ class BotDbService(BaseAppService):
 
         return ts_data
 
-    def __get_market_analysis(self) -> MarketAnalysis | None:
+    def __get_market_analysis(
+        self, horizon_hours: float | None = None
+    ) -> MarketAnalysis | None:
         session = self.session
 
-        latest_market_analysis = (
-            session.query(MarketAnalysis)
-            .options(
-                joinedload(MarketAnalysis.ts_data).subqueryload(TimeSeriesSummary.modes)
-            )
-            .order_by(MarketAnalysis.market_analysis_id.desc())
-            .first()
+        query = session.query(MarketAnalysis).options(
+            joinedload(MarketAnalysis.ts_data).subqueryload(TimeSeriesSummary.modes)
         )
 
+        if horizon_hours is not None:
+            query = query.where(MarketAnalysis.horizon_hours == horizon_hours)
+
+        latest_market_analysis = query.order_by(
+            MarketAnalysis.market_analysis_id.desc()
+        ).first()
+
         return latest_market_analysis
 
-    def get_market_analysis(self) -> Tuple[MarketAnalysis, bool]:
+    def get_market_analysis(
+        self, horizon_hours: float | None = None
+    ) -> Tuple[MarketAnalysis | None, bool]:
         """If the latest time series data is older than an hour, then this method will return true
-        in addition to the current market analysis."""
+        in addition to the current market analysis. Optionally filter by the number of hours the
+        market analysis is based on."""
+
+        market_analysis = self.__get_market_analysis(horizon_hours)
 
-        market_analysis = self.__get_market_analysis()
+        if market_analysis is None:
+            return None, True
 
         should_refresh_ts_data = (
             convert_ms_time_to_hours(
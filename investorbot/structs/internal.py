@@ -1,7 +1,17 @@
 from dataclasses import dataclass
 import logging
+from typing import List
+import numpy as np
+from numpy import ndarray
 from investorbot.constants import DEFAULT_LOGS_NAME
-
+from investorbot.enums import TrendLineState
+from investorbot.models import (
+    BuyOrder,
+    CoinProperties,
+    SellOrder,
+    TimeSeriesMode,
+    TimeSeriesSummary,
+)
 
 logger = logging.getLogger(DEFAULT_LOGS_NAME)
 
@@ -18,6 +28,108 @@ class PositionBalance:
         return self.quantity - self.reserved_quantity
 
 
+@dataclass
+class ConnectionStats:
+    """Connection reuse for a single host. Every request that didn't need a new connection reused
+    an existing keep-alive connection."""
+
+    host: str
+    request_count: int
+    connection_count: int
+
+    @property
+    def reused_connection_count(self) -> int:
+        return max(self.request_count - self.connection_count, 0)
+
+
+@dataclass
+class RateLimitStats:
+    """Requests made through a single rate limit bucket and how long they were queued for."""
+
+    bucket: str
+    request_count: int
+    queued_request_count: int
+    total_wait_seconds: float
+    max_wait_seconds: float
+
+    @property
+    def mean_wait_seconds(self) -> float:
+        return (
+            self.total_wait_seconds / self.request_count
+            if self.request_count > 0
+            else 0.0
+        )
+
+
+@dataclass
+class DecodeStats:
+    """Time spent decoding response bodies from a single API."""
+
+    source: str
+    backend: str
+    decode_count: int
+    byte_count: int
+    total_decode_seconds: float
+
+    @property
+    def mean_decode_seconds(self) -> float:
+        return (
+            self.total_decode_seconds / self.decode_count
+            if self.decode_count > 0
+            else 0.0
+        )
+
+
+@dataclass
+class StreamStats:
+    """Reconnections made by a single websocket stream. Missed intervals found after reconnecting
+    are counted as gaps, along with the samples and time taken to backfill them via
+    REST."""
+
+    name: str
+    is_live: bool
+    reconnect_count: int
+    gap_count: int
+    backfilled_sample_count: int
+    total_backfill_seconds: float
+    max_backfill_seconds: float
+
+    @property
+    def mean_backfill_seconds(self) -> float:
+        return (
+            self.total_backfill_seconds / self.reconnect_count
+            if self.reconnect_count > 0
+            else 0.0
+        )
+
+
+@dataclass
+class OrderPlacementResult:
+    """Outcome of a single order within a batch of orders - either the order that was placed or
+    the reason it wasn't."""
+
+    coin_name: str
+    order: BuyOrder | SellOrder | None = None
+    error_message: str | None = None
+
+    @property
+    def is_successful(self) -> bool:
+        return self.order is not None
+
+
+@dataclass
+class SellTrigger:
+    """A filled buy order that can be sold as soon as the price of its coin is high enough - see
+    SellTriggerQueue."""
+
+    buy_order_id: str
+    coin_name: str
+    price_per_coin: float
+    quantity: float
+    time_created_ms: int
+    coin_properties: CoinProperties
+
+
 @dataclass(init=False)
 class LatestTrade:
     coin_name: str
@@ -53,6 +165,190 @@ class OrderDetail:
         return self.quantity - self.fee
 
 
+@dataclass
+class TimeSeries:
+    """Columnar time series data for a single coin. Values are ordered from oldest to most recent
+    and time is measured in hours relative to time_offset - the time of the oldest value in
+    milliseconds."""
+
+    t: ndarray
+    v: ndarray
+    time_offset: int
+
+    @property
+    def latest_time_ms(self) -> int:
+        """Time of the most recent value in milliseconds."""
+        if len(self.t) == 0:
+            return self.time_offset
+
+        return self.time_offset + int(round(self.t[-1] * 1000 * 60 * 60))
+
+
+class SummaryBatch:
+    """Struct-of-arrays equivalent of a list of TimeSeriesSummary models. Each attribute holds one
+    value per coin, so the analysis pipeline can operate on whole arrays without allocating (and
+    instrumenting) ORM objects. Convert to TimeSeriesSummary models only when persisting.
+    """
+
+    __slots__ = (
+        "coin_names",
+        "mean",
+        "std",
+        "line_of_best_fit_coefficient",
+        "line_of_best_fit_offset",
+        "starting_value",
+        "normalized_line_of_best_fit_coefficient",
+        "normalized_starting_value",
+        "normalized_std",
+        "time_offset",
+        "dataset_count",
+        "modes",
+        "trend_state",
+        "is_volatile",
+        "is_outlier_in_gradient",
+        "is_outlier_in_offset",
+        "is_outlier_in_deviation",
+        "initial_ranking",
+        "final_ranking",
+    )
+
+    coin_names: List[str]
+    mean: ndarray
+    std: ndarray
+    line_of_best_fit_coefficient: ndarray
+    line_of_best_fit_offset: ndarray
+    starting_value: ndarray
+    normalized_line_of_best_fit_coefficient: ndarray
+    normalized_starting_value: ndarray
+    normalized_std: ndarray
+    time_offset: ndarray
+    dataset_count: ndarray
+    modes: ndarray
+    """(coins x modes) matrix padded with NaN."""
+    trend_state: ndarray
+    is_volatile: ndarray
+    is_outlier_in_gradient: ndarray
+    is_outlier_in_offset: ndarray
+    is_outlier_in_deviation: ndarray
+    initial_ranking: ndarray
+    final_ranking: ndarray
+
+    def __init__(
+        self,
+        coin_names: List[str],
+        mean: ndarray,
+        std: ndarray,
+        line_of_best_fit_coefficient: ndarray,
+        line_of_best_fit_offset: ndarray,
+        starting_value: ndarray,
+        normalized_line_of_best_fit_coefficient: ndarray,
+        normalized_starting_value: ndarray,
+        normalized_std: ndarray,
+        time_offset: ndarray,
+        dataset_count: ndarray,
+        modes: ndarray,
+        trend_state: ndarray,
+        is_volatile: ndarray,
+    ):
+        coin_count = len(coin_names)
+
+        self.coin_names = list(coin_names)
+        self.mean = mean
+        self.std = std
+        self.line_of_best_fit_coefficient = line_of_best_fit_coefficient
+        self.line_of_best_fit_offset = line_of_best_fit_offset
+        self.starting_value = starting_value
+        self.normalized_line_of_best_fit_coefficient = (
+            normalized_line_of_best_fit_coefficient
+        )
+        self.normalized_starting_value = normalized_starting_value
+        self.normalized_std = normalized_std
+        self.time_offset = time_offset
+        self.dataset_count = dataset_count
+        self.modes = modes
+        self.trend_state = trend_state
+        self.is_volatile = is_volatile
+        self.is_outlier_in_gradient = np.zeros(coin_count, dtype=bool)
+        self.is_outlier_in_offset = np.zeros(coin_count, dtype=bool)
+        self.is_outlier_in_deviation = np.zeros(coin_count, dtype=bool)
+        self.initial_ranking = np.full(coin_count, -1, dtype=np.int64)
+        self.final_ranking = np.full(coin_count, -1, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.coin_names)
+
+    def take(self, indices: List[int]) -> "SummaryBatch":
+        """Returns a new batch containing copies of the summaries at the given indices."""
+        batch = SummaryBatch.__new__(SummaryBatch)
+
+        for key in self.__slots__:
+            value = getattr(self, key)
+            setattr(
+                batch,
+                key,
+                [value[i] for i in indices] if key == "coin_names" else value[indices],
+            )
+
+        return batch
+
+    @staticmethod
+    def concatenate(batches: List["SummaryBatch"]) -> "SummaryBatch":
+        """Joins multiple batches into a single new batch, in order."""
+        batch = SummaryBatch.__new__(SummaryBatch)
+
+        for key in SummaryBatch.__slots__:
+            values = [getattr(other, key) for other in batches]
+            setattr(
+                batch,
+                key,
+                (
+                    [name for names in values for name in names]
+                    if key == "coin_names"
+                    else np.concatenate(values)
+                ),
+            )
+
+        return batch
+
+    def is_trend_state(self, trend_state: TrendLineState) -> ndarray:
+        return self.trend_state == trend_state.value
+
+    def to_time_series_summaries(self) -> List[TimeSeriesSummary]:
+        """Converts the batch into ORM models ready to be added to the database."""
+        return [
+            TimeSeriesSummary(
+                coin_name=self.coin_names[i],
+                mean=float(self.mean[i]),
+                modes=[
+                    TimeSeriesMode(mode=float(mode_value))
+                    for mode_value in self.modes[i]
+                    if not np.isnan(mode_value)
+                ],
+                std=float(self.std[i]),
+                line_of_best_fit_coefficient=float(
+                    self.line_of_best_fit_coefficient[i]
+                ),
+                line_of_best_fit_offset=float(self.line_of_best_fit_offset[i]),
+                starting_value=float(self.starting_value[i]),
+                normalized_line_of_best_fit_coefficient=float(
+                    self.normalized_line_of_best_fit_coefficient[i]
+                ),
+                normalized_starting_value=float(self.normalized_starting_value[i]),
+                normalized_std=float(self.normalized_std[i]),
+                trend_state=str(self.trend_state[i]),
+                is_volatile=bool(self.is_volatile[i]),
+                dataset_count=int(self.dataset_count[i]),
+                time_offset=int(self.time_offset[i]),
+                initial_ranking=int(self.initial_ranking[i]),
+                final_ranking=int(self.final_ranking[i]),
+                is_outlier_in_gradient=bool(self.is_outlier_in_gradient[i]),
+                is_outlier_in_offset=bool(self.is_outlier_in_offset[i]),
+                is_outlier_in_deviation=bool(self.is_outlier_in_deviation[i]),
+            )
+            for i in range(len(self))
+        ]
+
+
 @dataclass
 class RatingThreshold:
     rating_id: int
@@ -1,47 +1,34 @@
-"""Client using the threading API."""
+"""Streams tickers to stdout via the crypto.com market data websocket."""
 
 import json
-import time
-import investorbot.env as env
-import asyncio
-from websockets.asyncio.client import connect
+from typing import List
 
+from investorbot.integrations.cryptodotcom.services import CryptoService
+from investorbot.integrations.cryptodotcom.structs import TickerJson
+from investorbot.integrations.cryptodotcom.websocket import MarketDataService
 
-async def __track_ticker():
-    async with connect(
-        "wss://stream.crypto.com/exchange/v1/market",
-    ) as websocket:
-        i = 0
-        subscribe = json.dumps(
-            {
-                "id": 1,
-                "method": "subscribe",
-                "params": {"channels": ["ticker.BTC_USD"]},
-                "nonce": env.time.now_in_ms(),
-            }
-        )
-
-        await websocket.send(subscribe)
-
-        while True:
-            message = await websocket.recv()
-            message_dict = json.loads(message)
 
-            if message_dict["method"] == "public/heartbeat":
-                response = json.dumps(
-                    {"id": message_dict["id"], "method": "public/respond-heartbeat"}
-                )
-                await websocket.send(response)
-                print(f"sending {response}")
-            elif "result" in message_dict:
-                output = message_dict["result"]["data"]
+def print_tickers(tickers: List[TickerJson]):
+    for ticker in tickers:
+        print(json.dumps(ticker.__dict__))
 
-                print(json.dumps(output))
-            time.sleep(0.1)
-            if i % 10 == 0:
-                print(f"increment {i}")
-            i += 1
 
+def track_ticker(instrument_names: str = "BTC_USD"):
+    """Prints ticker updates for the given comma separated instrument names. Pass 'all' to track
+    every USD instrument."""
+    if instrument_names == "all":
+        market_data = MarketDataService(
+            lambda: [
+                ticker.instrument_name
+                for ticker in CryptoService().market.get_tickers()
+                if ticker.instrument_name.endswith("_USD")
+            ],
+            on_tickers=print_tickers,
+        )
+    else:
+        market_data = MarketDataService(
+            lambda: instrument_names.split(","), on_tickers=print_tickers
+        )
 
-def track_ticker():
-    asyncio.run(__track_ticker())
+    market_data.start()
+    market_data.join()
@@ -1,7 +1,9 @@
 import json
 from typing import List
+from urllib.parse import urlparse
 import pytest
 import requests
+from requests.adapters import HTTPAdapter
 
 from investorbot.db import get_market_analysis_ratings
 from investorbot.integrations.cryptodotcom import mappings
@@ -27,6 +29,17 @@ def disable_network_calls(monkeypatch):
     monkeypatch.setattr(requests, "get", lambda *args, **kwargs: stunted_call())
     monkeypatch.setattr(requests, "post", lambda *args, **kwargs: stunted_call())
 
+    # Sessions send requests via their adapters - only allow requests to local test servers.
+    send = HTTPAdapter.send
+
+    def local_send(adapter, request, *args, **kwargs):
+        if urlparse(request.url).hostname not in ["127.0.0.1", "localhost"]:
+            stunted_call()
+
+        return send(adapter, request, *args, **kwargs)
+
+    monkeypatch.setattr(HTTPAdapter, "send", local_send)
+
 
 @pytest.fixture
 def mock_bot_db():
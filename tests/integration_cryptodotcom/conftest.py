@@ -1,6 +1,10 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import json
-from typing import List
+from threading import Thread
+from typing import Dict, List
+from urllib.parse import urlparse
 import pytest
+from websockets.sync.server import ServerConnection, serve
 
 from investorbot.enums import AppIntegration
 from investorbot.context import BotContext
@@ -15,7 +19,7 @@ def set_environment(monkeypatch):
         AppIntegration.CRYPTODOTCOM,
     )
 
-    # ! Prevents test suite from attempting to write API response to api/** directory.
+    # ! Prevents test suite from recording API responses to the api/** capture log.
     monkeypatch.setattr(
         "investorbot.integrations.cryptodotcom.http.base.INVESTOR_APP_ENVIRONMENT",
         "Testing",
@@ -32,12 +36,23 @@ def __get_file_data(filename: str) -> dict | List[dict]:
     return example_data
 
 
+def __get_file_content(filename: str) -> bytes:
+    with open(f"./tests/integration_cryptodotcom/fixtures/{filename}.json", "rb") as f:
+        return f.read()
+
+
 @pytest.fixture
 def get_file_data():
 
     return __get_file_data
 
 
+@pytest.fixture
+def get_file_content():
+    """Raw fixture file contents, as received in a response body."""
+    return __get_file_content
+
+
 @pytest.fixture
 def mock_crypto_service() -> ICryptoService:
     crypto_service = CryptoService()
@@ -50,3 +65,112 @@ def mock_crypto_service() -> ICryptoService:
 @pytest.fixture
 def mock_context(mock_bot_db, mock_crypto_service):
     return BotContext(mock_bot_db, mock_crypto_service)
+
+
+class MockExchangeRequestHandler(BaseHTTPRequestHandler):
+    """Responds to every request with the next queued response for the requested method, e.g.
+    'get-tickers'. The last queued response is repeated once the queue is empty."""
+
+    protocol_version = "HTTP/1.1"
+
+    def __respond(self):
+        content_length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(content_length) if content_length > 0 else b""
+
+        method = urlparse(self.path).path.split("/")[-1]
+        self.server.requests.append((self.command, self.path, body))
+
+        responses = self.server.responses.get(method, [(404, {})])
+        status, response = responses.pop(0) if len(responses) > 1 else responses[0]
+
+        data = json.dumps(response).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.__respond()
+
+    def do_POST(self):
+        self.__respond()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def mock_exchange_server():
+    """Local stand-in for the Crypto.com API. Queue responses via server.responses and inspect
+    received requests via server.requests."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockExchangeRequestHandler)
+    server.responses = {}
+    server.requests = []
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+class MockWebsocketServer:
+    """Local stand-in for the Crypto.com websocket API. Messages in on_connect are sent to every
+    new connection and each message queued in responses[method] is sent in reply to a request for
+    that method. Received requests are recorded in requests. Call disconnect to drop every open
+    connection."""
+
+    def __init__(self):
+        self.on_connect: List[dict] = []
+        self.responses: Dict[str, List[dict]] = {}
+        self.requests: List[dict] = []
+        self.connections: List[ServerConnection] = []
+        self.server = serve(self.__handle, "127.0.0.1", 0)
+        self.url = f"ws://127.0.0.1:{self.server.socket.getsockname()[1]}"
+
+    def __handle(self, websocket: ServerConnection):
+        self.connections.append(websocket)
+
+        for message in self.on_connect:
+            websocket.send(json.dumps(message))
+
+        for message in websocket:
+            request = json.loads(message)
+            self.requests.append(request)
+
+            for response in self.responses.get(request["method"], []):
+                websocket.send(json.dumps(response))
+
+    def disconnect(self):
+        for websocket in self.connections:
+            websocket.close()
+
+        self.connections.clear()
+
+    def get_requests(self, method: str) -> List[dict]:
+        return [request for request in self.requests if request["method"] == method]
+
+
+@pytest.fixture
+def mock_websocket_server(monkeypatch):
+    monkeypatch.setattr(
+        "investorbot.integrations.cryptodotcom.websocket.CONNECT_DELAY_SECONDS", 0.0
+    )
+    monkeypatch.setattr(
+        "investorbot.integrations.cryptodotcom.websocket.RECONNECT_BASE_DELAY_SECONDS",
+        0.01,
+    )
+
+    server = MockWebsocketServer()
+
+    thread = Thread(target=server.server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.server.shutdown()
@@ -1,15 +1,21 @@
+from threading import current_thread
+from typing import List
 from requests import Response
 
-from investorbot.enums import MarketCharacterization
+from investorbot.enums import BuyOrderState, MarketCharacterization
 from investorbot.models import BuyOrder
 from investorbot.routines import (
+    queue_triggered_coin_sales,
     sell_coin_routine,
+    sell_triggered_coins,
     refresh_market_analysis_routine,
 )
 from investorbot.structs.internal import LatestTrade
 
 
-def test_update_time_series_summaries_routine(monkeypatch, get_file_data, mock_context):
+def test_update_time_series_summaries_routine(
+    monkeypatch, get_file_content, mock_context
+):
     """The time series summary update routine iterates over time series data periodically and
     stores properties such as median, mean, trend line coefficient, etc. for each coin of
     interest. Market confidence can then be determined by collating all information for each
@@ -40,7 +46,7 @@ def test_update_time_series_summaries_routine(monkeypatch, get_file_data, mock_c
         lambda: LATEST_TRADES,
     )
 
-    def mock_get_request(query_string: str) -> dict:
+    def mock_get_request(query_string: str, **kwargs) -> dict:
         """A list of eight 'LatestTrade' instances means this method will be called eight times.
         Each time it is grabbing the coin name to point to its corresponding dummy data file.
         """
@@ -50,12 +56,14 @@ def test_update_time_series_summaries_routine(monkeypatch, get_file_data, mock_c
 
         response = Response()
         response.status_code = 200
-        response.json = lambda: get_file_data(f"ts_data/{filename}")
+        response._content = get_file_content(f"ts_data/{filename}")
 
         return response
 
     # Ensure network calls are patched.
-    monkeypatch.setattr("requests.get", mock_get_request)
+    monkeypatch.setattr(
+        mock_context.crypto_service.market.session, "get", mock_get_request
+    )
 
     #! Run the routine
     refresh_market_analysis_routine(hours=24)
@@ -75,29 +83,30 @@ def test_update_time_series_summaries_routine(monkeypatch, get_file_data, mock_c
     ), "Confidence rating is not correct."
 
 
-def test_sell_coin_routine_stores_sell_order(monkeypatch, get_file_data, mock_context):
-    """Testing the sell coin routine is able to distinguish between BuyOrders with an associated
-    SellOrder and BuyOrders without. This behavior is necessary to prevent the application from
-    repeatedly trying to make sell orders for the same BuyOrder."""
-
-    DOGE_GUID = "4310e324-8705-42d2-b15f-a5a62cb412d2"
-    ETH_GUID = "a1d2bcb1-5991-41a1-833f-1db903258a1a"
+DOGE_GUID = "4310e324-8705-42d2-b15f-a5a62cb412d2"
+ETH_GUID = "a1d2bcb1-5991-41a1-833f-1db903258a1a"
 
-    monkeypatch.setattr("investorbot.routines.bot_context", mock_context)
 
-    bot_db = mock_context.db_service
+def patch_sell_requests(monkeypatch, get_file_content, crypto_service) -> List[str]:
+    """Patches all calls made as the sell routine iterates through BuyOrders added to the bot_db
+    service. Returns the list each requested private method is appended to."""
+    methods = []
 
-    # Post requests replicate all calls made as the sell routine iterates through BuyOrders added
-    # to the bot_db service.
     def mock_post_request(method, **kwargs) -> dict:
         filename = None
         response = Response()
         response.status_code = 200
 
+        methods.append(method)
+
         if "user-balance" in method:
             filename = "user-balance-200"
-        elif "create-order" in method:
-            filename = "create-order-200"
+        elif "create-order-list" in method:
+            filename = "create-order-list-200"
+        elif "get-open-orders" in method:
+            filename = "get-open-orders-200"
+        elif "get-order-history" in method:
+            filename = "get-order-history-200"
         else:
             # ! This is prone to breaking
             guid = kwargs["json"]["params"]["client_oid"]
@@ -107,19 +116,36 @@ def test_sell_coin_routine_stores_sell_order(monkeypatch, get_file_data, mock_co
             elif guid == ETH_GUID:
                 filename = "eth-get-order-detail-200"
 
-        response.json = lambda: get_file_data(filename)
+        response._content = get_file_content(filename)
 
         return response
 
     # Replicates the get request made on get_latest_trade
-    def mock_get_request(*args) -> dict:
+    def mock_get_request(*args, **kwargs) -> dict:
         """Only one get request is made here."""
         response = Response()
         response.status_code = 200
-        response.json = lambda: get_file_data("get-tickers-eth-200")
+        response._content = get_file_content("get-tickers-eth-200")
 
         return response
 
+    monkeypatch.setattr(crypto_service.market.session, "get", mock_get_request)
+    monkeypatch.setattr(crypto_service.user.session, "post", mock_post_request)
+
+    return methods
+
+
+def test_sell_coin_routine_stores_sell_order(
+    monkeypatch, get_file_content, mock_context
+):
+    """Testing the sell coin routine is able to distinguish between BuyOrders with an associated
+    SellOrder and BuyOrders without. This behavior is necessary to prevent the application from
+    repeatedly trying to make sell orders for the same BuyOrder."""
+
+    monkeypatch.setattr("investorbot.routines.bot_context", mock_context)
+
+    bot_db = mock_context.db_service
+
     bot_db.add_items(
         [
             BuyOrder(DOGE_GUID, "DOGE_USD", 3.0),
@@ -128,8 +154,9 @@ def test_sell_coin_routine_stores_sell_order(monkeypatch, get_file_data, mock_co
     )
 
     # Ensure network calls are patched
-    monkeypatch.setattr("requests.get", mock_get_request)
-    monkeypatch.setattr("requests.post", mock_post_request)
+    methods = patch_sell_requests(
+        monkeypatch, get_file_content, mock_context.crypto_service
+    )
 
     #! Run the routine
     sell_coin_routine()
@@ -148,3 +175,92 @@ def test_sell_coin_routine_stores_sell_order(monkeypatch, get_file_data, mock_co
     assert (
         eth_buy_order.sell_order is not None
     ), "ETH sell order is returning None when it should exist"
+
+    assert eth_buy_order.state == BuyOrderState.SOLD
+    assert (
+        len([method for method in methods if "create-order-list" in method]) == 1
+    ), "Sell orders should be placed in a single batch"
+    assert [buy_order.buy_order_id for buy_order in bot_db.get_open_buy_orders()] == [
+        DOGE_GUID
+    ]
+
+    # Order states are reconciled in bulk rather than per order.
+    assert not any(
+        "get-order-detail" in method for method in methods
+    ), "Order details should not be requested individually"
+
+
+def test_sell_coin_routine_waits_for_triggering_price(
+    monkeypatch, get_file_content, mock_context
+):
+    """Orders that can't yet be sold at a sufficient value ratio should wait in the sell trigger
+    queue, and be sold as soon as a high enough price is pushed."""
+    monkeypatch.setattr("investorbot.routines.bot_context", mock_context)
+
+    bot_db = mock_context.db_service
+
+    # The latest ETH trade in get-tickers-eth-200 is below this price.
+    bot_db.add_items([BuyOrder(ETH_GUID, "ETH_USD", 4.0)])
+
+    methods = patch_sell_requests(
+        monkeypatch, get_file_content, mock_context.crypto_service
+    )
+
+    sell_coin_routine()
+
+    assert bot_db.get_buy_order(ETH_GUID).sell_order is None
+    assert ETH_GUID in mock_context.sell_triggers
+
+    sell_triggered_coins([LatestTrade("ETH_USD", 3.9), LatestTrade("DOGE_USD", 1.0)])
+
+    assert bot_db.get_buy_order(ETH_GUID).sell_order is None
+    assert not any("create-order-list" in method for method in methods)
+
+    sell_triggered_coins([LatestTrade("ETH_USD", 5.0)])
+
+    assert bot_db.get_buy_order(ETH_GUID).state == BuyOrderState.SOLD
+    assert ETH_GUID not in mock_context.sell_triggers
+    assert len([method for method in methods if "create-order-list" in method]) == 1
+
+
+def test_streamed_prices_sell_coins_on_the_sell_worker_thread(
+    monkeypatch, get_file_content, mock_context
+):
+    """Triggers met by a pushed price should be popped straight away, but sold on the sell worker
+    thread so the market data stream isn't kept waiting on the sale."""
+    monkeypatch.setattr("investorbot.routines.bot_context", mock_context)
+
+    bot_db = mock_context.db_service
+    crypto_service = mock_context.crypto_service
+
+    bot_db.add_items([BuyOrder(ETH_GUID, "ETH_USD", 4.0)])
+
+    methods = patch_sell_requests(monkeypatch, get_file_content, crypto_service)
+
+    sell_coin_routine()
+
+    place_coin_sell_orders = crypto_service.place_coin_sell_orders
+    selling_threads = []
+
+    def mock_place_coin_sell_orders(coin_sales):
+        selling_threads.append(current_thread())
+
+        return place_coin_sell_orders(coin_sales)
+
+    monkeypatch.setattr(
+        crypto_service, "place_coin_sell_orders", mock_place_coin_sell_orders
+    )
+
+    assert queue_triggered_coin_sales([LatestTrade("ETH_USD", 3.9)]) is None
+
+    future = queue_triggered_coin_sales([LatestTrade("ETH_USD", 5.0)])
+
+    assert future is not None
+    assert ETH_GUID not in mock_context.sell_triggers
+
+    future.result(timeout=10)
+
+    assert len(selling_threads) == 1
+    assert selling_threads[0] is not current_thread()
+    assert bot_db.get_buy_order(ETH_GUID).state == BuyOrderState.SOLD
+    assert len([method for method in methods if "create-order-list" in method]) == 1
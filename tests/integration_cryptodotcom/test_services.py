@@ -1,14 +1,56 @@
+import asyncio
+import hashlib
+import hmac
+import json
 import math
+import time
+from typing import Callable
 import uuid
 
-from requests import Response
+import pytest
+from requests import HTTPError, Response, Timeout
+import sqlalchemy
 
-from investorbot.enums import TrendLineState
+from investorbot import env
+from investorbot.enums import BuyOrderState, OrderStatus, TrendLineState
+from investorbot.integrations.cryptodotcom.http.capture import (
+    CaptureRecorder,
+    CaptureReplayer,
+)
+from investorbot.integrations.cryptodotcom.http.market import (
+    AsyncMarketHttpClient,
+    MarketHttpClient,
+)
+from investorbot.integrations.cryptodotcom.http.ratelimit import (
+    PRIVATE_ORDER,
+    PUBLIC_MARKET,
+    RateLimiter,
+)
+from investorbot.integrations.cryptodotcom.http.user import (
+    AsyncUserHttpClient,
+    UserHttpClient,
+    json_to_order_detail_json,
+    json_to_order_list_results,
+)
+from investorbot.integrations.cryptodotcom.services import (
+    AsyncCryptoService,
+    CryptoService,
+)
 from investorbot.models import (
     BuyOrder,
+    SellOrder,
     TimeSeriesMode,
     TimeSeriesSummary,
 )
+from investorbot.structs.egress import CoinPurchase
+
+
+def wait_until(condition: Callable[[], bool], timeout: float = 5.0):
+    """Waits for a websocket stream running on another thread to catch up."""
+    deadline = time.monotonic() + timeout
+
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.05)
 
 
 def test_get_buy_order_will_return_none_when_not_found(mock_bot_db):
@@ -50,6 +92,66 @@ def test_buy_order_can_be_stored_and_retrieved(mock_bot_db):
     ), "Tick size must be a float."
 
 
+def test_only_open_buy_orders_are_retrieved(mock_bot_db):
+    """Buy orders should no longer be returned as open once they've been sold or cancelled."""
+    sold_order_id, cancelled_order_id, open_order_id = [
+        str(uuid.uuid4()) for _ in range(3)
+    ]
+
+    mock_bot_db.add_items(
+        [
+            BuyOrder(buy_order_id=buy_order_id, coin_name="ETH_USD", price_per_coin=3.0)
+            for buy_order_id in [sold_order_id, cancelled_order_id, open_order_id]
+        ]
+    )
+
+    mock_bot_db.add_sell_order(SellOrder(str(uuid.uuid4()), sold_order_id))
+    mock_bot_db.cancel_buy_order(cancelled_order_id)
+
+    open_buy_orders = mock_bot_db.get_open_buy_orders()
+
+    assert [buy_order.buy_order_id for buy_order in open_buy_orders] == [open_order_id]
+    assert open_buy_orders[0].state == BuyOrderState.OPEN
+    assert mock_bot_db.get_buy_order(sold_order_id).state == BuyOrderState.SOLD
+    assert mock_bot_db.get_buy_order(cancelled_order_id).state == BuyOrderState.CANCELED
+
+
+def test_existing_database_is_upgraded_with_missing_columns(mock_bot_db):
+    """Databases created before a column was added should gain it with its default, and buy
+    orders that were already sold should be marked as sold."""
+    sold_order_id, open_order_id = [str(uuid.uuid4()) for _ in range(2)]
+
+    mock_bot_db.add_items(
+        [
+            BuyOrder(buy_order_id=buy_order_id, coin_name="ETH_USD", price_per_coin=3.0)
+            for buy_order_id in [sold_order_id, open_order_id]
+        ]
+    )
+    mock_bot_db.add_item(SellOrder(str(uuid.uuid4()), sold_order_id))
+
+    with mock_bot_db.session as session:
+        for statement in [
+            "DROP INDEX ix_buy_orders_state",
+            "ALTER TABLE buy_orders DROP COLUMN state",
+            "ALTER TABLE market_analysis DROP COLUMN horizon_hours",
+        ]:
+            session.execute(sqlalchemy.text(statement))
+
+        session.commit()
+
+    added_columns = mock_bot_db.upgrade()
+
+    assert sorted(added_columns) == [
+        "buy_orders.state",
+        "market_analysis.horizon_hours",
+    ]
+    assert [
+        buy_order.buy_order_id for buy_order in mock_bot_db.get_open_buy_orders()
+    ] == [open_order_id]
+    assert mock_bot_db.get_buy_order(sold_order_id).state == BuyOrderState.SOLD
+    assert mock_bot_db.upgrade() == []
+
+
 def test_time_series_summary_is_retrievable_with_modes(mock_bot_db):
     """Ensuring ORM query is such that Modes are included in the time series data summary
     query."""
@@ -87,7 +189,7 @@ def test_time_series_summary_is_retrievable_with_modes(mock_bot_db):
     ), "Number of modes doesn't match what was inserted into db."
 
 
-def test_usd_balance_is_retrievable(monkeypatch, mock_crypto_service, get_file_data):
+def test_usd_balance_is_retrievable(monkeypatch, mock_crypto_service, get_file_content):
     """Testing get_usd_balance correctly fetches my USD balance from the user balance JSON."""
 
     # Method that will replace the only network call made during this test.
@@ -96,14 +198,658 @@ def test_usd_balance_is_retrievable(monkeypatch, mock_crypto_service, get_file_d
         to the Crypto.com API."""
         response = Response()
         response.status_code = 200
-        response.json = lambda: get_file_data("private-user-balance-status-200")
+        response._content = get_file_content("private-user-balance-status-200")
 
         return response
 
     # Ensure POST request is faked here.
-    monkeypatch.setattr("requests.post", mock_post_request)
+    monkeypatch.setattr(mock_crypto_service.user.session, "post", mock_post_request)
 
     # Expecting a single value to be retrieved from the private-user-balance-status-200 JSON.
     cash_balance = mock_crypto_service.get_cash_balance()
 
     assert math.isclose(6.221, cash_balance.usd_balance, rel_tol=1e-3)
+
+
+def test_wallet_is_fetched_once_until_invalidated(
+    monkeypatch, mock_crypto_service, get_file_content
+):
+    """Balance lookups should share a single wallet snapshot rather than each making a signed
+    request, until the snapshot is invalidated."""
+    methods = []
+
+    def mock_post_request(method, **kwargs) -> dict:
+        methods.append(method)
+
+        response = Response()
+        response.status_code = 200
+        response._content = get_file_content("private-user-balance-status-200")
+
+        return response
+
+    monkeypatch.setattr(mock_crypto_service.user.session, "post", mock_post_request)
+
+    usd_balance = mock_crypto_service.get_coin_balance("USD")
+    missing_balance = mock_crypto_service.get_coin_balance("NOT_A_REAL_COIN_USD")
+    cash_balance = mock_crypto_service.get_cash_balance()
+    mock_crypto_service.get_investable_coin_count()
+
+    assert len(methods) == 1
+    assert missing_balance is None
+    assert math.isclose(usd_balance.market_value, cash_balance.usd_balance)
+
+    mock_crypto_service.invalidate_wallet_snapshot()
+    mock_crypto_service.get_cash_balance()
+
+    assert len(methods) == 2
+
+
+def test_latest_trades_are_read_from_market_snapshot(
+    monkeypatch, mock_crypto_service, get_file_content
+):
+    """Latest trades should be served from one bulk get-tickers request until the market snapshot
+    is no longer fresh."""
+    query_strings = []
+
+    def mock_get_request(query_string, **kwargs) -> dict:
+        query_strings.append(query_string)
+
+        response = Response()
+        response.status_code = 200
+        response._content = get_file_content("get-tickers-eth-200")
+
+        return response
+
+    monkeypatch.setattr(mock_crypto_service.market.session, "get", mock_get_request)
+
+    latest_trades = mock_crypto_service.get_latest_trades()
+    latest_trade = mock_crypto_service.get_latest_trade("ETH_USD")
+    mock_crypto_service.get_latest_trade("ETH_USD")
+
+    assert [trade.coin_name for trade in latest_trades] == ["ETH_USD"]
+    assert math.isclose(latest_trade.price, 3.3)
+    assert len(query_strings) == 1
+    assert query_strings[0].endswith("get-tickers")
+
+    mock_crypto_service.market_snapshot.max_age_seconds = 0.0
+    mock_crypto_service.get_latest_trade("ETH_USD")
+
+    assert len(query_strings) == 2
+
+
+def test_connections_are_reused_between_requests(mock_exchange_server):
+    """Requests made by the same client should share a single keep-alive connection."""
+    mock_exchange_server.responses["get-tickers"] = [(200, {"result": {"data": []}})]
+
+    market = MarketHttpClient(api_url=mock_exchange_server.url)
+
+    for _ in range(3):
+        market.get_tickers()
+
+    connection_stats = market.get_connection_stats()
+
+    assert len(connection_stats) == 1
+    assert connection_stats[0].request_count == 3
+    assert connection_stats[0].connection_count == 1
+    assert connection_stats[0].reused_connection_count == 2
+
+    market.close()
+
+
+def test_only_public_requests_are_retried(mock_exchange_server):
+    """Failed GET requests should be retried, whereas private POST requests must not be retried
+    in case an order is placed twice."""
+    mock_exchange_server.responses["get-tickers"] = [
+        (503, {}),
+        (200, {"result": {"data": []}}),
+    ]
+    mock_exchange_server.responses["create-order"] = [(503, {})]
+
+    market = MarketHttpClient(api_url=mock_exchange_server.url)
+    user = UserHttpClient("key", "secret", api_url=mock_exchange_server.url)
+
+    assert market.get_tickers() == []
+    assert len(mock_exchange_server.requests) == 2
+
+    with pytest.raises(HTTPError):
+        user.create_order("ETH_USD", "2000", "0.01", "BUY")
+
+    assert len(mock_exchange_server.requests) == 3
+
+    market.close()
+    user.close()
+
+
+def test_async_clients_make_concurrent_requests(
+    monkeypatch, mock_exchange_server, get_file_data
+):
+    """Concurrent private requests must each be signed with a unique request id, using the same
+    signature scheme as the synchronous client."""
+    mock_exchange_server.responses["get-tickers"] = [
+        (200, get_file_data("get-tickers-eth-200"))
+    ]
+    mock_exchange_server.responses["get-order-detail"] = [
+        (200, get_file_data("eth-get-order-detail-200"))
+    ]
+
+    async def make_requests():
+        market = AsyncMarketHttpClient(api_url=mock_exchange_server.url)
+        user = AsyncUserHttpClient("key", "secret", api_url=mock_exchange_server.url)
+
+        async with market, user:
+            return await asyncio.gather(
+                market.get_ticker("ETH_USD"),
+                *(user.get_order_detail(order_id) for order_id in range(5)),
+            )
+
+    ticker, *order_details = asyncio.run(make_requests())
+
+    assert ticker.instrument_name == "ETH_USD"
+    assert len(order_details) == 5
+
+    signed_requests = [
+        json.loads(body)
+        for command, _, body in mock_exchange_server.requests
+        if command == "POST"
+    ]
+    signer = UserHttpClient("key", "secret")
+
+    assert sorted(req["id"] for req in signed_requests) == [1, 2, 3, 4, 5]
+
+    for req in signed_requests:
+        signer.id_incr = req["id"]
+        monkeypatch.setattr(
+            "investorbot.integrations.cryptodotcom.http.base.env.time.now_in_ms",
+            lambda: req["nonce"],
+        )
+
+        expected = signer.create_signed_request(
+            req["method"].removeprefix("private/"), req["params"]
+        )
+
+        assert req == expected
+
+    signer.close()
+
+
+def test_async_service_fetches_wallet_once(mock_exchange_server, get_file_data):
+    mock_exchange_server.responses["user-balance"] = [
+        (200, get_file_data("user-balance-200"))
+    ]
+
+    async def get_balances():
+        async with AsyncCryptoService(
+            AsyncMarketHttpClient(api_url=mock_exchange_server.url),
+            AsyncUserHttpClient("key", "secret", api_url=mock_exchange_server.url),
+        ) as crypto_service:
+            return (
+                await crypto_service.get_cash_balance(),
+                await crypto_service.get_coin_balance("ETH_USD"),
+            )
+
+    cash_balance, _ = asyncio.run(get_balances())
+
+    assert isinstance(cash_balance.usd_balance, float)
+    assert len(mock_exchange_server.requests) == 1
+
+
+def test_rate_limited_requests_are_queued(mock_exchange_server):
+    """Exceeding a rate limit should delay requests rather than raise errors."""
+    mock_exchange_server.responses["get-tickers"] = [(200, {"result": {"data": []}})]
+
+    market = MarketHttpClient(api_url=mock_exchange_server.url)
+    market.rate_limiter = RateLimiter(public_market_rate=5.0)
+
+    for _ in range(8):
+        market.get_tickers()
+
+    stats = {stats.bucket: stats for stats in market.get_rate_limit_stats()}
+
+    assert stats[PUBLIC_MARKET].request_count == 8
+    assert stats[PUBLIC_MARKET].queued_request_count > 0
+    assert stats[PUBLIC_MARKET].total_wait_seconds > 0
+    assert stats[PRIVATE_ORDER].request_count == 0
+
+    market.close()
+
+
+def test_batch_orders_report_partial_failures(mock_exchange_server, mock_bot_db):
+    """Rejected orders and failed requests should be reported per order without preventing the
+    remaining orders being placed."""
+    mock_exchange_server.responses["create-order-list"] = [
+        (
+            200,
+            {
+                "result": {
+                    "result_list": [
+                        {"index": i, "code": 0, "order_id": str(i)} for i in range(9)
+                    ]
+                    + [
+                        {
+                            "index": 9,
+                            "code": 306,
+                            "message": "INSUFFICIENT_AVAILABLE_BALANCE",
+                        }
+                    ]
+                }
+            },
+        ),
+        (400, {}),
+    ]
+
+    crypto_service = CryptoService()
+    crypto_service.user = UserHttpClient(
+        "key", "secret", api_url=mock_exchange_server.url
+    )
+
+    coin_props = mock_bot_db.get_coin_properties("ETH_USD")
+    results = crypto_service.place_coin_buy_orders(
+        [CoinPurchase(coin_props, 2000.0) for _ in range(12)]
+    )
+
+    # Orders are split into batches of ten.
+    assert len(mock_exchange_server.requests) == 2
+    assert (
+        len(json.loads(mock_exchange_server.requests[0][2])["params"]["order_list"])
+        == 10
+    )
+
+    assert [result.is_successful for result in results] == [True] * 9 + [False] * 3
+    assert "INSUFFICIENT_AVAILABLE_BALANCE" in results[9].error_message
+    assert results[0].order.coin_name == "ETH_USD"
+
+    crypto_service.user.close()
+
+
+def test_timed_out_batch_orders_are_reconciled(monkeypatch, mock_bot_db, get_file_data):
+    """Orders in a batch that timed out may still have been placed, so they should be looked up
+    by client_oid rather than reported as failed."""
+    crypto_service = CryptoService()
+    chunks = []
+
+    def mock_create_order_list(orders):
+        chunks.append(orders)
+        raise Timeout("Read timed out.")
+
+    def mock_get_open_orders():
+        order = get_file_data("eth-get-order-detail-200")["result"]
+
+        return [
+            json_to_order_detail_json(
+                dict(order, client_oid=chunks[0][0]["client_oid"])
+            )
+        ]
+
+    monkeypatch.setattr(
+        crypto_service.user, "create_order_list", mock_create_order_list
+    )
+    monkeypatch.setattr(crypto_service.user, "get_open_orders", mock_get_open_orders)
+    monkeypatch.setattr(crypto_service.user, "get_order_history", lambda: [])
+
+    coin_props = mock_bot_db.get_coin_properties("ETH_USD")
+    results = crypto_service.place_coin_buy_orders(
+        [CoinPurchase(coin_props, 2000.0) for _ in range(2)]
+    )
+
+    assert [result.is_successful for result in results] == [True, False]
+    assert results[0].order.buy_order_id == chunks[0][0]["client_oid"]
+    assert "Read timed out." in results[1].error_message
+
+
+def test_batch_order_results_with_invalid_indices_are_reconciled(
+    monkeypatch, mock_bot_db, get_file_data
+):
+    """Results with an out of range or missing index shouldn't abort the batch. Orders left
+    without a result may still have been placed, so should be looked up by client_oid.
+    """
+    crypto_service = CryptoService()
+    chunks = []
+
+    def mock_create_order_list(orders):
+        chunks.append(orders)
+
+        return json_to_order_list_results(
+            {
+                "result_list": [
+                    {"index": 0, "code": 0},
+                    {"index": 7, "code": 0},
+                    {"code": 0},
+                ]
+            }
+        )
+
+    def mock_get_open_orders():
+        order = get_file_data("eth-get-order-detail-200")["result"]
+
+        return [
+            json_to_order_detail_json(
+                dict(order, client_oid=chunks[0][1]["client_oid"])
+            )
+        ]
+
+    monkeypatch.setattr(
+        crypto_service.user, "create_order_list", mock_create_order_list
+    )
+    monkeypatch.setattr(crypto_service.user, "get_open_orders", mock_get_open_orders)
+    monkeypatch.setattr(crypto_service.user, "get_order_history", lambda: [])
+
+    coin_props = mock_bot_db.get_coin_properties("ETH_USD")
+    results = crypto_service.place_coin_buy_orders(
+        [CoinPurchase(coin_props, 2000.0) for _ in range(3)]
+    )
+
+    assert [result.is_successful for result in results] == [True, True, False]
+    assert results[1].order.buy_order_id == chunks[0][1]["client_oid"]
+    assert "No result was returned" in results[2].error_message
+
+
+def test_order_history_is_paginated(monkeypatch, mock_exchange_server, get_file_data):
+    """Orders missing from a full page of order history should be looked for on earlier pages
+    before being requested individually."""
+    monkeypatch.setattr(
+        "investorbot.integrations.cryptodotcom.services.CRYPTO_ORDER_HISTORY_PAGE_SIZE",
+        1,
+    )
+
+    order_history = get_file_data("get-order-history-200")
+    order = order_history["result"]["data"][0]
+    older_order = dict(
+        order, client_oid=str(uuid.uuid4()), create_time=order["create_time"] - 1000
+    )
+
+    mock_exchange_server.responses["get-open-orders"] = [
+        (200, get_file_data("get-open-orders-200"))
+    ]
+    mock_exchange_server.responses["get-order-history"] = [
+        (200, order_history),
+        (200, {"result": {"data": [older_order]}}),
+    ]
+
+    crypto_service = CryptoService()
+    crypto_service.user = UserHttpClient(
+        "key", "secret", api_url=mock_exchange_server.url
+    )
+
+    order_details = crypto_service.get_order_details(
+        [order["client_oid"], older_order["client_oid"]]
+    )
+
+    history_requests = [
+        json.loads(body)["params"]
+        for _, path, body in mock_exchange_server.requests
+        if path.endswith("get-order-history")
+    ]
+
+    assert set(order_details.keys()) == {order["client_oid"], older_order["client_oid"]}
+    assert not any(
+        path.endswith("get-order-detail")
+        for _, path, _ in mock_exchange_server.requests
+    )
+
+    # The second page ends at the oldest order of the first page.
+    assert len(history_requests) == 2
+    assert history_requests[1]["end_time"] == order["create_time"]
+
+    crypto_service.user.close()
+
+
+def test_captured_responses_can_be_replayed(
+    mock_exchange_server, get_file_data, tmp_path
+):
+    """Responses recorded to a capture log should be served back in the same order without
+    making any requests."""
+    capture_path = str(tmp_path / "exchange.capture")
+    ticker = get_file_data("get-tickers-eth-200")["result"]["data"][0]
+
+    mock_exchange_server.responses["get-tickers"] = [
+        (200, {"result": {"data": [{**ticker, "a": price}]}})
+        for price in ["2000", "2100"]
+    ]
+    mock_exchange_server.responses["create-order"] = [
+        (200, {"result": {"client_oid": "1", "order_id": 1}})
+    ]
+
+    recorder = CaptureRecorder(capture_path)
+
+    market = MarketHttpClient(api_url=mock_exchange_server.url)
+    user = UserHttpClient("key", "secret", api_url=mock_exchange_server.url)
+    market.capture_recorder = recorder
+    user.capture_recorder = recorder
+
+    recorded_tickers = [market.get_tickers()[0].latest_trade for _ in range(2)]
+    recorded_order = user.create_order("ETH_USD", "2000", "0.01", "BUY")
+
+    recorder.close()
+    market.close()
+    user.close()
+
+    request_count = len(mock_exchange_server.requests)
+
+    replayer = CaptureReplayer(capture_path)
+
+    market = MarketHttpClient(api_url=mock_exchange_server.url)
+    user = UserHttpClient("key", "secret", api_url=mock_exchange_server.url)
+    market.capture_replayer = replayer
+    user.capture_replayer = replayer
+
+    # The last response is repeated once every recorded response has been served.
+    assert [market.get_tickers()[0].latest_trade for _ in range(3)] == (
+        recorded_tickers + recorded_tickers[-1:]
+    )
+
+    # Orders are matched by method, as each has a randomly generated client_oid.
+    assert user.create_order("ETH_USD", "2000", "0.01", "BUY") == recorded_order
+    assert len(mock_exchange_server.requests) == request_count
+
+    with pytest.raises(LookupError):
+        market.get_instruments()
+
+
+def test_latest_trades_are_read_from_market_data_stream(
+    monkeypatch, mock_crypto_service, mock_websocket_server, get_file_content
+):
+    """Once the stream is live, latest trades should be read from the price store instead of
+    being requested via REST."""
+    query_strings = []
+
+    def mock_get_request(query_string, **kwargs) -> dict:
+        query_strings.append(query_string)
+
+        response = Response()
+        response.status_code = 200
+        response._content = get_file_content("get-tickers-eth-200")
+
+        return response
+
+    monkeypatch.setattr(mock_crypto_service.market.session, "get", mock_get_request)
+
+    ticker = json.loads(get_file_content("get-tickers-eth-200"))["result"]["data"][0]
+
+    mock_websocket_server.on_connect = [
+        {"id": 1700000000000, "method": "public/heartbeat", "code": 0}
+    ]
+    mock_websocket_server.responses["subscribe"] = [
+        {
+            "id": -1,
+            "method": "subscribe",
+            "code": 0,
+            "result": {
+                "instrument_name": "ETH_USD",
+                "subscription": "ticker.ETH_USD",
+                "channel": "ticker",
+                "data": [{**ticker, "a": "2000"}],
+            },
+        }
+    ]
+
+    mock_crypto_service.start_market_data_stream(url=mock_websocket_server.url)
+
+    wait_until(lambda: len(mock_crypto_service.market_data.prices) > 0)
+
+    latest_trade = mock_crypto_service.get_latest_trade("ETH_USD")
+    latest_trades = mock_crypto_service.get_latest_trades()
+
+    mock_crypto_service.stop_market_data_stream()
+
+    subscriptions = mock_websocket_server.get_requests("subscribe")
+    heartbeats = mock_websocket_server.get_requests("public/respond-heartbeat")
+
+    assert subscriptions[0]["params"]["channels"] == ["ticker.ETH_USD", "mark.ETH_USD"]
+    assert heartbeats[0]["id"] == 1700000000000
+    assert math.isclose(latest_trade.price, 2000.0)
+    assert [trade.price for trade in latest_trades] == [2000.0]
+
+    # Only the snapshot used to look up instrument names should have been requested.
+    assert len(query_strings) == 1
+
+
+def test_orders_and_wallet_are_read_from_user_data_stream(
+    monkeypatch, mock_crypto_service, mock_websocket_server, get_file_data
+):
+    """Once authenticated, pushed order updates and balances should be used instead of polling
+    the private REST API, and filled orders should be reported straight away."""
+    methods = []
+
+    def mock_post_request(method, **kwargs) -> dict:
+        methods.append(method)
+
+        raise HTTPError("Private REST API should not be used.")
+
+    monkeypatch.setattr(mock_crypto_service.user.session, "post", mock_post_request)
+
+    order = get_file_data("eth-get-order-detail-200")["result"]
+    user_balance = get_file_data("user-balance-200")["result"]["data"]
+
+    mock_websocket_server.responses["public/auth"] = [
+        {"id": 1, "method": "public/auth", "code": 0}
+    ]
+    mock_websocket_server.responses["subscribe"] = [
+        {
+            "id": -1,
+            "method": "subscribe",
+            "code": 0,
+            "result": {"channel": "user.balance", "data": user_balance},
+        },
+        {
+            "id": -1,
+            "method": "subscribe",
+            "code": 0,
+            "result": {
+                "subscription": "user.order",
+                "channel": "user.order",
+                "data": [order],
+            },
+        },
+    ]
+
+    filled_orders = []
+
+    mock_crypto_service.start_user_data_stream(
+        url=mock_websocket_server.url, on_orders=filled_orders.extend
+    )
+
+    wait_until(lambda: len(filled_orders) > 0)
+
+    order_details = mock_crypto_service.get_order_details([order["client_oid"]])
+    usd_balance = mock_crypto_service.get_coin_balance("USD")
+
+    mock_crypto_service.stop_user_data_stream()
+
+    auth_request = mock_websocket_server.get_requests("public/auth")[0]
+    subscriptions = mock_websocket_server.get_requests("subscribe")
+
+    # Authentication is signed in the same way as private REST requests.
+    assert (
+        auth_request["sig"]
+        == hmac.new(
+            bytes(mock_crypto_service.user.api_secret_key, "utf-8"),
+            msg=bytes(
+                f"public/auth1{mock_crypto_service.user.api_key}{auth_request['nonce']}",
+                "utf-8",
+            ),
+            digestmod=hashlib.sha256,
+        ).hexdigest()
+    )
+    assert subscriptions[0]["params"]["channels"] == ["user.order", "user.balance"]
+
+    assert filled_orders[0].status == "FILLED"
+    assert order_details[order["client_oid"]].status == OrderStatus.COMPLETED
+    assert usd_balance is not None
+    assert len(methods) == 0
+
+
+def test_market_data_stream_reconnects_and_backfills_gaps(
+    mock_crypto_service, mock_websocket_server, mock_exchange_server, get_file_data
+):
+    """A dropped stream should reconnect and resubscribe, and the intervals it missed should be
+    backfilled into the price history from public/get-valuations. Time series covered by the
+    history are then served from it rather than requested again."""
+    now_ms = env.time.now_in_ms()
+    minute_ms = 60 * 1000
+    ticker = get_file_data("get-tickers-eth-200")["result"]["data"][0]
+    streamed_mark = {"v": "2000", "t": now_ms - 5 * minute_ms}
+
+    mock_crypto_service.market.api_url = mock_exchange_server.url
+    mock_exchange_server.responses["get-tickers"] = [
+        (200, {"result": {"data": [ticker]}})
+    ]
+    mock_exchange_server.responses["get-valuations"] = [
+        (
+            200,
+            {
+                "result": {
+                    "data": [
+                        {"v": str(2000 + i), "t": now_ms - i * minute_ms}
+                        for i in range(1, 7)
+                    ]
+                }
+            },
+        )
+    ]
+    mock_websocket_server.responses["subscribe"] = [
+        {
+            "id": -1,
+            "method": "subscribe",
+            "code": 0,
+            "result": {"channel": "ticker", "data": [ticker]},
+        },
+        {
+            "id": -1,
+            "method": "subscribe",
+            "code": 0,
+            "result": {
+                "channel": "mark",
+                "instrument_name": "ETH_USD",
+                "subscription": "mark.ETH_USD",
+                "data": [streamed_mark],
+            },
+        },
+    ]
+
+    mock_crypto_service.start_market_data_stream(url=mock_websocket_server.url)
+    market_data = mock_crypto_service.market_data
+
+    wait_until(lambda: len(market_data.history) > 0)
+
+    mock_websocket_server.disconnect()
+
+    wait_until(lambda: mock_crypto_service.get_stream_stats()[0].gap_count > 0)
+
+    stats = mock_crypto_service.get_stream_stats()[0]
+    request_count = len(mock_exchange_server.requests)
+    time_series = mock_crypto_service.get_coin_time_series("ETH_USD", hours=5 / 60)
+
+    mock_crypto_service.stop_market_data_stream()
+
+    subscribe_requests = mock_websocket_server.get_requests("subscribe")
+
+    assert len(subscribe_requests) == 2
+    assert "mark.ETH_USD" in subscribe_requests[0]["params"]["channels"]
+    assert stats.reconnect_count == 1
+    assert stats.gap_count == 1
+
+    # Only samples after the last streamed price are backfilled.
+    assert stats.backfilled_sample_count == 4
+    assert list(time_series.v) == [2000.0, 2004.0, 2003.0, 2002.0, 2001.0]
+    assert all(dt > 0 for dt in time_series.t[1:] - time_series.t[:-1])
+    assert len(mock_exchange_server.requests) == request_count
@@ -1,8 +1,16 @@
 from datetime import datetime, timedelta
 import math
+import time
+import numpy as np
+from investorbot import analysis
 from investorbot.integrations.simulation.models import PositionBalanceSimulated
 from investorbot.integrations.simulation.services import SimulatedCryptoService
-from investorbot.routines import buy_coin_routine, refresh_market_analysis_routine
+from investorbot.routines import (
+    buy_coin_routine,
+    get_initial_ts_summaries,
+    refresh_market_analysis_routine,
+    refresh_multi_horizon_market_analysis_routine,
+)
 
 
 def test_market_analysis_can_be_executed_on_simulation(
@@ -27,6 +35,84 @@ def test_market_analysis_can_be_executed_on_simulation(
     refresh_market_analysis_routine(hours=24)
 
 
+def test_multi_horizon_market_analysis_can_be_executed_on_simulation(
+    monkeypatch, mock_context_with_data
+):
+    """A market analysis should be stored for each horizon from a single fetch of time series
+    data per coin."""
+    crypto_service = mock_context_with_data.crypto_service
+    bot_db = mock_context_with_data.db_service
+
+    if not isinstance(crypto_service, SimulatedCryptoService):
+        raise TypeError("Crypto service needs to be simulated for this test.")
+
+    fetched_coins = []
+    get_coin_time_series = crypto_service.get_coin_time_series
+
+    def mock_get_coin_time_series(coin_name, hours=24):
+        fetched_coins.append(coin_name)
+        return get_coin_time_series(coin_name, hours)
+
+    monkeypatch.setattr(
+        crypto_service, "get_coin_time_series", mock_get_coin_time_series
+    )
+    monkeypatch.setattr("investorbot.routines.bot_context", mock_context_with_data)
+
+    refresh_multi_horizon_market_analysis_routine(horizons="1,4,24")
+
+    assert len(fetched_coins) == len(crypto_service.get_latest_trades())
+
+    for hours in [1.0, 4.0, 24.0]:
+        market_analysis, _ = bot_db.get_market_analysis(hours)
+
+        assert market_analysis is not None, f"No market analysis for {hours} hours."
+        assert len(market_analysis.ts_data) == len(fetched_coins)
+        assert all(
+            ts_data.dataset_count <= analysis.hours_to_ts_data_count(hours)
+            for ts_data in market_analysis.ts_data
+        )
+
+
+def test_concurrent_summaries_match_serial_summaries(
+    monkeypatch, mock_context_with_data
+):
+    """Time series data arriving out of order from concurrent requests should still produce the
+    same summaries, in the same order, as fetching each coin one after another."""
+    crypto_service = mock_context_with_data.crypto_service
+    coin_names = [trade.coin_name for trade in crypto_service.get_latest_trades()]
+
+    expected = analysis.get_summary_batch(
+        coin_names,
+        *analysis.get_time_series_matrices(
+            [crypto_service.get_coin_time_series(coin_name) for coin_name in coin_names]
+        ),
+    )
+
+    get_coin_time_series = crypto_service.get_coin_time_series
+
+    def mock_get_coin_time_series(coin_name, hours=24):
+        # Earlier coins take longer so data arrives in reverse order.
+        time.sleep(0.01 * (len(coin_names) - coin_names.index(coin_name)))
+        return get_coin_time_series(coin_name, hours)
+
+    monkeypatch.setattr(
+        crypto_service, "get_coin_time_series", mock_get_coin_time_series
+    )
+    monkeypatch.setattr("investorbot.routines.bot_context", mock_context_with_data)
+
+    summaries = get_initial_ts_summaries(24)
+
+    assert summaries.coin_names == coin_names
+    assert np.allclose(summaries.mean, expected.mean, rtol=1e-12)
+    assert np.allclose(
+        summaries.line_of_best_fit_coefficient,
+        expected.line_of_best_fit_coefficient,
+        rtol=1e-9,
+    )
+    assert np.array_equal(summaries.time_offset, expected.time_offset)
+    assert np.array_equal(summaries.trend_state, expected.trend_state)
+
+
 def test_buy_order_routine_works_on_simulation(
     monkeypatch, mock_context, mock_static_time
 ):
@@ -1,6 +1,9 @@
 import math
+import numpy as np
+from investorbot import mappings
 from investorbot.integrations.simulation.services import SimulatedCryptoService
 from investorbot.integrations.simulation.models import PositionBalanceSimulated
+from investorbot.integrations.simulation.providers import TimeSeriesBuffer
 from investorbot.interfaces.services import ICryptoService
 from investorbot.structs.egress import CoinPurchase, CoinSale
 
@@ -216,3 +219,117 @@ def test_investable_coin_count_is_correct_two(mock_simulated_crypto_service):
     count = crypto_service.get_investable_coin_count()
 
     assert count == 4
+
+
+def test_coin_time_series_arrays_match_time_series_data(
+    mock_simulated_crypto_service_with_data,
+):
+    """Time series arrays handed over by the data provider should be identical to decoding the
+    JSON-like time series data returned by get_coin_time_series_data."""
+    crypto_service: ICryptoService = mock_simulated_crypto_service_with_data
+
+    time_series_data = crypto_service.get_coin_time_series_data("BTC_USD")
+    expected = mappings.valuation_data_to_time_series(time_series_data)
+
+    time_series = crypto_service.get_coin_time_series("BTC_USD")
+
+    assert time_series.time_offset == expected.time_offset
+    assert np.allclose(time_series.t, expected.t)
+    assert np.array_equal(time_series.v, expected.v)
+    assert time_series.t[0] == 0.0, "Time should be relative to the oldest value."
+
+
+def test_order_details_are_fetched_in_bulk(
+    monkeypatch, mock_bot_db, mock_simulated_crypto_service, mock_static_time
+):
+    """Bulk order details should match fetching each order individually, omitting unknown
+    orders."""
+    monkeypatch.setattr(
+        "investorbot.integrations.simulation.services.env.time",
+        mock_static_time,
+    )
+
+    wallet_entry = PositionBalanceSimulated(
+        coin_name="USD", quantity=100.0, reserved_quantity=0.0
+    )
+    mock_simulated_crypto_service.simulation_db.add_wallet_entry(wallet_entry)
+
+    crypto_service: ICryptoService = mock_simulated_crypto_service
+
+    buy_order_ids = [
+        crypto_service.place_coin_buy_order(
+            CoinPurchase(mock_bot_db.get_coin_properties(coin_name), price)
+        ).buy_order_id
+        for coin_name, price in [("ETH_USD", 2000.0), ("BTC_USD", 50000.0)]
+    ]
+
+    order_details = crypto_service.get_order_details(buy_order_ids + ["unknown"])
+
+    assert sorted(order_details.keys()) == sorted(buy_order_ids)
+
+    for buy_order_id in buy_order_ids:
+        assert order_details[buy_order_id] == crypto_service.get_order_detail(
+            buy_order_id
+        )
+
+
+def test_batch_buy_orders_adjust_wallet(
+    monkeypatch, mock_bot_db, mock_simulated_crypto_service, mock_static_time
+):
+    """Orders placed in a batch should adjust the wallet exactly as if they'd been placed one at
+    a time."""
+    monkeypatch.setattr(
+        "investorbot.integrations.simulation.services.env.time",
+        mock_static_time,
+    )
+
+    wallet_entry = PositionBalanceSimulated(
+        coin_name="USD", quantity=100.0, reserved_quantity=0.0
+    )
+    mock_simulated_crypto_service.simulation_db.add_wallet_entry(wallet_entry)
+
+    crypto_service: ICryptoService = mock_simulated_crypto_service
+
+    results = crypto_service.place_coin_buy_orders(
+        [
+            CoinPurchase(mock_bot_db.get_coin_properties(coin_name), price)
+            for coin_name, price in [("ETH_USD", 2000.0), ("BTC_USD", 50000.0)]
+        ]
+    )
+
+    assert [result.coin_name for result in results] == ["ETH_USD", "BTC_USD"]
+    assert all(result.is_successful for result in results)
+    assert crypto_service.get_cash_balance().usd_balance == 80.0
+    assert crypto_service.get_coin_balance("ETH").quantity > 0
+    assert crypto_service.get_coin_balance("BTC").quantity > 0
+
+    for result in results:
+        order_detail = crypto_service.get_order_detail(result.order.buy_order_id)
+
+        assert order_detail.coin_name == result.coin_name
+
+
+def test_time_series_buffer_retains_most_recent_values():
+    """Once the ring buffer is full the oldest values should be overwritten, with time series still
+    returned from oldest to most recent."""
+    time_series_data = TimeSeriesBuffer(["BTC_USD", "ETH_USD"], capacity=4)
+
+    times = np.arange(6)
+    values = np.column_stack((times * 1.0, times * 10.0))
+
+    time_series_data.extend(times[:3], values[:3])
+    time_series_data.extend(times[3:], values[3:])
+
+    t, v = time_series_data.get_time_series("ETH_USD")
+
+    assert len(time_series_data) == 4
+    assert np.array_equal(t, [2, 3, 4, 5])
+    assert np.array_equal(v, [20.0, 30.0, 40.0, 50.0])
+
+    # Extending by more than the capacity only keeps the most recent values.
+    time_series_data.extend(times + 6, values + 6)
+
+    t, v = time_series_data.get_time_series("BTC_USD")
+
+    assert np.array_equal(t, [8, 9, 10, 11])
+    assert np.array_equal(v, [8.0, 9.0, 10.0, 11.0])
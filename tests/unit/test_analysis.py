@@ -1,10 +1,18 @@
 import json
 import math
 import uuid
+import numpy as np
 from investorbot import analysis
-from investorbot.enums import OrderStatus
+from investorbot.constants import INVESTOR_APP_MODE_COUNT
+from investorbot.enums import MarketCharacterization, OrderStatus, TrendLineState
+from investorbot import mappings
 from investorbot.models import BuyOrder
-from investorbot.structs.internal import OrderDetail, PositionBalance
+from investorbot.structs.internal import (
+    OrderDetail,
+    PositionBalance,
+    SellTrigger,
+    SummaryBatch,
+)
 
 
 def get_example_data(filename: str) -> dict:
@@ -78,6 +86,316 @@ def test_get_line_of_best_fit_two():
     )
 
 
+def test_coin_time_series_summaries_match_single_coin_summaries():
+    """The batch summarizer should produce the same statistics as summarizing each coin
+    individually, including when coins have a different number of values."""
+    coin_names = ["ONE_USD", "TWO_USD"]
+    data = [
+        get_example_data("time-series-example-one.json"),
+        get_example_data("time-series-example-two.json")[:2000],
+    ]
+
+    expected_summaries = [
+        analysis.get_coin_time_series_summary(coin_name, coin_data)
+        for coin_name, coin_data in zip(coin_names, data)
+    ]
+
+    time_matrix, value_matrix, time_offsets = analysis.get_time_series_matrices(
+        [mappings.valuation_data_to_time_series(coin_data) for coin_data in data]
+    )
+
+    summaries = analysis.get_coin_time_series_summaries(
+        coin_names, time_matrix, value_matrix, time_offsets
+    )
+
+    for expected, summary in zip(expected_summaries, summaries):
+        assert summary.coin_name == expected.coin_name
+        assert math.isclose(summary.mean, expected.mean, rel_tol=1e-9)
+        assert math.isclose(summary.std, expected.std, rel_tol=1e-9)
+        assert math.isclose(
+            summary.line_of_best_fit_coefficient,
+            expected.line_of_best_fit_coefficient,
+            rel_tol=1e-9,
+        ), "Line of best fit gradient is incorrect"
+        assert math.isclose(
+            summary.line_of_best_fit_offset,
+            expected.line_of_best_fit_offset,
+            rel_tol=1e-9,
+        ), "Line of best fit offset is incorrect"
+        assert summary.starting_value == expected.starting_value
+        assert summary.trend_state == expected.trend_state
+        assert summary.is_volatile == expected.is_volatile
+        assert summary.dataset_count == expected.dataset_count
+        assert summary.time_offset == expected.time_offset
+        assert [mode.mode for mode in summary.modes] == [
+            mode.mode for mode in expected.modes
+        ]
+
+
+def test_multi_horizon_summaries_match_summaries_of_each_horizon():
+    """Summaries calculated for several horizons from prefix sums should match summarizing only
+    the most recent values for each horizon."""
+    coin_names = ["ONE_USD", "TWO_USD"]
+    data = [
+        get_example_data("time-series-example-one.json"),
+        get_example_data("time-series-example-two.json")[:2000],
+    ]
+    horizons = [1, 4, 24]
+
+    time_matrix, value_matrix, time_offsets = analysis.get_time_series_matrices(
+        [mappings.valuation_data_to_time_series(coin_data) for coin_data in data]
+    )
+
+    batches = analysis.get_multi_horizon_summary_batches(
+        coin_names, time_matrix, value_matrix, time_offsets, horizons
+    )
+
+    for hours in horizons:
+        count = analysis.hours_to_ts_data_count(hours)
+
+        # Data is ordered from most recent to x hours ago.
+        expected = analysis.get_summary_batch(
+            coin_names,
+            *analysis.get_time_series_matrices(
+                [
+                    mappings.valuation_data_to_time_series(coin_data[:count])
+                    for coin_data in data
+                ]
+            ),
+        )
+        batch = batches[hours]
+
+        assert np.allclose(batch.mean, expected.mean, rtol=1e-9)
+        assert np.allclose(batch.std, expected.std, rtol=1e-6)
+        assert np.allclose(
+            batch.line_of_best_fit_coefficient,
+            expected.line_of_best_fit_coefficient,
+            rtol=1e-6,
+        )
+        assert np.allclose(
+            batch.line_of_best_fit_offset, expected.line_of_best_fit_offset, rtol=1e-9
+        )
+        assert np.array_equal(batch.starting_value, expected.starting_value)
+        assert np.array_equal(batch.time_offset, expected.time_offset)
+        assert np.array_equal(batch.dataset_count, expected.dataset_count)
+        assert np.array_equal(batch.trend_state, expected.trend_state)
+        assert np.allclose(batch.modes, expected.modes, equal_nan=True)
+
+
+def test_summary_cache_only_summarizes_coins_with_new_data():
+    """Coins whose most recent value hasn't changed should reuse their cached summary, and the
+    combined result should match summarizing every coin."""
+    coin_names = ["ONE_USD", "TWO_USD"]
+    data = [
+        get_example_data("time-series-example-one.json"),
+        get_example_data("time-series-example-two.json"),
+    ]
+    summary_cache = analysis.SummaryCache(max_size=3)
+
+    time_series = [
+        mappings.valuation_data_to_time_series(coin_data[1:]) for coin_data in data
+    ]
+    first_batch = summary_cache.get_summary_batch(coin_names, time_series, 24)
+
+    assert (summary_cache.hits, summary_cache.misses) == (0, 2)
+
+    # Only the second coin receives a new value.
+    time_series = [
+        mappings.valuation_data_to_time_series(data[0][1:]),
+        mappings.valuation_data_to_time_series(data[1]),
+    ]
+    second_batch = summary_cache.get_summary_batch(coin_names, time_series, 24)
+    expected = analysis.get_summary_batch(
+        coin_names, *analysis.get_time_series_matrices(time_series)
+    )
+
+    assert (summary_cache.hits, summary_cache.misses) == (1, 3)
+    assert len(summary_cache) == 3
+    assert second_batch.coin_names == coin_names
+    assert second_batch.mean[0] == first_batch.mean[0]
+    assert np.allclose(second_batch.mean, expected.mean, rtol=1e-12)
+    assert np.array_equal(second_batch.time_offset, expected.time_offset)
+    assert np.allclose(second_batch.modes, expected.modes, equal_nan=True)
+
+    # Modifying the returned batch must not affect cached summaries.
+    second_batch.is_outlier_in_gradient[:] = True
+    third_batch = summary_cache.get_summary_batch(coin_names, time_series, 24)
+
+    assert (summary_cache.hits, summary_cache.misses) == (3, 3)
+    assert not third_batch.is_outlier_in_gradient.any()
+
+    # The least recently used summary is evicted once the cache is full.
+    summary_cache.get_summary_batch(coin_names[:1], time_series[:1], 1)
+
+    assert len(summary_cache) == 3
+    assert (summary_cache.hits, summary_cache.misses) == (3, 4)
+
+
+def test_modes_are_bounded_for_continuous_values():
+    """Continuous coin values are almost always unique. The number of modes stored per summary
+    must be capped rather than returning every value in the dataset."""
+    data = get_example_data("time-series-example-one.json")
+
+    summary = analysis.get_coin_time_series_summary("ONE_USD", data)
+
+    values = [float(entry["v"]) for entry in data]
+
+    assert 0 < len(summary.modes) <= INVESTOR_APP_MODE_COUNT
+    assert all(min(values) <= mode.mode <= max(values) for mode in summary.modes)
+
+
+def test_modes_favour_most_frequent_values():
+    values = np.array([1.0, 2.0, 2.0, 2.0, 3.0, 9.0, 9.0, np.nan])
+
+    modes = analysis.get_mode_matrix(values[None, :], bin_count=8, mode_count=2)[0]
+
+    assert math.isclose(modes[0], 2.0, abs_tol=0.5)
+    assert math.isclose(modes[1], 9.0, abs_tol=0.5)
+
+    constant_modes = analysis.get_modes(np.array([5.0, 5.0, 5.0]))
+
+    assert list(constant_modes) == [5.0]
+
+
+def test_outlier_mask_flags_values_outside_inter_quartile_range():
+    values = np.array([1.0, 1.1, 0.9, 1.05, 0.95, 1.2, 5.0, -3.0])
+
+    mask = analysis.get_outlier_mask(values)
+
+    assert list(np.flatnonzero(mask)) == [6, 7]
+
+
+def __get_summary_batch(
+    gradients: list, deviations: list, trend_states: list | None = None
+) -> SummaryBatch:
+    count = len(gradients)
+    trend_states = (
+        trend_states if trend_states is not None else [TrendLineState.FLAT] * count
+    )
+
+    return SummaryBatch(
+        coin_names=[f"COIN{i}_USD" for i in range(count)],
+        mean=np.ones(count),
+        std=np.full(count, 0.1),
+        line_of_best_fit_coefficient=np.full(count, 0.1),
+        line_of_best_fit_offset=np.ones(count),
+        starting_value=np.ones(count),
+        normalized_line_of_best_fit_coefficient=np.array(gradients),
+        normalized_starting_value=np.ones(count),
+        normalized_std=np.array(deviations),
+        time_offset=np.zeros(count, dtype=np.int64),
+        dataset_count=np.full(count, 2880),
+        modes=np.full((count, 1), np.nan),
+        trend_state=np.array([state.value for state in trend_states]),
+        is_volatile=np.array(deviations) >= 0.03,
+    )
+
+
+def test_outlier_properties_are_assigned():
+    """Deviation outliers should only be flagged for coins that are not already outliers in
+    gradient."""
+    gradients = [0.01, 0.011, 0.009, 0.0105, 0.0095, 0.012, 0.5, 0.0101]
+    deviations = [0.01, 0.011, 0.009, 0.0105, 0.0095, 0.012, 0.9, 0.4]
+
+    summaries = __get_summary_batch(gradients, deviations)
+
+    result = analysis.assign_outlier_properties(summaries)
+
+    assert list(np.flatnonzero(result.is_outlier_in_gradient)) == [6]
+    assert list(np.flatnonzero(result.is_outlier_in_deviation)) == [7]
+    assert not result.is_outlier_in_offset.any()
+
+    ts_summaries = result.to_time_series_summaries()
+
+    assert ts_summaries[6].is_outlier_in_gradient
+    assert ts_summaries[7].is_outlier_in_deviation
+    assert ts_summaries[0].modes == []
+
+
+def test_market_analysis_rating_is_consistent_across_horizons(mock_bot_db):
+    """Rating thresholds are tuned for a 24 hour change in value, so a market rising at the same
+    rate should be rated the same whatever the horizon of the analysis."""
+    rating_thresholds = mock_bot_db.get_rating_thresholds()
+    now_ms = 1723590318000
+    sample_ms = 30 * 1000
+
+    # Rising by 0.5 percent per 24 hours - i.e. a moderately rising market.
+    data = [
+        {
+            "t": now_ms - i * sample_ms,
+            "v": 100.0 * (1.0 - 0.005 * i / analysis.hours_to_ts_data_count(24)),
+        }
+        for i in range(analysis.hours_to_ts_data_count(168))
+    ]
+
+    for hours in [1, 4, 24, 168]:
+        count = analysis.hours_to_ts_data_count(hours)
+        summaries = analysis.get_summary_batch(
+            ["ONE_USD", "TWO_USD", "THREE_USD"],
+            *analysis.get_time_series_matrices(
+                [mappings.valuation_data_to_time_series(data[:count])] * 3
+            ),
+        )
+
+        rating = analysis.get_market_analysis_rating(summaries, rating_thresholds)
+
+        assert rating == MarketCharacterization.RISING, f"{hours} hours"
+
+
+def test_weighted_rankings_are_assigned(mock_bot_db):
+    """Each selection criteria met by a coin should add to its final ranking."""
+    summaries = __get_summary_batch(
+        [0.01, 0.011, 0.009, 0.0105, 0.5],
+        [0.01, 0.05, 0.01, 0.01, 0.01],
+        [
+            TrendLineState.RISING,
+            TrendLineState.FLAT,
+            TrendLineState.RISING,
+            TrendLineState.FALLING,
+            TrendLineState.RISING,
+        ],
+    )
+
+    summaries = analysis.assign_outlier_properties(summaries)
+
+    # Unsure: flat or rising trend lines, nominal and volatile coins are preferred.
+    options = mock_bot_db.get_selection_criteria(MarketCharacterization.FLAT)
+
+    summaries = analysis.assign_weighted_rankings(summaries, options)
+
+    assert list(summaries.final_ranking) == [199, 299, 199, 99, 99]
+
+
+def test_incremental_line_of_best_fit_matches_polyfit():
+    """The incremental trend line should match get_line_of_best_fit for the values currently in
+    its window, after any number of appends and evictions."""
+    window_size = 1000
+    data = list(reversed(get_example_data("time-series-example-two.json")))
+
+    trend_line = analysis.IncrementalLineOfBestFit(window_size)
+
+    for i, entry in enumerate(data):
+        trend_line.append(entry["t"], entry["v"])
+
+        if i not in (1, window_size - 1, 1500, 2400, len(data) - 1):
+            continue
+
+        window = list(reversed(data[max(0, i + 1 - window_size) : i + 1]))
+        stats, time_offset = analysis.get_time_series_data_frame(window)
+        expected_a, expected_b = analysis.get_line_of_best_fit(stats)
+
+        a, b = trend_line.get_line_of_best_fit()
+
+        assert trend_line.count == len(window)
+        assert trend_line.time_offset == time_offset
+        assert math.isclose(a, expected_a, rel_tol=1e-6, abs_tol=1e-9)
+        assert math.isclose(b, expected_b, rel_tol=1e-9)
+
+    trend_line.evict(len(data))
+
+    assert trend_line.count == 0
+
+
 def test_coin_sale_validator_is_ready_to_sell(mock_time):
     """Covers basis for when all criteria has been met for the bot to sell a coin. It's now just
     a case of waiting for the coin value to reach an acceptable value."""
@@ -179,3 +497,117 @@ def test_coin_sale_validator_will_not_break_on_normal_coin_balance(mock_time):
     assert not validator.order_has_been_cancelled
     assert not validator.order_balance_has_already_been_sold
     assert not can_sell
+
+
+def test_sell_trigger_queue_matches_value_ratio_threshold():
+    """Popping triggers for a price should return exactly the orders whose decaying value ratio
+    threshold is met, however long ago their sellable prices were computed."""
+    rng = np.random.default_rng(0)
+    hour_ms = 60 * 60 * 1000
+    start_ms = 1723590318000
+
+    sell_triggers = analysis.SellTriggerQueue(reprice_interval_ms=hour_ms)
+    triggers = [
+        SellTrigger(
+            str(i),
+            "TON_USD",
+            float(rng.uniform(5.0, 7.0)),
+            1.0,
+            start_ms - int(rng.uniform(0, 200) * hour_ms),
+            None,
+        )
+        for i in range(200)
+    ]
+
+    for trigger in triggers:
+        assert sell_triggers.add(trigger, start_ms)
+
+    remaining = list(triggers)
+
+    # Stale sellable prices are still matched exactly, up until they're recomputed.
+    for time_ms, price in [
+        (start_ms, 6.0),
+        (start_ms + 50 * 60 * 1000, 6.05),
+        (start_ms + 3 * hour_ms, 6.1),
+        (start_ms + 100 * hour_ms, 6.2),
+    ]:
+        expected = [
+            trigger.buy_order_id
+            for trigger in remaining
+            if price / trigger.price_per_coin
+            >= analysis.get_minimum_acceptable_value_ratio(
+                (time_ms - trigger.time_created_ms) / hour_ms
+            )
+        ]
+
+        triggered = sell_triggers.pop_triggered("TON_USD", price, time_ms)
+
+        assert len(expected) > 0
+        assert sorted(trigger.buy_order_id for trigger in triggered) == sorted(expected)
+
+        remaining = [
+            trigger for trigger in remaining if trigger.buy_order_id not in expected
+        ]
+
+        assert len(sell_triggers) == len(remaining)
+
+    assert sell_triggers.pop_triggered("BTC_USD", 1e9, start_ms) == []
+
+
+def test_sell_trigger_queue_claims_popped_triggers():
+    """A popped trigger can't be added again until it's released, so it can't be sold twice."""
+    start_ms = 1723590318000
+    trigger = SellTrigger("123", "TON_USD", 6.6274, 0.75, start_ms, None)
+    sell_triggers = analysis.SellTriggerQueue(reprice_interval_ms=60 * 60 * 1000)
+
+    sell_triggers.add(trigger, start_ms)
+
+    assert sell_triggers.pop_triggered("TON_USD", 6.0, start_ms) == []
+    assert sell_triggers.pop_triggered("TON_USD", 8.0, start_ms) == [trigger]
+    assert not sell_triggers.add(trigger, start_ms)
+    assert "123" not in sell_triggers
+
+    sell_triggers.release("123")
+
+    assert sell_triggers.add(trigger, start_ms)
+    assert "123" in sell_triggers
+
+    # The sellable price keeps falling between being computed and being recomputed.
+    later_ms = start_ms + 50 * 60 * 1000
+    price = analysis.get_sellable_price(trigger, later_ms) * (1 + 1e-9)
+
+    assert price < analysis.get_sellable_price(trigger, start_ms)
+    assert sell_triggers.pop_triggered("TON_USD", price, later_ms) == [trigger]
+
+    sell_triggers.release("123")
+    sell_triggers.add(trigger, start_ms)
+    sell_triggers.remove("123")
+
+    assert len(sell_triggers) == 0
+
+
+def test_sell_trigger_queue_rejects_sold_triggers():
+    """Once a popped trigger has been sold it can't be added again, even by a routine that read
+    the order before it was sold."""
+    start_ms = 1723590318000
+    trigger = SellTrigger("123", "TON_USD", 6.6274, 0.75, start_ms, None)
+    sell_triggers = analysis.SellTriggerQueue(reprice_interval_ms=60 * 60 * 1000)
+
+    sell_triggers.add(trigger, start_ms)
+
+    assert sell_triggers.pop_triggered("TON_USD", 8.0, start_ms) == [trigger]
+
+    sell_triggers.mark_sold("123")
+
+    assert not sell_triggers.add(trigger, start_ms)
+    assert "123" not in sell_triggers
+    assert len(sell_triggers) == 0
+
+    # Sold triggers are only remembered whilst their buy orders are still read as open.
+    sell_triggers.prune_sold({"123"})
+
+    assert not sell_triggers.add(trigger, start_ms)
+
+    sell_triggers.prune_sold(set())
+
+    assert sell_triggers.add(trigger, start_ms)
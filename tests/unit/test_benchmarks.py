@@ -0,0 +1,25 @@
+import json
+from benchmarks import analysis as benchmarks
+
+
+def test_synthetic_payloads_are_seeded():
+    first = list(benchmarks.get_synthetic_valuation_payloads(3, 100, seed=1))
+    second = list(benchmarks.get_synthetic_valuation_payloads(3, 100, seed=1))
+
+    assert first == second
+    assert len(json.loads(first[0][1])["result"]["data"]) == 100
+
+
+def test_benchmark_report_contains_every_stage():
+    report = json.loads(benchmarks.run_benchmarks("5x200", repeat=2))
+
+    assert len(report["results"]) == 1
+
+    result = report["results"][0]
+
+    assert (result["coin_count"], result["sample_count"]) == (5, 200)
+    assert list(result["timings"].keys()) == benchmarks.STAGES
+
+    for timing in result["timings"].values():
+        assert len(timing["runs"]) == 2
+        assert timing["min"] >= 0
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from investorbot import mappings
+from investorbot.integrations.cryptodotcom.http.decoding import (
+    JSON_BACKENDS,
+    JsonDecoder,
+)
+
+
+def get_example_content(filename: str) -> bytes:
+    with open(f"./tests/unit/fixtures/{filename}", "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("backend", list(JSON_BACKENDS.keys()))
+def test_valuation_arrays_match_decoded_json(backend):
+    """Extracting valuations straight into arrays should give the same time series as decoding
+    the full response, whichever JSON backend is used."""
+    content = get_example_content("time-series-example-one.json")
+    decoder = JsonDecoder(backend)
+
+    expected = mappings.valuation_data_to_time_series(
+        decoder.decode(content)["result"]["data"]
+    )
+    actual = mappings.valuation_arrays_to_time_series(
+        *decoder.decode_valuation_arrays(content)
+    )
+
+    assert actual.time_offset == expected.time_offset
+    np.testing.assert_array_equal(actual.t, expected.t)
+    np.testing.assert_array_equal(actual.v, expected.v)
+
+    stats = decoder.get_stats("test")
+
+    assert stats.backend == backend
+    assert stats.decode_count == 2
+    assert stats.byte_count == 2 * len(content)
+    assert stats.total_decode_seconds > 0
+
+
+def test_valuation_arrays_fall_back_to_decoding_in_full():
+    """Payloads with fields other than t and v can't be decoded by blanking out non-numeric
+    bytes, so they should be decoded in full instead of failing."""
+    content = (
+        b'{"result": {"data": [{"v": "1.5", "t": 2000, "e1": 3}, '
+        + b'{"v": "1.25", "t": 1000, "e1": 4}]}}'
+    )
+
+    t, v = JsonDecoder().decode_valuation_arrays(content)
+
+    np.testing.assert_array_equal(t, [2000.0, 1000.0])
+    np.testing.assert_array_equal(v, [1.5, 1.25])
+
+
+def test_unknown_json_backend_is_rejected():
+    with pytest.raises(ValueError):
+        JsonDecoder("unknown")
@@ -0,0 +1,65 @@
+import pytest
+
+from investorbot.integrations.cryptodotcom.http.ratelimit import (
+    PRIVATE_BALANCE,
+    PRIVATE_ORDER,
+    PRIVATE_ORDER_HISTORY,
+    PUBLIC_MARKET,
+    RateLimiter,
+    TokenBucket,
+    get_rate_limit_bucket,
+)
+
+
+class MockClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_requests_are_queued_once_bucket_is_empty():
+    """Requests beyond the burst capacity should wait in turn rather than fail."""
+    clock = MockClock()
+    bucket = TokenBucket("test", rate=10.0, capacity=2.0, clock=clock)
+
+    waits = [bucket.reserve() for _ in range(4)]
+
+    assert waits == pytest.approx([0.0, 0.0, 0.1, 0.2])
+
+    clock.now = 1.0
+
+    assert bucket.reserve() == 0.0
+
+    stats = bucket.get_stats()
+
+    assert stats.request_count == 5
+    assert stats.queued_request_count == 2
+    assert stats.total_wait_seconds == pytest.approx(0.3)
+    assert stats.max_wait_seconds == pytest.approx(0.2)
+    assert stats.mean_wait_seconds == pytest.approx(0.06)
+
+
+def test_methods_are_limited_by_their_own_bucket():
+    assert get_rate_limit_bucket("get-tickers?instrument_name=ETH_USD", False) == (
+        PUBLIC_MARKET
+    )
+    assert get_rate_limit_bucket("create-order", True) == PRIVATE_ORDER
+    assert get_rate_limit_bucket("get-order-history", True) == PRIVATE_ORDER_HISTORY
+    assert get_rate_limit_bucket("get-open-orders", True) == PRIVATE_BALANCE
+    assert get_rate_limit_bucket("user-balance", True) == PRIVATE_BALANCE
+
+    clock = MockClock()
+    rate_limiter = RateLimiter(
+        public_market_rate=1.0,
+        private_order_rate=10.0,
+        private_balance_rate=10.0,
+        clock=clock,
+    )
+
+    rate_limiter.get_bucket("user-balance", True).reserve()
+
+    # An exhausted balance bucket must not hold up order requests.
+    assert rate_limiter.get_bucket("user-balance", True).reserve() > 0
+    assert rate_limiter.get_bucket("create-order", True).reserve() == 0